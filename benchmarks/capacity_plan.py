@@ -0,0 +1,278 @@
+"""Throughput/latency curves per model and instance count, and the cores needed for a target.
+
+For every model (default: all in ``--model-repository``) and every
+``--instances`` count, the model is served from a temporary copy with
+``instance_group [ { count: N kind: KIND_CPU } ]`` and client concurrency is
+swept. Each point records throughput, latency percentiles and the CPU cores
+the server process used (from ``/proc``, Linux only).
+
+Per curve the report gives:
+
+* the saturation point: the lowest concurrency reaching 95% of peak throughput
+* capacity at the SLO: the highest throughput with p99 <= ``--target-p99-ms``
+* cores for the target: ``--target-qps`` divided by capacity at the SLO, times
+  the cores busy at that point; the smallest estimate across instance counts is
+  the recommendation
+
+Results are written to ``benchmarks/results/capacity/<model>/`` as versioned JSON
+keyed by a digest of the model artifacts, so runs before and after a rebuild
+can be compared with ``--compare``.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+
+from triton_onnx_demo.benchmark import (
+    STANDIN_SERVER_CMD,
+    ServerProcess,
+    artifact_digest,
+    copy_models,
+    make_inputs,
+    process_cpu_seconds,
+    request_tensors,
+    run_load,
+)
+from triton_onnx_demo.model_config import list_model_dirs, load_model_config, write_model_config
+
+SCHEMA_VERSION = 1
+SATURATION_FRACTION = 0.95
+
+
+def int_list(text):
+    return [int(value) for value in text.split(",") if value]
+
+
+def measure_curve(model_repository, model_name, instances, flags):
+    config = load_model_config(os.path.join(model_repository, model_name))
+    tensors = request_tensors(
+        os.path.join(model_repository, model_name), config, flags.rows_per_request
+    )
+    inputs = make_inputs(config, tensors)
+    points = []
+    with tempfile.TemporaryDirectory() as repository:
+        copy_models(model_repository, model_name, repository)
+        if config.get("platform") != "ensemble":
+            write_model_config(
+                os.path.join(repository, model_name),
+                {"instance_group": [{"count": instances, "kind": "KIND_CPU"}]},
+            )
+        with ServerProcess(
+            repository, [model_name], flags.server_cmd, flags.http_port
+        ) as server:
+            pid = server.process.pid
+            for concurrency in flags.concurrency:
+                cpu_start = process_cpu_seconds(pid)
+                wall_start = time.perf_counter()
+                point = run_load(
+                    server.url,
+                    model_name,
+                    inputs,
+                    concurrency,
+                    duration_s=flags.duration,
+                    warmup_s=flags.warmup,
+                    rows_per_request=flags.rows_per_request,
+                )
+                cpu_end = process_cpu_seconds(pid)
+                point["server_cores"] = (
+                    None
+                    if cpu_start is None or cpu_end is None
+                    else (cpu_end - cpu_start) / (time.perf_counter() - wall_start)
+                )
+                points.append(point)
+                p99 = point["latency_ms"].get("p99", float("inf"))
+                if point["errors"] or p99 > flags.max_p99_ms:
+                    break
+    return points
+
+
+def analyse_curve(points, target_p99_ms, target_qps):
+    if not points:
+        return {"peak_throughput": 0.0, "saturation": None, "at_slo": None,
+                "cores_for_target": None}
+    peak = max(point["inferences_per_s"] for point in points)
+    saturation = next(
+        point for point in points if point["inferences_per_s"] >= SATURATION_FRACTION * peak
+    )
+    within = [
+        point
+        for point in points
+        if not point["errors"] and point["latency_ms"].get("p99", float("inf")) <= target_p99_ms
+    ]
+    at_slo = max(within, key=lambda point: point["inferences_per_s"], default=None)
+    cores = None
+    if at_slo and at_slo["inferences_per_s"] and at_slo["server_cores"]:
+        cores = target_qps / at_slo["inferences_per_s"] * at_slo["server_cores"]
+    return {
+        "peak_throughput": peak,
+        "saturation": {
+            "concurrency": saturation["concurrency"],
+            "throughput": saturation["inferences_per_s"],
+            "p99_ms": saturation["latency_ms"].get("p99"),
+        },
+        "at_slo": None
+        if at_slo is None
+        else {
+            "concurrency": at_slo["concurrency"],
+            "throughput": at_slo["inferences_per_s"],
+            "p99_ms": at_slo["latency_ms"]["p99"],
+            "server_cores": at_slo["server_cores"],
+        },
+        "cores_for_target": cores,
+    }
+
+
+def plan_model(model_repository, model_name, flags):
+    config = load_model_config(os.path.join(model_repository, model_name))
+    curves = []
+    for instances in flags.instances:
+        try:
+            points = measure_curve(model_repository, model_name, instances, flags)
+        except Exception as e:
+            curves.append({"instances": instances, "error": str(e), "points": []})
+            print("  instances={} failed: {}".format(instances, e))
+            continue
+        analysis = analyse_curve(points, flags.target_p99_ms, flags.target_qps)
+        curves.append({"instances": instances, "points": points, **analysis})
+        print_curve(instances, points, analysis)
+        if config.get("platform") == "ensemble":
+            # Ensembles have no instance_group of their own.
+            break
+    estimates = [curve for curve in curves if curve.get("cores_for_target")]
+    best = min(estimates, key=lambda curve: curve["cores_for_target"], default=None)
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "model": model_name,
+        "artifact_digest": artifact_digest(model_repository, model_name),
+        "time": time.time(),
+        "server_cmd": flags.server_cmd,
+        "cpu_count": os.cpu_count(),
+        "rows_per_request": flags.rows_per_request,
+        "target": {"qps": flags.target_qps, "p99_ms": flags.target_p99_ms},
+        "curves": curves,
+        "recommendation": None
+        if best is None
+        else {
+            "instances": best["instances"],
+            "cores": math.ceil(best["cores_for_target"]),
+            "cores_exact": best["cores_for_target"],
+        },
+    }
+
+
+def print_curve(instances, points, analysis):
+    for point in points:
+        latency = point["latency_ms"]
+        print("  instances={:<2} concurrency={:<4} {:>10.1f} inf/s  p50 {:>8.3f}  "
+              "p99 {:>8.3f} ms  cores {}".format(
+                  instances,
+                  point["concurrency"],
+                  point["inferences_per_s"],
+                  latency.get("p50", float("nan")),
+                  latency.get("p99", float("nan")),
+                  "-" if point["server_cores"] is None else "{:.2f}".format(
+                      point["server_cores"]),
+              ))
+    if analysis["saturation"]:
+        print("  instances={:<2} saturates at concurrency {} ({:.1f} inf/s)".format(
+            instances, analysis["saturation"]["concurrency"],
+            analysis["saturation"]["throughput"]))
+
+
+def compare(previous, current):
+    lines = ["{}: {} -> {}".format(
+        current["model"], previous["artifact_digest"][:12], current["artifact_digest"][:12])]
+    previous_curves = {curve["instances"]: curve for curve in previous["curves"]}
+    for curve in current["curves"]:
+        before = previous_curves.get(curve["instances"])
+        if before is None or "error" in curve or "error" in before:
+            continue
+
+        def slo_throughput(c):
+            return c["at_slo"]["throughput"] if c.get("at_slo") else 0.0
+
+        lines.append(
+            "  instances={}: peak {:.1f} -> {:.1f} inf/s, at SLO {:.1f} -> {:.1f} inf/s".format(
+                curve["instances"],
+                before["peak_throughput"],
+                curve["peak_throughput"],
+                slo_throughput(before),
+                slo_throughput(curve),
+            )
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-repository", default="models")
+    parser.add_argument(
+        "-m", "--model", dest="models", action="append",
+        help="Model to plan. Repeatable. Default is every model in the repository.",
+    )
+    parser.add_argument("--instances", type=int_list, default=[1, 2, 4])
+    parser.add_argument(
+        "--concurrency", type=int_list, default=[1, 2, 4, 8, 16, 32, 64, 128]
+    )
+    parser.add_argument("--target-qps", type=float, default=10000.0,
+                        help="Inferences per second to plan for.")
+    parser.add_argument("--target-p99-ms", type=float, default=10.0)
+    parser.add_argument(
+        "--max-p99-ms", type=float, default=None,
+        help="Stop a sweep once p99 exceeds this. Default is 4x --target-p99-ms.",
+    )
+    parser.add_argument("--rows-per-request", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--warmup", type=float, default=0.5)
+    parser.add_argument(
+        "--server-cmd",
+        default=STANDIN_SERVER_CMD,
+        help="Command that starts the server. {model_repository}, {http_port}, "
+        "{grpc_port} and {metrics_port} are substituted. Default starts the "
+        "local stand-in server.",
+    )
+    parser.add_argument("--http-port", type=int, default=18000)
+    parser.add_argument("--results-dir", default=os.path.join("benchmarks", "results", "capacity"))
+    parser.add_argument(
+        "--compare", action="store_true",
+        help="Compare each model with its most recent stored result.",
+    )
+    FLAGS = parser.parse_args()
+    if FLAGS.max_p99_ms is None:
+        FLAGS.max_p99_ms = 4 * FLAGS.target_p99_ms
+
+    models = FLAGS.models or [
+        os.path.basename(model_dir) for model_dir in list_model_dirs(FLAGS.model_repository)
+    ]
+    failed = False
+    for model_name in models:
+        print(model_name)
+        result = plan_model(FLAGS.model_repository, model_name, FLAGS)
+        if not any(curve["points"] for curve in result["curves"]):
+            failed = True
+            continue
+        if result["recommendation"]:
+            print("  {:.0f} inf/s at p99 <= {} ms needs ~{} cores with {} instance(s)".format(
+                FLAGS.target_qps, FLAGS.target_p99_ms,
+                result["recommendation"]["cores"], result["recommendation"]["instances"]))
+        else:
+            print("  p99 <= {} ms was never met".format(FLAGS.target_p99_ms))
+
+        model_results = os.path.join(FLAGS.results_dir, model_name)
+        os.makedirs(model_results, exist_ok=True)
+        previous = sorted(name for name in os.listdir(model_results) if name.endswith(".json"))
+        if FLAGS.compare and previous:
+            with open(os.path.join(model_results, previous[-1])) as f:
+                print(compare(json.load(f), result))
+        path = os.path.join(model_results, "{}_{}.json".format(
+            time.strftime("%Y%m%dT%H%M%S", time.gmtime(result["time"])),
+            result["artifact_digest"][:12],
+        ))
+        with open(path, "w") as f:
+            json.dump(result, f, indent=2)
+        print("  written to {}".format(path))
+    if failed:
+        sys.exit(1)
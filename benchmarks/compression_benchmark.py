@@ -0,0 +1,129 @@
+"""Where request compression starts to pay off, for binary and JSON tensor payloads.
+
+For each batch size the rows of ``--data`` are encoded as an inference request
+body twice, once with binary tensor data and once as JSON. Each body is then
+compressed and decompressed with gzip and deflate. The break-even link speed
+is the bandwidth below which the transfer time saved outweighs compress plus
+decompress time: ``saved_bits / (compress_s + decompress_s)``.
+
+With ``--url`` and ``--model`` each variant is also sent to a server, and
+end-to-end latency is measured uncompressed, compressed, and with
+``CompressionPolicy`` deciding at ``--link-mbps``.
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+import tritonclient.http as httpclient
+
+from triton_onnx_demo.compression import (
+    ALGORITHMS,
+    AdaptiveCompressionClient,
+    CompressionPolicy,
+    FixedCompression,
+    break_even_mbps,
+    measure,
+)
+
+
+def make_body(features, binary_data):
+    infer_input = httpclient.InferInput("input__0", list(features.shape), "FP32")
+    infer_input.set_data_from_numpy(features, binary_data=binary_data)
+    outputs = [httpclient.InferRequestedOutput("output__0", binary_data=binary_data)]
+    body, _ = httpclient.InferenceServerClient.generate_request_body(
+        [infer_input], outputs=outputs
+    )
+    if isinstance(body, str):
+        body = body.encode()
+    return [infer_input], outputs, body
+
+
+def time_requests(send, repeats):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        send()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--data",
+        default="data/lightgbm/regression.test",
+        help="Tab separated rows; column 0 is the label and is dropped.",
+    )
+    parser.add_argument(
+        "--rows", default="1,8,64,256,1024,4096", help="Comma separated batch sizes."
+    )
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument(
+        "--link-mbps",
+        type=float,
+        default=100.0,
+        help="Link speed used for the verdict column and CompressionPolicy.",
+    )
+    parser.add_argument("-u", "--url", default=None, help="Also time requests against this server.")
+    parser.add_argument("-m", "--model", default="regression_classifier")
+    FLAGS = parser.parse_args()
+
+    data = pd.read_csv(FLAGS.data, header=None, sep="\t").drop(0, axis=1)
+    data = data.to_numpy(dtype=np.float32)
+    client = None
+    max_batch_size = None
+    if FLAGS.url:
+        client = httpclient.InferenceServerClient(url=FLAGS.url)
+        max_batch_size = client.get_model_config(FLAGS.model).get("max_batch_size", 0)
+
+    print("{:>6} {:<7} {:>10} {:<8} {:>6} {:>11} {:>13} {:>16}  {}".format(
+        "rows", "format", "bytes", "algo", "ratio", "compress ms", "decompress ms",
+        "break-even Mbps", "at {:g} Mbps".format(FLAGS.link_mbps)))
+    end_to_end = []
+    for rows in [int(value) for value in FLAGS.rows.split(",")]:
+        features = data[np.arange(rows) % len(data)]
+        for binary_data in (True, False):
+            label = "binary" if binary_data else "json"
+            inputs, outputs, body = make_body(features, binary_data)
+            for algorithm in ALGORITHMS:
+                runs = [measure(body, algorithm) for _ in range(FLAGS.repeats)]
+                ratio = runs[0][1]
+                compress_s = statistics.median(run[2] for run in runs)
+                decompress_s = statistics.median(run[3] for run in runs)
+                threshold = break_even_mbps(len(body), ratio, compress_s, decompress_s)
+                print("{:>6} {:<7} {:>10} {:<8} {:>6.3f} {:>11.3f} {:>13.3f} {:>16.1f}  {}".format(
+                    rows, label, len(body), algorithm, ratio, compress_s * 1000,
+                    decompress_s * 1000, threshold,
+                    "compress" if FLAGS.link_mbps < threshold else "send as is"))
+
+            if client is None or (max_batch_size and rows > max_batch_size):
+                continue
+            policy = CompressionPolicy(FLAGS.link_mbps)
+            # tritonclient cannot compress JSON-only bodies itself, so every
+            # variant goes through the same wrapper.
+            variants = {
+                "none": FixedCompression(),
+                "gzip": FixedCompression("gzip"),
+                "deflate": FixedCompression("deflate"),
+                "adaptive": policy,
+            }
+            timings = {}
+            for name, variant in variants.items():
+                wrapped = AdaptiveCompressionClient(client, variant)
+                timings[name] = time_requests(
+                    lambda: wrapped.infer(FLAGS.model, inputs, outputs=outputs),
+                    FLAGS.repeats,
+                )
+            end_to_end.append((rows, label, timings, policy.decisions["compressed"] > 0))
+
+    if end_to_end:
+        print()
+        print("median end-to-end ms against {} ({})".format(FLAGS.url, FLAGS.model))
+        print("{:>6} {:<7} {:>9} {:>9} {:>9} {:>9}  adaptive chose".format(
+            "rows", "format", "none", "gzip", "deflate", "adaptive"))
+        for rows, label, timings, compressed in end_to_end:
+            print("{:>6} {:<7} {:>9.3f} {:>9.3f} {:>9.3f} {:>9.3f}  {}".format(
+                rows, label, timings["none"], timings["gzip"], timings["deflate"],
+                timings["adaptive"], "deflate" if compressed else "none"))
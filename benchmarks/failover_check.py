@@ -0,0 +1,124 @@
+"""Check replica failover of a client built by ``client_from_flags``.
+
+Starts ``--replicas`` stand-in servers on a copy of ``--model`` and one more on
+an empty repository. The extra server is up but does not have the model. The
+client is built from command line flags, as the commands build it, with
+``--url`` listing every server. The script checks that:
+
+* the first health check ejects the server without the model, which only
+  the ``is_model_ready`` check can notice,
+* every request then succeeds,
+* after one replica with the model is stopped, the next health check ejects
+  it and every request still succeeds.
+
+Exits 1 on any failure, so it can run in CI next to ``regression_check.py``.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from triton_onnx_demo.benchmark import (
+    STANDIN_SERVER_CMD,
+    ServerProcess,
+    copy_models,
+    make_inputs,
+    request_tensors,
+)
+from triton_onnx_demo.client import (
+    add_balancing_arguments,
+    add_connection_arguments,
+    add_pool_arguments,
+    client_from_flags,
+)
+from triton_onnx_demo.model_config import load_model_config
+
+
+def client_flags(urls):
+    parser = argparse.ArgumentParser()
+    add_connection_arguments(parser)
+    add_pool_arguments(parser)
+    add_balancing_arguments(parser)
+    # Health checks are run by hand below, so the checks are deterministic.
+    return parser.parse_args(["-u", ",".join(urls), "--health-interval", "0"])
+
+
+def send(client, model_name, inputs, requests):
+    """Number of failed requests out of ``requests``."""
+    failed = 0
+    for _ in range(requests):
+        try:
+            client.infer(model_name, inputs)
+        except Exception:
+            failed += 1
+    return failed
+
+
+def ejected(client):
+    return [replica["url"] for replica in client.stats() if replica["state"] == "ejected"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-repository", default="models")
+    parser.add_argument("-m", "--model", default="regression_classifier")
+    parser.add_argument("--replicas", type=int, default=2)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--server-cmd", default=STANDIN_SERVER_CMD)
+    parser.add_argument("--http-port", type=int, default=18000)
+    FLAGS = parser.parse_args()
+
+    model_dir = os.path.join(FLAGS.model_repository, FLAGS.model)
+    config = load_model_config(model_dir)
+    inputs = make_inputs(config, request_tensors(model_dir, config))
+    failures = []
+    with tempfile.TemporaryDirectory() as repository, \
+            tempfile.TemporaryDirectory() as empty_repository:
+        copy_models(FLAGS.model_repository, FLAGS.model, repository)
+        servers = []
+        try:
+            for i in range(FLAGS.replicas):
+                # Triton takes three ports per replica.
+                server = ServerProcess(
+                    repository, [FLAGS.model], FLAGS.server_cmd, FLAGS.http_port + 3 * i
+                )
+                servers.append(server.start())
+            without_model = ServerProcess(
+                empty_repository, [], FLAGS.server_cmd, FLAGS.http_port + 3 * FLAGS.replicas
+            ).start()
+            servers.append(without_model)
+            urls = [server.url for server in servers]
+
+            client = client_from_flags(client_flags(urls), model_names=[FLAGS.model])
+            client.check_health()
+            if ejected(client) != [without_model.url]:
+                failures.append("replicas ejected by the first health check: {}, expected "
+                                "only {}".format(ejected(client), without_model.url))
+            failed = send(client, FLAGS.model, inputs, FLAGS.requests)
+            if failed:
+                failures.append("{} of {} requests failed with every replica up".format(
+                    failed, FLAGS.requests))
+
+            stopped = servers[0]
+            stopped.stop()
+            client.check_health()
+            if stopped.url not in ejected(client):
+                failures.append("stopped replica {} was not ejected".format(stopped.url))
+            failed = send(client, FLAGS.model, inputs, FLAGS.requests)
+            if failed:
+                failures.append("{} of {} requests failed after {} stopped".format(
+                    failed, FLAGS.requests, stopped.url))
+            for replica in client.stats():
+                print("{url}: {state}, {requests} requests, {failures} failures".format(
+                    **replica))
+            client.close()
+        finally:
+            for server in servers:
+                if server.process.poll() is None:
+                    server.stop()
+
+    for failure in failures:
+        print("FAILED: " + failure)
+    if failures:
+        sys.exit(1)
+    print("ok")
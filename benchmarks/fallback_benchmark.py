@@ -0,0 +1,81 @@
+"""Local fallback scoring against the remote path, in rows per second by batch size.
+
+A stand-in server (or Triton, with ``--server-cmd``) is started on one model.
+For each batch size the same requests are scored ``--requests`` times through
+the server and through ``triton_onnx_demo.fallback.LocalEngine``, which loads
+the model in-process from the same artifacts. The local path skips
+serialization, HTTP and queueing, so it shows how much throughput a client
+keeps when it falls back, and at which batch size the network stops
+dominating.
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+
+import tritonclient.http as httpclient
+
+from triton_onnx_demo.benchmark import (
+    STANDIN_SERVER_CMD,
+    ServerProcess,
+    copy_models,
+    make_inputs,
+    request_tensors,
+)
+from triton_onnx_demo.fallback import LocalEngine
+from triton_onnx_demo.model_config import load_model_config, supports_batching
+from triton_onnx_demo.packing import rows_per_request
+
+
+def rows_per_s(target, model_name, inputs, rows, requests):
+    target.infer(model_name, inputs)
+    start = time.perf_counter()
+    for _ in range(requests):
+        target.infer(model_name, inputs)
+    return rows * requests / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-repository", default="models")
+    parser.add_argument("-m", "--model", default="regression_classifier")
+    parser.add_argument("--batch-sizes", default="1,16,64,256",
+                        help="Comma separated rows per request.")
+    parser.add_argument("--requests", type=int, default=200,
+                        help="Requests per batch size and path.")
+    parser.add_argument("--server-cmd", default=STANDIN_SERVER_CMD)
+    parser.add_argument("--http-port", type=int, default=18000)
+    FLAGS = parser.parse_args()
+
+    model_dir = os.path.join(FLAGS.model_repository, FLAGS.model)
+    config = load_model_config(model_dir)
+    if supports_batching(config):
+        limit = rows_per_request(config)
+        batch_sizes = [int(size) for size in FLAGS.batch_sizes.split(",")]
+        batch_sizes = [size for size in batch_sizes if limit is None or size <= limit]
+    else:
+        batch_sizes = [1]
+    engine = LocalEngine(FLAGS.model_repository)
+    start = time.perf_counter()
+    engine.repository(FLAGS.model)
+    print("{} loaded locally in {:.0f} ms".format(
+        FLAGS.model, (time.perf_counter() - start) * 1000))
+    with tempfile.TemporaryDirectory() as repository:
+        copy_models(FLAGS.model_repository, FLAGS.model, repository)
+        with ServerProcess(repository, [FLAGS.model], FLAGS.server_cmd,
+                           FLAGS.http_port) as server:
+            # The readiness check's client is in a reference cycle; collect it
+            # here, as a collection in a local model's scheduler thread would
+            # close it off the gevent hub's thread and fail.
+            gc.collect()
+            client = httpclient.InferenceServerClient(url=server.url)
+            print("{:>6} {:>14} {:>14} {:>8}".format(
+                "rows", "remote rows/s", "local rows/s", "speedup"))
+            for rows in batch_sizes:
+                inputs = make_inputs(config, request_tensors(model_dir, config, rows))
+                remote = rows_per_s(client, FLAGS.model, inputs, rows, FLAGS.requests)
+                local = rows_per_s(engine, FLAGS.model, inputs, rows, FLAGS.requests)
+                print("{:>6} {:>14.0f} {:>14.0f} {:>7.1f}x".format(
+                    rows, remote, local, local / remote))
+            client.close()
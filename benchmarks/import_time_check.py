@@ -0,0 +1,96 @@
+"""Check that the client command line starts without loading heavy modules.
+
+Runs ``python -X importtime -m triton_onnx_demo <command> --help`` for every
+command in ``triton_onnx_demo.cli`` and reads the import times Python prints
+to stderr. A command fails if its ``--help`` imports any module in
+``HEAVY_MODULES``, or, with ``--max-ms``, if its imports take longer than
+that. Import times are the minimum over ``--repeat`` runs. Exits 1 on any
+failure, so it can run in CI next to ``regression_check.py``.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+from triton_onnx_demo.cli import COMMANDS
+
+# Top-level packages that --help must not import: each costs tens to hundreds
+# of milliseconds.
+HEAVY_MODULES = (
+    "gevent",
+    "geventhttpclient",
+    "lightgbm",
+    "numpy",
+    "onnxruntime",
+    "opentelemetry",
+    "pandas",
+    "scipy",
+    "sklearn",
+    "tritonclient",
+    "xgboost",
+)
+
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def import_times(stderr):
+    """Total import microseconds and the set of modules, from ``-X importtime`` output."""
+    total_us = 0
+    modules = set()
+    for line in stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match is None:
+            continue
+        cumulative_us, indent, module = int(match.group(2)), match.group(3), match.group(4)
+        modules.add(module)
+        # Cumulative times of nested imports are already in their parent's.
+        if len(indent) == 1:
+            total_us += cumulative_us
+    return total_us, modules
+
+
+def measure(args, repeat):
+    """Fastest of ``repeat`` runs: import ms, wall ms and the modules imported."""
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "triton_onnx_demo", *args],
+            capture_output=True, text=True, env=env,
+        )
+        wall_ms = (time.perf_counter() - start) * 1000
+        if result.returncode != 0:
+            raise RuntimeError("{} exited with {}:\n{}".format(
+                " ".join(args), result.returncode, result.stderr[-2000:]))
+        total_us, modules = import_times(result.stderr)
+        if best is None or total_us < best[0] * 1000:
+            best = (total_us / 1000, wall_ms, modules)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="Fail commands whose imports take longer than this.")
+    FLAGS = parser.parse_args()
+
+    failed = False
+    print("{:<14} {:>10} {:>9}  {}".format("command", "import ms", "wall ms", "heavy modules"))
+    for command in [None, *COMMANDS]:
+        args = ["--help"] if command is None else [command, "--help"]
+        import_ms, wall_ms, modules = measure(args, FLAGS.repeat)
+        heavy = sorted(module for module in HEAVY_MODULES if module in modules)
+        too_slow = FLAGS.max_ms is not None and import_ms > FLAGS.max_ms
+        failed = failed or bool(heavy) or too_slow
+        print("{:<14} {:>10.1f} {:>9.1f}  {}{}".format(
+            command or "(none)", import_ms, wall_ms, ", ".join(heavy) or "-",
+            "  SLOW" if too_slow else ""))
+    if failed:
+        print("FAILED")
+        sys.exit(1)
@@ -0,0 +1,162 @@
+"""Client-side load balancing across several local stand-in server replicas.
+
+``--replicas`` stand-in servers are started on one copy of the model. The first
+is made slow: ``--slow-rate`` of its requests are delayed by ``--slow-ms``.
+Closed-loop load is then run through ``BalancedClient`` with each policy. The
+report shows latency and each replica's share of requests. Least-outstanding
+and power-of-two-choices should steer traffic away from the slow replica.
+Round robin should not.
+
+With ``--failover`` the last replica is stopped a quarter of the way through a
+least-outstanding run and started again halfway. A per-interval timeline
+shows it being ejected, health checked back in, and ramped up over
+``--slow-start``. Leave ``--duration`` room for the restarted server to load
+its models.
+"""
+import argparse
+import os
+import tempfile
+
+import gevent
+
+from triton_onnx_demo.balancer import POLICIES, BalancedClient
+from triton_onnx_demo.benchmark import (
+    STANDIN_SERVER_CMD,
+    ServerProcess,
+    copy_models,
+    make_inputs,
+    request_tensors,
+    run_load,
+)
+from triton_onnx_demo.latency import format_summary
+from triton_onnx_demo.model_config import load_model_config
+
+
+def balanced_factory(urls, flags, policy, clients):
+    def factory(url, connections):
+        client = BalancedClient(
+            urls,
+            policy=policy,
+            model_names=[flags.model],
+            health_interval_s=flags.health_interval,
+            slow_start_s=flags.slow_start,
+            ejection_s=flags.ejection,
+            concurrency=connections,
+        )
+        client.start()
+        clients.append(client)
+        return client
+
+    return factory
+
+
+def compare_policies(urls, inputs, flags):
+    for policy in POLICIES:
+        clients = []
+        result = run_load(
+            urls[0],
+            flags.model,
+            inputs,
+            flags.concurrency,
+            duration_s=flags.duration,
+            warmup_s=flags.warmup,
+            client_factory=balanced_factory(urls, flags, policy, clients),
+        )
+        total = sum(replica["requests"] for replica in clients[0].stats()) or 1
+        shares = " ".join(
+            "{:.0%}".format(replica["requests"] / total) for replica in clients[0].stats()
+        )
+        print("{:<18} {:>9.1f} inf/s  errors {:<4} share {}".format(
+            policy, result["inferences_per_s"], result["errors"], shares))
+        print("{:<18} {}".format("", format_summary(result["latency_ms"])))
+
+
+def failover(servers, urls, inputs, flags):
+    clients = []
+    load = gevent.spawn(
+        run_load,
+        urls[0],
+        flags.model,
+        inputs,
+        flags.concurrency,
+        duration_s=flags.duration,
+        warmup_s=0.0,
+        client_factory=balanced_factory(urls, flags, "least_outstanding", clients),
+    )
+    interval_s = flags.duration / 15
+    previous = None
+    print("{:>6}  {}".format("t (s)", "  ".join(
+        "{:>22}".format(url) for url in urls)))
+    for tick in range(1, 16):
+        gevent.sleep(interval_s)
+        if tick == 4:
+            servers[-1].stop()
+            print("stopped {}".format(urls[-1]))
+        elif tick == 8:
+            servers[-1].start(wait=False)
+            print("restarted {}".format(urls[-1]))
+        if not clients:
+            continue
+        stats = clients[0].stats()
+        counts = [replica["requests"] for replica in stats]
+        deltas = counts if previous is None else [
+            count - before for count, before in zip(counts, previous)
+        ]
+        previous = counts
+        print("{:>6.1f}  {}".format(tick * interval_s, "  ".join(
+            "{:>12} {:>9}".format(replica["state"], delta)
+            for replica, delta in zip(stats, deltas))))
+    result = load.get()
+    print("errors during failover: {} of {} requests".format(
+        result["errors"], result["errors"] + result["requests"]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-repository", default="models")
+    parser.add_argument("-m", "--model", default="regression_classifier")
+    parser.add_argument("--replicas", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=0.5)
+    parser.add_argument("--slow-rate", type=float, default=0.2,
+                        help="Fraction of the first replica's requests to delay.")
+    parser.add_argument("--slow-ms", type=float, default=20.0)
+    parser.add_argument("--health-interval", type=float, default=0.5)
+    parser.add_argument("--ejection", type=float, default=2.0,
+                        help="Seconds a failing replica is ejected for, at first.")
+    parser.add_argument("--slow-start", type=float, default=3.0)
+    parser.add_argument("--failover", action="store_true",
+                        help="Also stop and restart a replica under load.")
+    parser.add_argument("--server-cmd", default=STANDIN_SERVER_CMD)
+    parser.add_argument("--http-port", type=int, default=18000)
+    FLAGS = parser.parse_args()
+
+    model_dir = os.path.join(FLAGS.model_repository, FLAGS.model)
+    config = load_model_config(model_dir)
+    inputs = make_inputs(config, request_tensors(model_dir, config))
+    with tempfile.TemporaryDirectory() as repository:
+        copy_models(FLAGS.model_repository, FLAGS.model, repository)
+        servers = []
+        try:
+            for i in range(FLAGS.replicas):
+                server_cmd = FLAGS.server_cmd
+                if i == 0 and FLAGS.slow_rate:
+                    server_cmd += " --straggler-rate {} --straggler-ms {}".format(
+                        FLAGS.slow_rate, FLAGS.slow_ms)
+                # Triton takes three ports per replica.
+                server = ServerProcess(
+                    repository, [FLAGS.model], server_cmd, FLAGS.http_port + 3 * i
+                )
+                servers.append(server.start())
+            urls = [server.url for server in servers]
+            print("{} replicas of {}; {} is slow ({:.0%} of requests +{:g} ms)".format(
+                FLAGS.replicas, FLAGS.model, urls[0], FLAGS.slow_rate, FLAGS.slow_ms))
+            compare_policies(urls, inputs, FLAGS)
+            if FLAGS.failover:
+                print()
+                failover(servers, urls, inputs, FLAGS)
+        finally:
+            for server in servers:
+                if server.process.poll() is None:
+                    server.stop()
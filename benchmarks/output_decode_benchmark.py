@@ -0,0 +1,109 @@
+"""Client-side cost of decoding inference responses, by output selection and decode path.
+
+Responses for a batched classifier with a ``label`` and a ``--classes`` wide
+``probabilities`` output are encoded the way the stand-in server sends them,
+then parsed with ``InferResult.from_response_body``. The outputs are:
+
+- every output as JSON, read with ``as_numpy``, as the example clients do,
+- every output as binary data, read with ``as_numpy`` or with
+  ``ResponsePlan.decode`` into reused buffers,
+- only ``label`` as binary data, read either way.
+
+For each batch size it prints the response size, the median parse and decode
+times, and the bytes the decode allocates, measured with ``tracemalloc``.
+``as_numpy`` copies each binary output out of the body unless it is the only
+one; ``decode`` copies once, into the buffers. No server is needed.
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import numpy as np
+from tritonclient.http import InferResult
+
+from triton_onnx_demo.response_plan import ResponsePlan
+from triton_onnx_demo.server.protocol import encode_infer_response
+
+
+def classifier_config(classes, max_batch_size):
+    return {
+        "name": "classifier",
+        "max_batch_size": max_batch_size,
+        "input": [{"name": "input__0", "data_type": "TYPE_FP32", "dims": [4]}],
+        "output": [
+            {"name": "label", "data_type": "TYPE_INT64", "dims": [1], "reshape": {"shape": []}},
+            {"name": "probabilities", "data_type": "TYPE_FP32", "dims": [classes]},
+        ],
+    }
+
+
+def response_body(model, outputs, names, binary_data):
+    header = {"outputs": [
+        {"name": name, "parameters": {"binary_data": binary_data}} for name in names
+    ]}
+    body, header_length = encode_infer_response(model, header, outputs)
+    return body, header_length
+
+
+def measure(body, header_length, decode, repeats):
+    """Median parse and decode seconds for ``body``, and bytes the decode allocates."""
+    parse_s, decode_s = [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = InferResult.from_response_body(body, header_length=header_length)
+        parsed = time.perf_counter()
+        decode(result)
+        parse_s.append(parsed - start)
+        decode_s.append(time.perf_counter() - parsed)
+    tracemalloc.start()
+    decode(result)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(parse_s), statistics.median(decode_s), peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--rows", default="1,64,1024,8192", help="Comma separated batch sizes."
+    )
+    parser.add_argument("--classes", type=int, default=16)
+    parser.add_argument("--repeats", type=int, default=50)
+    FLAGS = parser.parse_args()
+
+    rows_list = [int(rows) for rows in FLAGS.rows.split(",")]
+    config = classifier_config(FLAGS.classes, max(rows_list))
+    model = SimpleNamespace(name="classifier", version="1", config=config)
+    every = [output["name"] for output in config["output"]]
+    all_outputs = ResponsePlan(config)
+    label_only = ResponsePlan(config, ["label"])
+    buffers = all_outputs.buffers(max(rows_list))
+
+    def as_numpy(names):
+        return lambda result: [result.as_numpy(name) for name in names]
+
+    variants = [
+        ("all, JSON, as_numpy", all_outputs.names, False, as_numpy(every)),
+        ("all, binary, as_numpy", all_outputs.names, True, as_numpy(every)),
+        ("all, binary, decode", all_outputs.names, True,
+         lambda result: all_outputs.decode(result, buffers)),
+        ("label, binary, as_numpy", label_only.names, True, as_numpy(["label"])),
+        ("label, binary, decode", label_only.names, True,
+         lambda result: label_only.decode(result, buffers)),
+    ]
+    rng = np.random.default_rng(0)
+    print("{:>6}  {:<24} {:>11} {:>9} {:>10} {:>12}".format(
+        "rows", "outputs, encoding, path", "body bytes", "parse us", "decode us", "alloc bytes"))
+    for rows in rows_list:
+        probabilities = rng.dirichlet(np.ones(FLAGS.classes), size=rows).astype(np.float32)
+        outputs = {
+            "label": probabilities.argmax(axis=1).astype(np.int64),
+            "probabilities": probabilities,
+        }
+        for label, names, binary_data, decode in variants:
+            body, header_length = response_body(model, outputs, names, binary_data)
+            parse_s, decode_s, allocated = measure(body, header_length, decode, FLAGS.repeats)
+            print("{:>6}  {:<24} {:>11} {:>9.1f} {:>10.1f} {:>12}".format(
+                rows, label, len(body), parse_s * 1e6, decode_s * 1e6, allocated))
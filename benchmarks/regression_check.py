@@ -0,0 +1,260 @@
+"""Compare model latency and throughput against a stored baseline.
+
+Each model is served from a temporary copy (the local stand-in server by
+default) and loaded at every ``--concurrency`` level ``--repeats`` times. With
+``--update-baseline`` the results, including the per-repeat statistics, are
+saved to ``benchmarks/baselines/<model>.json``. Otherwise the run is compared
+with that baseline and the script exits 1 if any model regressed.
+
+Every repeat yields one p99 and one throughput. The statistics compare these
+per-repeat values, not the pooled latency samples: requests within a repeat
+share the server's state (caches, CPU frequency, neighbours), so pooling them
+overstates the evidence and flags noise between runs as a regression. A
+regression needs both a practical and a statistical signal:
+
+* p99 latency: the mean of the per-repeat p99s grew by more than
+  ``--p99-threshold`` (relative) and a one-sided Welch t-test on the
+  per-repeat p99s agrees (p < ``--alpha``).
+* throughput: mean throughput over the repeats fell by more than
+  ``--throughput-threshold`` and a one-sided Welch t-test on the per-repeat
+  throughputs agrees (p < ``--alpha``).
+
+With a single repeat there is no variance to test, and the thresholds alone
+decide.
+
+Baselines are only comparable on the same machine and server command; both are
+recorded and a mismatch is reported.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+from scipy import stats
+
+from triton_onnx_demo.benchmark import (
+    STANDIN_SERVER_CMD,
+    ServerProcess,
+    artifact_digest,
+    copy_models,
+    make_inputs,
+    request_tensors,
+    run_load,
+)
+from triton_onnx_demo.latency import summarize
+from triton_onnx_demo.model_config import load_model_config
+
+# 2: per-repeat p99s; version 1 baselines pooled raw samples and must be re-recorded.
+SCHEMA_VERSION = 2
+
+
+def int_list(text):
+    return [int(value) for value in text.split(",") if value]
+
+
+def run_model(model_repository, model_name, flags):
+    model_dir = os.path.join(model_repository, model_name)
+    config = load_model_config(model_dir)
+    inputs = make_inputs(config, request_tensors(model_dir, config, flags.rows_per_request))
+    levels = {}
+    with tempfile.TemporaryDirectory() as repository:
+        copy_models(model_repository, model_name, repository)
+        with ServerProcess(repository, [model_name], flags.server_cmd, flags.http_port) as server:
+            for concurrency in flags.concurrency:
+                samples = []
+                p99s = []
+                throughputs = []
+                errors = 0
+                for _ in range(flags.repeats):
+                    result = run_load(
+                        server.url,
+                        model_name,
+                        inputs,
+                        concurrency,
+                        duration_s=flags.duration,
+                        warmup_s=flags.warmup,
+                        rows_per_request=flags.rows_per_request,
+                        keep_samples=True,
+                    )
+                    samples.extend(result["samples_ms"])
+                    # None when every request of the repeat failed.
+                    p99s.append(summarize(result["samples_ms"]).get("p99"))
+                    throughputs.append(result["inferences_per_s"])
+                    errors += result["errors"]
+                levels[str(concurrency)] = {
+                    "p99s": p99s,
+                    "throughputs": throughputs,
+                    "errors": errors,
+                    "latency_ms": summarize(samples),
+                }
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "model": model_name,
+        "artifact_digest": artifact_digest(model_repository, model_name),
+        "time": time.time(),
+        "host": platform.node(),
+        "cpu_count": os.cpu_count(),
+        "server_cmd": flags.server_cmd,
+        "rows_per_request": flags.rows_per_request,
+        "levels": levels,
+    }
+
+
+def welch_p_value(current, baseline, alternative):
+    """One-sided Welch t-test p-value of per-repeat values, ``current`` vs ``baseline``."""
+    if len(current) < 2 or len(baseline) < 2:
+        # A single repeat gives no variance to test against; use the threshold alone.
+        return 0.0
+    p_value = stats.ttest_ind(
+        current, baseline, equal_var=False, alternative=alternative
+    ).pvalue
+    if np.isnan(p_value):
+        # Identical constant samples.
+        difference = np.mean(current) - np.mean(baseline)
+        worse = difference > 0 if alternative == "greater" else difference < 0
+        return 0.0 if worse else 1.0
+    return float(p_value)
+
+
+def compare_level(baseline, current, flags):
+    """Findings for one concurrency level; each is ``(metric, detail, regressed)``."""
+    findings = []
+    if current["errors"]:
+        findings.append(("errors", "{} failed requests".format(current["errors"]), True))
+
+    new_p99s = [p99 for p99 in current["p99s"] if p99 is not None]
+    base_p99s = [p99 for p99 in baseline.get("p99s") or [] if p99 is not None]
+    if not new_p99s:
+        # Every request failed: the worst regression there is, with nothing to test.
+        findings.append(("p99", "no successful requests", True))
+    elif "p99s" not in baseline:
+        findings.append((
+            "p99", "baseline has no per-repeat p99s; run with --update-baseline", False
+        ))
+    elif not base_p99s:
+        findings.append(("p99", "no baseline samples to compare with", False))
+    else:
+        base_p99 = float(np.mean(base_p99s))
+        new_p99 = float(np.mean(new_p99s))
+        change = (new_p99 - base_p99) / base_p99 if base_p99 else 0.0
+        p_value = welch_p_value(new_p99s, base_p99s, "greater")
+        findings.append((
+            "p99",
+            "{:.3f} -> {:.3f} ms ({:+.1%}, Welch p={:.3g}, {} vs {} repeats)".format(
+                base_p99, new_p99, change, p_value, len(base_p99s), len(new_p99s)
+            ),
+            change > flags.p99_threshold and p_value < flags.alpha,
+        ))
+
+    base_tput = float(np.mean(baseline["throughputs"]))
+    new_tput = float(np.mean(current["throughputs"]))
+    change = (new_tput - base_tput) / base_tput if base_tput else 0.0
+    p_value = welch_p_value(current["throughputs"], baseline["throughputs"], "less")
+    findings.append((
+        "throughput",
+        "{:.1f} -> {:.1f} inf/s ({:+.1%}, Welch p={:.3g})".format(
+            base_tput, new_tput, change, p_value
+        ),
+        -change > flags.throughput_threshold and p_value < flags.alpha,
+    ))
+    return findings
+
+
+def compare(baseline, current, flags):
+    lines = []
+    regressed = False
+    if baseline["artifact_digest"] != current["artifact_digest"]:
+        lines.append("  model artifacts changed since the baseline ({} -> {})".format(
+            baseline["artifact_digest"][:12], current["artifact_digest"][:12]))
+    for key in ("host", "cpu_count", "server_cmd", "rows_per_request"):
+        if baseline.get(key) != current.get(key):
+            lines.append("  warning: {} differs from the baseline ({} -> {})".format(
+                key, baseline.get(key), current.get(key)))
+    for concurrency, level in current["levels"].items():
+        if concurrency not in baseline["levels"]:
+            lines.append("  concurrency {}: no baseline".format(concurrency))
+            continue
+        for metric, detail, bad in compare_level(baseline["levels"][concurrency], level, flags):
+            regressed = regressed or bad
+            lines.append("  concurrency {:<4} {:<10} {:<10} {}".format(
+                concurrency, metric, "REGRESSED" if bad else "ok", detail))
+    return regressed, "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-repository", default="models")
+    parser.add_argument(
+        "-m", "--model", dest="models", action="append", required=True,
+        help="Model to check. Repeatable.",
+    )
+    parser.add_argument("--baseline-dir", default=os.path.join("benchmarks", "baselines"))
+    parser.add_argument(
+        "--update-baseline", action="store_true",
+        help="Store this run as the new baseline instead of comparing.",
+    )
+    parser.add_argument("--concurrency", type=int_list, default=[1, 8])
+    parser.add_argument(
+        "--repeats", type=int, default=5,
+        help="Runs per concurrency level; each gives one p99 and one throughput "
+        "for the tests. Default is 5.",
+    )
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--warmup", type=float, default=0.5)
+    parser.add_argument("--rows-per-request", type=int, default=1)
+    parser.add_argument(
+        "--p99-threshold", type=float, default=0.10,
+        help="Relative p99 increase that counts as a regression. Default is 0.10.",
+    )
+    parser.add_argument(
+        "--throughput-threshold", type=float, default=0.10,
+        help="Relative throughput drop that counts as a regression. Default is 0.10.",
+    )
+    parser.add_argument("--alpha", type=float, default=0.01)
+    parser.add_argument(
+        "--server-cmd",
+        default=STANDIN_SERVER_CMD,
+        help="Command that starts the server. {model_repository}, {http_port}, "
+        "{grpc_port} and {metrics_port} are substituted. Default starts the "
+        "local stand-in server.",
+    )
+    parser.add_argument("--http-port", type=int, default=18000)
+    FLAGS = parser.parse_args()
+
+    failed = []
+    for model_name in FLAGS.models:
+        baseline_path = os.path.join(FLAGS.baseline_dir, model_name + ".json")
+        if not FLAGS.update_baseline and not os.path.exists(baseline_path):
+            print("{}: no baseline at {}; run with --update-baseline".format(
+                model_name, baseline_path))
+            failed.append(model_name)
+            continue
+        try:
+            current = run_model(FLAGS.model_repository, model_name, FLAGS)
+        except Exception as e:
+            print("{}: benchmark failed: {}".format(model_name, e))
+            failed.append(model_name)
+            continue
+
+        if FLAGS.update_baseline:
+            os.makedirs(FLAGS.baseline_dir, exist_ok=True)
+            with open(baseline_path, "w") as f:
+                json.dump(current, f)
+            print("{}: baseline written to {}".format(model_name, baseline_path))
+            continue
+
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        regressed, report = compare(baseline, current, FLAGS)
+        print("{}: {}".format(model_name, "REGRESSED" if regressed else "ok"))
+        print(report)
+        if regressed:
+            failed.append(model_name)
+
+    if failed:
+        print("failed: " + ", ".join(failed))
+        sys.exit(1)
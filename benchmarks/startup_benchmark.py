@@ -0,0 +1,125 @@
+"""Measure first-request latency after a server start, with and without model_warmup.
+
+Each run copies the model into a fresh repository, starts the server with
+``--server-cmd``, waits until the model is ready and then times the first
+request followed by a few steady-state requests. The ``without_warmup`` variant
+strips the ``model_warmup`` block from the copied config.
+
+Run build_warmup.py first; the warmup samples double as the request payload.
+"""
+import argparse
+import os
+import shlex
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import tritonclient.http as httpclient
+
+from triton_onnx_demo.benchmark import TRITON_SERVER_CMD, make_inputs, wait_until_ready
+from triton_onnx_demo.model_config import load_model_config, write_model_config
+from triton_onnx_demo.warmup import load_warmup_samples
+
+
+def run_once(model_dir, warmup, server_cmd, http_port, steady_requests, ready_timeout):
+    model_name = os.path.basename(os.path.normpath(model_dir))
+    config = load_model_config(model_dir)
+    samples = load_warmup_samples(model_dir, config)
+    if not samples:
+        raise RuntimeError(
+            "{} has no model_warmup; run model_builders/build_warmup.py".format(model_name)
+        )
+    _, tensors = samples[0]
+
+    with tempfile.TemporaryDirectory() as model_repository:
+        shutil.copytree(model_dir, os.path.join(model_repository, model_name))
+        if not warmup:
+            write_model_config(
+                os.path.join(model_repository, model_name), {"model_warmup": None}
+            )
+        command = server_cmd.format(
+            model_repository=model_repository,
+            http_port=http_port,
+            grpc_port=http_port + 1,
+            metrics_port=http_port + 2,
+        )
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            shlex.split(command), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            client = httpclient.InferenceServerClient(url="localhost:{}".format(http_port))
+            wait_until_ready(client, model_name, process, ready_timeout)
+            ready_s = time.perf_counter() - start
+
+            inputs = make_inputs(config, tensors)
+            request_start = time.perf_counter()
+            client.infer(model_name, inputs)
+            first_ms = (time.perf_counter() - request_start) * 1000
+
+            steady = []
+            for _ in range(steady_requests):
+                request_start = time.perf_counter()
+                client.infer(model_name, inputs)
+                steady.append((time.perf_counter() - request_start) * 1000)
+            client.close()
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+    return {
+        "ready_s": ready_s,
+        "first_ms": first_ms,
+        "steady_ms": statistics.median(steady) if steady else float("nan"),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-repository", default="models")
+    parser.add_argument("-m", "--model", required=True, help="Model to benchmark.")
+    parser.add_argument(
+        "--server-cmd",
+        default=TRITON_SERVER_CMD,
+        help="Command that starts the server. {model_repository}, {http_port}, "
+        "{grpc_port} and {metrics_port} are substituted. Default starts tritonserver.",
+    )
+    parser.add_argument("--http-port", type=int, default=18000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--steady-requests", type=int, default=20)
+    parser.add_argument("--ready-timeout", type=float, default=120.0)
+    FLAGS = parser.parse_args()
+
+    model_dir = os.path.join(FLAGS.model_repository, FLAGS.model)
+    print("{:<16} {:>9} {:>10} {:>11} {:>11}".format(
+        "variant", "run", "ready s", "first ms", "steady ms"))
+    results = {}
+    for warmup in (False, True):
+        variant = "with_warmup" if warmup else "without_warmup"
+        results[variant] = []
+        for run in range(FLAGS.runs):
+            try:
+                result = run_once(
+                    model_dir,
+                    warmup,
+                    FLAGS.server_cmd,
+                    FLAGS.http_port,
+                    FLAGS.steady_requests,
+                    FLAGS.ready_timeout,
+                )
+            except Exception as e:
+                print("{} run {} failed: {}".format(variant, run, e))
+                sys.exit(1)
+            results[variant].append(result)
+            print("{:<16} {:>9} {:>10.2f} {:>11.3f} {:>11.3f}".format(
+                variant, run, result["ready_s"], result["first_ms"], result["steady_ms"]))
+
+    without = statistics.median(r["first_ms"] for r in results["without_warmup"])
+    with_ = statistics.median(r["first_ms"] for r in results["with_warmup"])
+    print("median first-request latency: {:.3f} ms without warmup, {:.3f} ms with "
+          "warmup".format(without, with_))
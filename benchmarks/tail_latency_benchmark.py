@@ -0,0 +1,110 @@
+"""Tail latency with and without deadlines, retries and hedged requests.
+
+The model is served by the stand-in server with ``--straggler-rate`` of
+requests delayed by ``--straggler-ms``, standing in for GC pauses, noisy
+neighbours and slow replicas. The same closed-loop load is then run with a
+plain client, with ``ResilientClient`` retrying under a deadline, and with
+hedging enabled. Hedging should cut p99.9 to roughly the hedge delay plus one
+normal request, for at most ``--max-hedge-fraction`` extra load.
+"""
+import argparse
+import os
+import tempfile
+
+from triton_onnx_demo.benchmark import (
+    STANDIN_SERVER_CMD,
+    ServerProcess,
+    copy_models,
+    make_inputs,
+    request_tensors,
+    run_load,
+)
+from triton_onnx_demo.model_config import load_model_config
+from triton_onnx_demo.resilience import ResilientClient
+
+
+def variants(flags):
+    deadline_s = flags.deadline_ms / 1000 if flags.deadline_ms else None
+    return {
+        "plain": None,
+        "deadline+retry": dict(deadline_s=deadline_s, max_retries=flags.max_retries),
+        "hedged": dict(
+            deadline_s=deadline_s,
+            max_retries=flags.max_retries,
+            hedge=True,
+            hedge_percentile=flags.hedge_percentile,
+            max_hedge_fraction=flags.max_hedge_fraction,
+        ),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-repository", default="models")
+    parser.add_argument("-m", "--model", default="regression_classifier")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--straggler-rate", type=float, default=0.01)
+    parser.add_argument("--straggler-ms", type=float, default=50.0)
+    parser.add_argument("--deadline-ms", type=float, default=200.0,
+                        help="Per-request deadline; 0 disables it.")
+    parser.add_argument("--max-retries", type=int, default=2)
+    parser.add_argument("--hedge-percentile", type=float, default=95)
+    parser.add_argument("--max-hedge-fraction", type=float, default=0.05)
+    parser.add_argument(
+        "--server-cmd",
+        default=STANDIN_SERVER_CMD,
+        help="Command that starts the server. {model_repository} and {http_port} "
+        "are substituted; the straggler flags are appended.",
+    )
+    parser.add_argument("--http-port", type=int, default=18000)
+    FLAGS = parser.parse_args()
+
+    model_dir = os.path.join(FLAGS.model_repository, FLAGS.model)
+    config = load_model_config(model_dir)
+    inputs = make_inputs(config, request_tensors(model_dir, config))
+    server_cmd = "{} --straggler-rate {} --straggler-ms {}".format(
+        FLAGS.server_cmd, FLAGS.straggler_rate, FLAGS.straggler_ms
+    )
+
+    print("{} at concurrency {}, {:.1%} of requests delayed {:g} ms".format(
+        FLAGS.model, FLAGS.concurrency, FLAGS.straggler_rate, FLAGS.straggler_ms))
+    print("{:<15} {:>9} {:>9} {:>9} {:>9} {:>9} {:>7} {:>7} {:>7}".format(
+        "client", "inf/s", "p50", "p99", "p99.9", "max", "errors", "hedges", "retries"))
+    with tempfile.TemporaryDirectory() as repository:
+        copy_models(FLAGS.model_repository, FLAGS.model, repository)
+        with ServerProcess(repository, [FLAGS.model], server_cmd, FLAGS.http_port) as server:
+            for name, options in variants(FLAGS).items():
+                wrapped = []
+
+                def wrap(client, options=options):
+                    if options is None:
+                        return client
+                    wrapped.append(ResilientClient(client, **options))
+                    return wrapped[-1]
+
+                result = run_load(
+                    server.url,
+                    FLAGS.model,
+                    inputs,
+                    FLAGS.concurrency,
+                    duration_s=FLAGS.duration,
+                    warmup_s=FLAGS.warmup,
+                    wrap=wrap,
+                    # Room for hedges and for attempts abandoned at the deadline.
+                    connections=2 * FLAGS.concurrency,
+                )
+                latency = result["latency_ms"]
+                stats = wrapped[0].stats if wrapped else None
+                print("{:<15} {:>9.1f} {:>9.3f} {:>9.3f} {:>9.3f} {:>9.3f} {:>7} {:>7} {:>7}".format(
+                    name,
+                    result["inferences_per_s"],
+                    latency.get("p50", float("nan")),
+                    latency.get("p99", float("nan")),
+                    latency.get("p99_9", float("nan")),
+                    latency.get("max", float("nan")),
+                    result["errors"],
+                    "-" if stats is None else stats.hedges,
+                    "-" if stats is None else stats.retries,
+                ))
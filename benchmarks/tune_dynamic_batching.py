@@ -0,0 +1,284 @@
+"""Search dynamic batching settings for the highest throughput within a latency SLO.
+
+Each candidate config is written into a copy of the model, served with
+``--server-cmd`` (the local stand-in by default) and measured by sweeping
+client concurrency until p99 latency exceeds ``--slo-p99-ms``. A candidate's
+score is the best throughput (inferences/s) it reached with p99 inside the SLO.
+
+The search is a coordinate descent over instance count, ``max_batch_size``,
+``max_queue_delay_microseconds`` and ``preferred_batch_size``: each parameter
+is swept in turn with the others held at the best values so far. The winning
+settings are written back to ``config.pbtxt`` and every measured point is saved
+as JSON.
+
+Before the search the model is loaded as configured and sent one request. If
+either fails, for example because the config's input dims do not match the
+model, the error is printed and the script exits 1 without measuring anything.
+Candidates whose requests fail are reported with their error count.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import tritonclient.http as httpclient
+
+from triton_onnx_demo.benchmark import (
+    STANDIN_SERVER_CMD,
+    ServerProcess,
+    make_inputs,
+    request_tensors,
+    run_load,
+)
+from triton_onnx_demo.model_config import (
+    load_model_config,
+    supports_batching,
+    write_model_config,
+)
+from triton_onnx_demo.server.scheduler import instance_count
+
+
+def int_list(text):
+    return [int(value) for value in text.split(",") if value]
+
+
+def preferred_list(text):
+    """``"none,4,8+16"`` to ``[[], [4], [8, 16]]``."""
+    return [[] if item == "none" else int_list(item.replace("+", ",")) for item in text.split(",")]
+
+
+def config_fields(config, settings):
+    # Only the count is tuned; the model keeps its own kind and devices.
+    group = (config.get("instance_group") or [{"kind": "KIND_CPU"}])[0]
+    fields = {
+        "instance_group": [dict(group, count=settings["instances"])],
+    }
+    if settings["max_batch_size"]:
+        max_batch_size = settings["max_batch_size"]
+        dynamic_batching = {
+            "max_queue_delay_microseconds": settings["max_queue_delay_microseconds"]
+        }
+        preferred = [size for size in settings["preferred_batch_size"] if size <= max_batch_size]
+        if preferred:
+            dynamic_batching["preferred_batch_size"] = preferred
+        fields["max_batch_size"] = max_batch_size
+        fields["dynamic_batching"] = dynamic_batching
+        # Warmup batches larger than max_batch_size would fail at load.
+        warmup = [
+            sample
+            for sample in config.get("model_warmup", [])
+            if int(sample.get("batch_size", 1)) <= max_batch_size
+        ]
+        if config.get("model_warmup"):
+            fields["model_warmup"] = warmup or None
+    return fields
+
+
+def measure(model_dir, config, settings, flags, tensors):
+    model_name = config["name"]
+    with tempfile.TemporaryDirectory() as model_repository:
+        copy = os.path.join(model_repository, model_name)
+        shutil.copytree(model_dir, copy)
+        write_model_config(copy, config_fields(config, settings))
+        inputs = make_inputs(config, tensors)
+        points = []
+        with ServerProcess(
+            model_repository, [model_name], flags.server_cmd, flags.http_port
+        ) as server:
+            for concurrency in flags.concurrency:
+                point = run_load(
+                    server.url,
+                    model_name,
+                    inputs,
+                    concurrency,
+                    duration_s=flags.duration,
+                    warmup_s=flags.warmup,
+                    rows_per_request=flags.rows_per_request,
+                )
+                points.append(point)
+                p99 = point["latency_ms"].get("p99", float("inf"))
+                if point["errors"] or p99 > flags.slo_p99_ms:
+                    break
+    within = [
+        point
+        for point in points
+        if not point["errors"]
+        and point["latency_ms"].get("p99", float("inf")) <= flags.slo_p99_ms
+    ]
+    best = max(within, key=lambda point: point["inferences_per_s"], default=None)
+    return {
+        "settings": settings,
+        "points": points,
+        "best": best,
+        "score": best["inferences_per_s"] if best else 0.0,
+    }
+
+
+def probe(model_dir, config, flags, tensors):
+    """Load the model as configured and send it one request; returns the error message or None."""
+    model_name = config["name"]
+    with tempfile.TemporaryDirectory() as model_repository:
+        shutil.copytree(model_dir, os.path.join(model_repository, model_name))
+        try:
+            with ServerProcess(
+                model_repository, [model_name], flags.server_cmd, flags.http_port
+            ) as server:
+                client = httpclient.InferenceServerClient(url=server.url)
+                try:
+                    client.infer(model_name, make_inputs(config, tensors))
+                finally:
+                    client.close()
+        except Exception as e:
+            return str(e)
+    return None
+
+
+def settings_key(settings):
+    return json.dumps(settings, sort_keys=True)
+
+
+def describe(settings):
+    return "instances={instances} max_batch_size={max_batch_size} delay_us=" \
+        "{max_queue_delay_microseconds} preferred={preferred_batch_size}".format(**settings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-repository", default="models")
+    parser.add_argument("-m", "--model", required=True, help="Model to tune.")
+    parser.add_argument("--slo-p99-ms", type=float, default=5.0)
+    parser.add_argument(
+        "--server-cmd",
+        default=STANDIN_SERVER_CMD,
+        help="Command that starts the server. {model_repository}, {http_port}, "
+        "{grpc_port} and {metrics_port} are substituted. Default starts the "
+        "local stand-in server; see triton_onnx_demo.benchmark.TRITON_SERVER_CMD.",
+    )
+    parser.add_argument("--http-port", type=int, default=18000)
+    parser.add_argument("--instances", type=int_list, default=[1, 2, 4])
+    parser.add_argument("--max-batch-sizes", type=int_list, default=[8, 32, 128, 512])
+    parser.add_argument(
+        "--queue-delays-us", type=int_list, default=[0, 100, 500, 1000, 2000]
+    )
+    parser.add_argument(
+        "--preferred-batch-sizes",
+        type=preferred_list,
+        default=[[], [4], [8, 16]],
+        help="Comma separated candidates; join sizes of one candidate with '+'. "
+        "Default is none,4,8+16.",
+    )
+    parser.add_argument(
+        "--concurrency", type=int_list, default=[1, 2, 4, 8, 16, 32, 64]
+    )
+    parser.add_argument("--rows-per-request", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=2.0)
+    parser.add_argument("--warmup", type=float, default=0.5)
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="JSON file for the measured curve. Default is "
+        "benchmarks/results/<model>_dynamic_batching.json.",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Do not update config.pbtxt."
+    )
+    FLAGS = parser.parse_args()
+
+    model_dir = os.path.join(FLAGS.model_repository, FLAGS.model)
+    config = load_model_config(model_dir)
+    if config.get("platform") == "ensemble":
+        print("{} is an ensemble; tune its composing models instead".format(FLAGS.model))
+        sys.exit(1)
+    tensors = request_tensors(model_dir, config, FLAGS.rows_per_request)
+    error = probe(model_dir, config, FLAGS, tensors)
+    if error is not None:
+        print("FAILED: a request to {} as configured fails, so no setting can be "
+              "measured: {}".format(FLAGS.model, error))
+        sys.exit(1)
+
+    dynamic_batching = config.get("dynamic_batching") or {}
+    best = {
+        "instances": instance_count(config),
+        "max_batch_size": config.get("max_batch_size", 0),
+        "max_queue_delay_microseconds": int(
+            dynamic_batching.get("max_queue_delay_microseconds", 0)
+        ),
+        "preferred_batch_size": [
+            int(size) for size in dynamic_batching.get("preferred_batch_size", [])
+        ],
+    }
+    dimensions = [("instances", FLAGS.instances)]
+    if supports_batching(config):
+        best["max_batch_size"] = min(
+            FLAGS.max_batch_sizes, key=lambda size: abs(size - best["max_batch_size"])
+        )
+        dimensions += [
+            ("max_batch_size", FLAGS.max_batch_sizes),
+            ("max_queue_delay_microseconds", FLAGS.queue_delays_us),
+            ("preferred_batch_size", FLAGS.preferred_batch_sizes),
+        ]
+
+    results = {}
+
+    def evaluate(settings):
+        key = settings_key(settings)
+        if key not in results:
+            try:
+                results[key] = measure(model_dir, config, settings, FLAGS, tensors)
+            except Exception as e:
+                print("{} failed: {}".format(describe(settings), e))
+                results[key] = {"settings": settings, "points": [], "best": None,
+                                "score": 0.0, "error": str(e)}
+            result = results[key]
+            errors = sum(point["errors"] for point in result["points"])
+            if result["best"]:
+                note = ""
+            elif errors or "error" in result:
+                note = "  ({} failed requests)".format(errors) if errors else "  (failed)"
+            else:
+                note = "  (SLO never met)"
+            print("{:<72} {:>10.1f} inf/s{}".format(
+                describe(settings), result["score"], note), flush=True)
+        return results[key]["score"]
+
+    best_score = evaluate(best)
+    for _ in range(FLAGS.rounds):
+        for name, values in dimensions:
+            for value in values:
+                candidate = dict(best, **{name: value})
+                score = evaluate(candidate)
+                if score > best_score:
+                    best, best_score = candidate, score
+
+    report = {
+        "model": FLAGS.model,
+        "time": time.time(),
+        "slo_p99_ms": FLAGS.slo_p99_ms,
+        "rows_per_request": FLAGS.rows_per_request,
+        "best": results[settings_key(best)],
+        "candidates": list(results.values()),
+    }
+    output = FLAGS.output or os.path.join(
+        "benchmarks", "results", "{}_dynamic_batching.json".format(FLAGS.model)
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if best_score == 0.0:
+        failed = [
+            result for result in results.values()
+            if "error" in result or any(point["errors"] for point in result["points"])
+        ]
+        print("no candidate met p99 <= {} ms ({} of {} had failed requests); "
+              "config left unchanged".format(FLAGS.slo_p99_ms, len(failed), len(results)))
+        sys.exit(1)
+    print("best: {} at {:.1f} inf/s".format(describe(best), best_score))
+    if not FLAGS.dry_run:
+        write_model_config(model_dir, config_fields(config, best))
+        print("updated {}".format(os.path.join(model_dir, "config.pbtxt")))
+    print("curve written to {}".format(output))
@@ -0,0 +1,62 @@
+"""Stand-in server throughput by number of pre-fork worker processes.
+
+For each ``--workers`` count the stand-in server is started on a copy of one
+model with ``--workers N`` and driven at ``--concurrency`` requests in flight.
+Each row gives throughput, p99 latency and the CPU cores the server process
+and its workers used, from ``/proc`` (Linux only). Throughput should grow with
+workers up to the number of free cores; leave some for the load generator,
+which runs in this process.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from triton_onnx_demo.benchmark import (
+    STANDIN_SERVER_CMD,
+    ServerProcess,
+    copy_models,
+    make_inputs,
+    process_cpu_seconds,
+    request_tensors,
+    run_load,
+)
+from triton_onnx_demo.model_config import load_model_config
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-repository", default="models")
+    parser.add_argument("-m", "--model", default="regression_classifier")
+    parser.add_argument("--workers", default="1,2,4", help="Comma separated worker counts.")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rows-per-request", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--http-port", type=int, default=18000)
+    FLAGS = parser.parse_args()
+
+    model_dir = os.path.join(FLAGS.model_repository, FLAGS.model)
+    config = load_model_config(model_dir)
+    inputs = make_inputs(config, request_tensors(model_dir, config, FLAGS.rows_per_request))
+    print("{} cores".format(os.cpu_count()))
+    print("{:>8} {:>12} {:>10} {:>8} {:>7}".format(
+        "workers", "infer/s", "p99 ms", "cores", "errors"))
+    with tempfile.TemporaryDirectory() as repository:
+        copy_models(FLAGS.model_repository, FLAGS.model, repository)
+        for workers in [int(value) for value in FLAGS.workers.split(",")]:
+            server_cmd = STANDIN_SERVER_CMD + " --workers {}".format(workers)
+            with ServerProcess(repository, [FLAGS.model], server_cmd,
+                               FLAGS.http_port) as server:
+                pid = server.process.pid
+                cpu_start = process_cpu_seconds(pid)
+                wall_start = time.perf_counter()
+                result = run_load(
+                    server.url, FLAGS.model, inputs, FLAGS.concurrency,
+                    duration_s=FLAGS.duration, warmup_s=FLAGS.warmup,
+                    rows_per_request=FLAGS.rows_per_request,
+                )
+                cores = (process_cpu_seconds(pid) - cpu_start) / (
+                    time.perf_counter() - wall_start)
+            print("{:>8} {:>12.0f} {:>10.2f} {:>8.2f} {:>7}".format(
+                workers, result["inferences_per_s"], result["latency_ms"].get("p99", 0.0),
+                cores, result["errors"]))
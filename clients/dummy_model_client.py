@@ -28,11 +28,6 @@
 import argparse
 import sys
 
-import gevent.ssl
-import numpy as np
-import tritonclient.http as httpclient
-from tritonclient.utils import InferenceServerException
-
 
 def test_infer(
     model_name,
@@ -46,10 +41,10 @@ def test_infer(
 ):
     inputs = []
     outputs = []
-    inputs.append(httpclient.InferInput("input_0", [1], "INT32"))
-    inputs.append(httpclient.InferInput("input_1", [1], "INT32"))
-    inputs.append(httpclient.InferInput("input_2", [1], "INT32"))
-    inputs.append(httpclient.InferInput("input_3", [1], "INT32"))
+    inputs.append(httpclient.InferInput("input_0", list(input0_data.shape), "INT32"))
+    inputs.append(httpclient.InferInput("input_1", list(input1_data.shape), "INT32"))
+    inputs.append(httpclient.InferInput("input_2", list(input2_data.shape), "INT32"))
+    inputs.append(httpclient.InferInput("input_3", list(input3_data.shape), "INT32"))
 
     # Initialize the data
     inputs[0].set_data_from_numpy(input0_data, binary_data=False)
@@ -83,10 +78,10 @@ def test_infer_no_outputs(
     response_compression_algorithm=None,
 ):
     inputs = []
-    inputs.append(httpclient.InferInput("input_0", [1], "INT32"))
-    inputs.append(httpclient.InferInput("input_1", [1], "INT32"))
-    inputs.append(httpclient.InferInput("input_2", [1], "INT32"))
-    inputs.append(httpclient.InferInput("input_3", [1], "INT32"))
+    inputs.append(httpclient.InferInput("input_0", list(input0_data.shape), "INT32"))
+    inputs.append(httpclient.InferInput("input_1", list(input1_data.shape), "INT32"))
+    inputs.append(httpclient.InferInput("input_2", list(input2_data.shape), "INT32"))
+    inputs.append(httpclient.InferInput("input_3", list(input3_data.shape), "INT32"))
 
     # Initialize the data
     inputs[0].set_data_from_numpy(input0_data, binary_data=False)
@@ -184,8 +179,32 @@ if __name__ == "__main__":
         default=None,
         help="The compression algorithm to be used when receiving response body from server. Default is None.",
     )
+    parser.add_argument(
+        "-m",
+        "--model-name",
+        type=str,
+        required=False,
+        default="onnx_test",
+        help="Model to query. Default is onnx_test.",
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        required=False,
+        default=0,
+        help="Send this many rows in one request, shaped [rows, 1], to a "
+        "batching model such as the dummy_model built by "
+        "model_builders/convert_tensorflow_model.py. Default is 0: one "
+        "unbatched row.",
+    )
 
     FLAGS = parser.parse_args()
+
+    # Imported once the arguments are parsed, so --help does not wait for them.
+    import numpy as np
+    import tritonclient.http as httpclient
+    from tritonclient.utils import InferenceServerException
+
     try:
         if FLAGS.ssl:
             ssl_options = {}
@@ -197,6 +216,8 @@ if __name__ == "__main__":
                 ssl_options["ca_certs"] = FLAGS.ca_certs
             ssl_context_factory = None
             if FLAGS.insecure:
+                import gevent.ssl
+
                 ssl_context_factory = gevent.ssl._create_unverified_context
             triton_client = httpclient.InferenceServerClient(
                 url=FLAGS.url,
@@ -214,7 +235,7 @@ if __name__ == "__main__":
         print("channel creation failed: " + str(e))
         sys.exit(1)
 
-    model_name = "onnx_test"
+    model_name = FLAGS.model_name
 
     # Create the data for the two input tensors. Initialize the first
     # to unique integers and the second to all ones.
@@ -222,6 +243,11 @@ if __name__ == "__main__":
     input1_data = np.array([3], dtype=np.int32)
     input2_data = np.array([5], dtype=np.int32)
     input3_data = np.array([6], dtype=np.int32)
+    if FLAGS.rows:
+        rows = np.arange(FLAGS.rows, dtype=np.int32).reshape(-1, 1)
+        input0_data, input1_data, input2_data, input3_data = (
+            rows + data for data in (input0_data, input1_data, input2_data, input3_data)
+        )
 
     if FLAGS.http_headers is not None:
         headers_dict = {l.split(":")[0]: l.split(":")[1] for l in FLAGS.http_headers}
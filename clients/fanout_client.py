@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+import argparse
+import sys
+
+from triton_onnx_demo.client import (
+    add_balancing_arguments,
+    add_connection_arguments,
+    add_fallback_arguments,
+    add_pool_arguments,
+    client_from_flags,
+    parse_headers,
+)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    add_connection_arguments(parser)
+    add_pool_arguments(parser)
+    add_balancing_arguments(parser)
+    add_fallback_arguments(parser)
+    parser.add_argument(
+        "-m",
+        "--model",
+        dest="models",
+        action="append",
+        help="Model to score, optionally as name:version. Repeatable. "
+        "Default is xgboost_model, scikit_learn_model and lightgbm_model.",
+    )
+    parser.add_argument(
+        "--data",
+        type=str,
+        default="data/lightgbm/regression.test",
+        help="Tab separated rows; column 0 is the label and is dropped.",
+    )
+    parser.add_argument("--rows", type=int, default=8, help="Number of rows to score.")
+    FLAGS = parser.parse_args()
+
+    # Imported once the arguments are parsed, so --help does not wait for them.
+    import pandas as pd
+
+    from triton_onnx_demo.fanout import FanOutScorer, parse_model_spec
+
+    models = FLAGS.models or ["xgboost_model", "scikit_learn_model", "lightgbm_model"]
+    features = pd.read_csv(FLAGS.data, header=None, sep="\t", nrows=FLAGS.rows)
+    features = features.drop(0, axis=1).to_numpy()
+
+    try:
+        triton_client = client_from_flags(
+            FLAGS,
+            model_names=[parse_model_spec(spec)[0] for spec in models],
+            concurrency=len(models),
+        )
+        scorer = FanOutScorer(
+            triton_client,
+            models,
+            headers=parse_headers(FLAGS.http_headers),
+            request_compression_algorithm=FLAGS.request_compression_algorithm,
+            response_compression_algorithm=FLAGS.response_compression_algorithm,
+        )
+    except Exception as e:
+        print("channel creation failed: " + str(e))
+        sys.exit(1)
+
+    result = scorer.score(features)
+    for model, outputs in sorted(result.outputs.items()):
+        for name, data in outputs.items():
+            print("{} {}: {}".format(model, name, data.ravel().tolist()))
+    print(result.report())
+    if hasattr(triton_client, "breaker"):
+        print("server {state}: {remote} remote, {local} local requests".format(
+            **triton_client.stats()))
+        triton_client = triton_client.client
+    if hasattr(triton_client, "replicas"):
+        for replica in triton_client.stats():
+            print("{url}: {state}, {requests} requests, {failures} failures".format(**replica))
+    if result.errors:
+        sys.exit(1)
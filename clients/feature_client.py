@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+import argparse
+import sys
+import time
+
+from triton_onnx_demo.client import (
+    add_connection_arguments,
+    add_fallback_arguments,
+    add_pool_arguments,
+    client_from_flags,
+    parse_headers,
+)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Score batches of IDs, looking their features up in a SQLite feature store."
+    )
+    add_connection_arguments(parser)
+    add_pool_arguments(parser)
+    add_fallback_arguments(parser)
+    parser.add_argument("-m", "--model", default="regression_classifier")
+    parser.add_argument("--model-version", default="")
+    parser.add_argument("--output", dest="outputs", action="append",
+                        help="Model output to return. Repeatable. Default is every output.")
+    parser.add_argument("--store", default="features.sqlite", help="SQLite feature store.")
+    parser.add_argument(
+        "--load",
+        default=None,
+        help="First store the rows of this tab separated file, without column 0, "
+        "under IDs 0, 1, 2 and so on.",
+    )
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--batches", type=int, default=100)
+    parser.add_argument("--cache-size", type=int, default=100000,
+                        help="Feature vectors to keep in memory; 0 disables the cache.")
+    parser.add_argument("--batch-window-ms", type=float, default=0.0,
+                        help="How long a lookup waits for others to share its store query.")
+    parser.add_argument("--seed", type=int, default=0)
+    FLAGS = parser.parse_args()
+
+    # Imported once the arguments are parsed, so --help does not wait for them.
+    import numpy as np
+    import pandas as pd
+
+    from triton_onnx_demo.feature_store import FeatureLookup, FeatureScorer, SQLiteFeatureStore
+
+    store = SQLiteFeatureStore(FLAGS.store)
+    if FLAGS.load:
+        rows = pd.read_csv(FLAGS.load, header=None, sep="\t").drop(0, axis=1).to_numpy()
+        store.put_many(enumerate(rows))
+        print("stored {} rows from {} in {}".format(len(rows), FLAGS.load, FLAGS.store))
+    count = len(store)
+    if count == 0:
+        print("{} is empty; fill it with --load".format(FLAGS.store))
+        sys.exit(1)
+
+    try:
+        triton_client = client_from_flags(FLAGS)
+        lookup = FeatureLookup(
+            store,
+            width=len(store.get_many([0])[0]),
+            cache_size=FLAGS.cache_size,
+            batch_window_s=FLAGS.batch_window_ms / 1000,
+        )
+        scorer = FeatureScorer(
+            triton_client,
+            FLAGS.model,
+            lookup,
+            model_version=FLAGS.model_version,
+            outputs=FLAGS.outputs,
+            headers=parse_headers(FLAGS.http_headers),
+            concurrency=FLAGS.concurrency,
+        )
+    except Exception as e:
+        print("channel creation failed: " + str(e))
+        sys.exit(1)
+
+    # IDs stored by --load are 0 to count - 1; skewed so that some repeat.
+    rng = np.random.default_rng(FLAGS.seed)
+    id_batches = [
+        (rng.zipf(1.3, FLAGS.batch_size) % count).tolist() for _ in range(FLAGS.batches)
+    ]
+    start = time.perf_counter()
+    rows = 0
+    for batch_rows, outputs in scorer.iter_results(id_batches):
+        if rows == 0:
+            for name, data in outputs.items():
+                print("{}: {}".format(name, data[:8].ravel().tolist()))
+        rows += batch_rows
+    elapsed = time.perf_counter() - start
+    print("{} rows in {:.3f} s ({:.0f} rows/s)".format(rows, elapsed, rows / elapsed))
+    print("lookup: {lookups} lookups, {hits} hits, {misses} misses, {evictions} evictions, "
+          "{backend_calls} store queries for {backend_keys} ids".format(**lookup.stats()))
+    store.close()
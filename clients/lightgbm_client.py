@@ -28,41 +28,15 @@
 import argparse
 import sys
 
-import gevent.ssl
-import numpy as np
-import tritonclient.http as httpclient
-from tritonclient.utils import InferenceServerException
-
 
 def test_infer(
     model_name,
-    input__0_data,
-    input__1_data,
-    input__2_data,
-    input__3_data,
-    input__4_data,
-    input__5_data,
+    inputs,
     headers=None,
     request_compression_algorithm=None,
     response_compression_algorithm=None,
 ):
-    inputs = []
     outputs = []
-    inputs.append(httpclient.InferInput("input__0", [1], "FP32"))
-    inputs.append(httpclient.InferInput("input__1", [1], "FP32"))
-    inputs.append(httpclient.InferInput("input__2", [1], "FP32"))
-    inputs.append(httpclient.InferInput("input__3", [1], "FP32"))
-    inputs.append(httpclient.InferInput("input__4", [1], "FP32"))
-    inputs.append(httpclient.InferInput("input__5", [1], "FP32"))
-
-    # Initialize the data
-    inputs[0].set_data_from_numpy(input__0_data, binary_data=False)
-    inputs[1].set_data_from_numpy(input__1_data, binary_data=False)
-    inputs[2].set_data_from_numpy(input__2_data, binary_data=False)
-    inputs[3].set_data_from_numpy(input__3_data, binary_data=False)
-    inputs[4].set_data_from_numpy(input__4_data, binary_data=False)
-    inputs[5].set_data_from_numpy(input__5_data, binary_data=False)
-
     outputs.append(httpclient.InferRequestedOutput("output__0", binary_data=False))
     results = triton_client.infer(
         model_name,
@@ -78,33 +52,11 @@ def test_infer(
 
 def test_infer_no_outputs(
     model_name,
-    input__0_data,
-    input__1_data,
-    input__2_data,
-    input__3_data,
-    input__4_data,
-    input__5_data,
+    inputs,
     headers=None,
     request_compression_algorithm=None,
     response_compression_algorithm=None,
 ):
-    inputs = []
-    inputs.append(httpclient.InferInput("input__0", [1], "FP32"))
-    inputs.append(httpclient.InferInput("input__1", [1], "FP32"))
-    inputs.append(httpclient.InferInput("input__2", [1], "FP32"))
-    inputs.append(httpclient.InferInput("input__3", [1], "FP32"))
-    inputs.append(httpclient.InferInput("input__4", [1], "FP32"))
-    inputs.append(httpclient.InferInput("input__5", [1], "FP32"))
-
-    # Initialize the data
-    inputs[0].set_data_from_numpy(input__0_data, binary_data=False)
-    inputs[1].set_data_from_numpy(input__0_data, binary_data=False)
-    inputs[2].set_data_from_numpy(input__0_data, binary_data=False)
-    inputs[3].set_data_from_numpy(input__0_data, binary_data=False)
-    inputs[4].set_data_from_numpy(input__0_data, binary_data=False)
-    inputs[5].set_data_from_numpy(input__0_data, binary_data=False)
-
-
     results = triton_client.infer(
         model_name,
         inputs,
@@ -196,6 +148,13 @@ if __name__ == "__main__":
     )
 
     FLAGS = parser.parse_args()
+
+    # Imported once the arguments are parsed, so --help does not wait for them.
+    import tritonclient.http as httpclient
+    from tritonclient.utils import InferenceServerException
+
+    from triton_onnx_demo.request_plan import RequestPlan
+
     try:
         if FLAGS.ssl:
             ssl_options = {}
@@ -207,6 +166,8 @@ if __name__ == "__main__":
                 ssl_options["ca_certs"] = FLAGS.ca_certs
             ssl_context_factory = None
             if FLAGS.insecure:
+                import gevent.ssl
+
                 ssl_context_factory = gevent.ssl._create_unverified_context
             triton_client = httpclient.InferenceServerClient(
                 url=FLAGS.url,
@@ -226,29 +187,35 @@ if __name__ == "__main__":
 
     model_name = "lightgbm_model"
 
-    # Create the data for the two input tensors. Initialize the first
-    # to unique integers and the second to all ones.
-    input__0_data = np.array([0.644], dtype=np.float32)
-    input__1_data = np.array([0.247], dtype=np.float32)
-    input__2_data = np.array([-0.447], dtype=np.float32)
-    input__3_data = np.array([0.862], dtype=np.float32)
-    input__4_data = np.array([0.374], dtype=np.float32)
-    input__5_data = np.array([0.854], dtype=np.float32)
-
     if FLAGS.http_headers is not None:
         headers_dict = {l.split(":")[0]: l.split(":")[1] for l in FLAGS.http_headers}
     else:
         headers_dict = None
 
+    # One scalar FP32 input per feature; the plan checks names, count and types
+    # once here, and every request below reuses the same inputs.
+    try:
+        plan = RequestPlan.from_client(
+            triton_client, model_name, headers=headers_dict, binary_data=False
+        )
+        inputs = plan.inputs(
+            {
+                "input__0": 0.644,
+                "input__1": 0.247,
+                "input__2": -0.447,
+                "input__3": 0.862,
+                "input__4": 0.374,
+                "input__5": 0.854,
+            }
+        )
+    except (InferenceServerException, ValueError) as e:
+        print("FAILED: building the request: " + str(e))
+        sys.exit(1)
+
     # Infer with requested Outputs
     results = test_infer(
         model_name,
-        input__0_data,
-        input__1_data,
-        input__2_data,
-        input__3_data,
-        input__4_data,
-        input__5_data,
+        inputs,
         headers_dict,
         FLAGS.request_compression_algorithm,
         FLAGS.response_compression_algorithm,
@@ -264,17 +231,12 @@ if __name__ == "__main__":
         sys.exit(1)
 
     # Validate the results by comparing with precomputed values.
-    output__0_data = results.as_numpy("output_0")
+    output__0_data = results.as_numpy("output__0")
 
     # Infer without requested Outputs
     results = test_infer_no_outputs(
         model_name,
-        input__0_data,
-        input__1_data,
-        input__2_data,
-        input__3_data,
-        input__4_data,
-        input__5_data,
+        inputs,
         headers_dict,
         FLAGS.request_compression_algorithm,
         FLAGS.response_compression_algorithm,
@@ -286,7 +248,7 @@ if __name__ == "__main__":
 
     # Infer with incorrect model name
     try:
-        _ = test_infer("wrong_model_name", input__0_data, input__1_data, input__2_data, input__3_data, input__4_data, input__5_data, ).get_response()
+        _ = test_infer("wrong_model_name", inputs).get_response()
         print("expected error message for wrong model name")
         sys.exit(1)
     except InferenceServerException as ex:
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+import argparse
+import sys
+import time
+
+from triton_onnx_demo.client import (
+    add_connection_arguments,
+    add_fallback_arguments,
+    add_pool_arguments,
+    client_from_flags,
+)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    add_connection_arguments(parser)
+    add_pool_arguments(parser)
+    add_fallback_arguments(parser)
+    parser.add_argument("-m", "--model", default="regression_classifier")
+    parser.add_argument("--model-version", default="")
+    parser.add_argument(
+        "--data",
+        default="data/lightgbm/regression.test",
+        help="Tab separated rows without a header, or a .parquet file.",
+    )
+    parser.add_argument(
+        "--columns",
+        default=None,
+        help="Comma separated names for the columns of tab separated data, which "
+        "has no header. Columns are then dropped and matched to the model's "
+        "features by name.",
+    )
+    parser.add_argument(
+        "--features",
+        default=None,
+        help="Comma separated columns to score, in the model's feature order. "
+        "Default matches columns by name when the model's inputs are named "
+        "features, otherwise by position.",
+    )
+    parser.add_argument(
+        "--drop-column",
+        dest="drop_columns",
+        action="append",
+        help="Column to leave out, such as the label. Repeatable. Default is "
+        "column 0 for tab separated data.",
+    )
+    parser.add_argument("--output", default=None, help="Model output to return.")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--write", default=None, help="Write the predictions as CSV.")
+    FLAGS = parser.parse_args()
+
+    # Imported once the arguments are parsed, so --help does not wait for them.
+    import pandas as pd
+
+    from triton_onnx_demo.dataframe import FramePredictor
+
+    if FLAGS.data.endswith(".parquet"):
+        frame = pd.read_parquet(FLAGS.data)
+        drop = FLAGS.drop_columns or []
+    else:
+        frame = pd.read_csv(FLAGS.data, header=None, sep="\t")
+        if FLAGS.columns:
+            names = FLAGS.columns.split(",")
+            if len(names) != len(frame.columns):
+                print("--columns names {} columns; {} has {}".format(
+                    len(names), FLAGS.data, len(frame.columns)))
+                sys.exit(1)
+            frame.columns = names
+            drop = FLAGS.drop_columns or names[:1]
+        else:
+            drop = [int(column) for column in FLAGS.drop_columns or [0]]
+    try:
+        frame = frame.drop(columns=drop)
+    except KeyError as e:
+        print("cannot drop columns: " + str(e))
+        sys.exit(1)
+
+    try:
+        triton_client = client_from_flags(FLAGS)
+        predictor = FramePredictor(
+            triton_client,
+            FLAGS.model,
+            FLAGS.model_version,
+            columns=FLAGS.features.split(",") if FLAGS.features else None,
+            output=FLAGS.output,
+            batch_size=FLAGS.batch_size,
+            concurrency=FLAGS.concurrency,
+        )
+    except Exception as e:
+        print("channel creation failed: " + str(e))
+        sys.exit(1)
+
+    start = time.perf_counter()
+    try:
+        predictions = predictor.predict(frame)
+    except ValueError as e:
+        print("scoring failed: " + str(e))
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    print(predictions.head())
+    print("{} rows in {:.3f} s ({:.0f} rows/s)".format(
+        len(frame), elapsed, len(frame) / elapsed))
+    if hasattr(triton_client, "breaker"):
+        print("server {state}: {remote} remote, {local} local requests".format(
+            **triton_client.stats()))
+    if FLAGS.write:
+        predictions.to_csv(FLAGS.write)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+import argparse
+import json
+import sys
+
+from triton_onnx_demo.client import add_connection_arguments, client_from_flags, parse_headers
+from triton_onnx_demo.model_config import normalize_server_config
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    add_connection_arguments(parser)
+    parser.add_argument("-m", "--model", default="xgboost_model")
+    parser.add_argument("--primary-version", default="1")
+    parser.add_argument("--candidate-version", default="2")
+    parser.add_argument(
+        "--candidate-url",
+        default=None,
+        help="Server hosting the candidate version. Default is --url.",
+    )
+    parser.add_argument(
+        "--sample-rate",
+        type=float,
+        default=0.1,
+        help="Fraction of requests mirrored to the candidate. Default is 0.1.",
+    )
+    parser.add_argument(
+        "--data",
+        default="data/lightgbm/regression.test",
+        help="Tab separated rows; column 0 is the label and is dropped.",
+    )
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    FLAGS = parser.parse_args()
+
+    # Imported once the arguments are parsed, so --help does not wait for them.
+    import pandas as pd
+
+    from triton_onnx_demo.request_plan import RequestPlan
+    from triton_onnx_demo.shadow import ShadowClient
+
+    try:
+        triton_client = client_from_flags(FLAGS)
+        candidate_flags = argparse.Namespace(**vars(FLAGS))
+        if FLAGS.candidate_url:
+            candidate_flags.url = FLAGS.candidate_url
+        candidate_client = client_from_flags(candidate_flags, concurrency=4)
+        headers_dict = parse_headers(FLAGS.http_headers)
+        config = normalize_server_config(
+            triton_client.get_model_config(FLAGS.model, FLAGS.primary_version)
+        )
+    except Exception as e:
+        print("channel creation failed: " + str(e))
+        sys.exit(1)
+
+    shadow = ShadowClient(
+        triton_client,
+        candidate_client,
+        FLAGS.model,
+        FLAGS.primary_version,
+        FLAGS.candidate_version,
+        sample_rate=FLAGS.sample_rate,
+    )
+
+    features = pd.read_csv(FLAGS.data, header=None, sep="\t", nrows=FLAGS.rows)
+    plan = RequestPlan(config)
+    features = features.drop(0, axis=1).to_numpy()[:, : plan.width]
+    for inputs in plan.requests(features):
+        shadow.infer(
+            inputs,
+            headers=headers_dict,
+            request_compression_algorithm=FLAGS.request_compression_algorithm,
+            response_compression_algorithm=FLAGS.response_compression_algorithm,
+        )
+    shadow.drain()
+
+    if FLAGS.json:
+        print(json.dumps(shadow.report.as_dict(), indent=2))
+    else:
+        print(shadow.report.format())
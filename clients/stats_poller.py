@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+import argparse
+import sys
+
+from triton_onnx_demo.client import add_connection_arguments, client_from_flags
+
+
+class _PrintSink:
+    def emit(self, sample):
+        print(format_sample(sample), flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    add_connection_arguments(parser)
+    parser.add_argument(
+        "-m",
+        "--model",
+        dest="models",
+        action="append",
+        help="Model to poll. Repeatable. Default is every loaded model.",
+    )
+    parser.add_argument(
+        "-i", "--interval", type=float, default=1.0, help="Seconds between polls."
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=None,
+        help="Stop after this many seconds. Default is to run until interrupted.",
+    )
+    parser.add_argument(
+        "--jsonl-file", default=None, help="Append one JSON line per model and interval."
+    )
+    parser.add_argument(
+        "--idle", action="store_true", help="Also report intervals with no requests."
+    )
+    FLAGS = parser.parse_args()
+
+    # Imported once the arguments are parsed, so --help does not wait for them.
+    import gevent
+
+    from triton_onnx_demo.stats_poller import JsonLinesSeries, StatsPoller, format_sample
+
+    sinks = [_PrintSink()]
+    if FLAGS.jsonl_file:
+        sinks.append(JsonLinesSeries(open(FLAGS.jsonl_file, "a")))
+
+    try:
+        triton_client = client_from_flags(FLAGS)
+        poller = StatsPoller(
+            triton_client,
+            FLAGS.interval,
+            sinks,
+            models=FLAGS.models,
+            emit_idle=FLAGS.idle,
+        ).start()
+    except Exception as e:
+        print("channel creation failed: " + str(e))
+        sys.exit(1)
+
+    try:
+        if FLAGS.duration:
+            gevent.sleep(FLAGS.duration)
+        else:
+            gevent.wait()
+    except KeyboardInterrupt:
+        pass
+    poller.stop()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+import argparse
+import sys
+
+from triton_onnx_demo.client import (
+    add_connection_arguments,
+    add_pool_arguments,
+    client_from_flags,
+    parse_headers,
+    pool_stats,
+)
+from triton_onnx_demo.model_config import normalize_server_config
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    add_connection_arguments(parser)
+    add_pool_arguments(parser)
+    parser.add_argument("-m", "--model", default="xgboost_model")
+    parser.add_argument("--model-version", default="")
+    parser.add_argument(
+        "--data",
+        default="data/lightgbm/regression.test",
+        help="Tab separated rows; column 0 is the label and is dropped.",
+    )
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument(
+        "--prometheus-file",
+        default=None,
+        help="Write phase histograms in Prometheus text format to this file.",
+    )
+    parser.add_argument(
+        "--jsonl-file", default=None, help="Append one JSON line per request to this file."
+    )
+    parser.add_argument(
+        "--otel", action="store_true", help="Record phases with OpenTelemetry metrics."
+    )
+    parser.add_argument(
+        "--stats-interval",
+        type=float,
+        default=None,
+        help="Seconds between inference statistics samples used for server time "
+        "when the server sends no Server-Timing header.",
+    )
+    parser.add_argument("--no-trace", action="store_true", help="Disable tracing.")
+    FLAGS = parser.parse_args()
+
+    # Imported once the arguments are parsed, so --help does not wait for them.
+    import pandas as pd
+    import tritonclient.http as httpclient
+
+    from triton_onnx_demo.request_plan import RequestPlan
+    from triton_onnx_demo.tracing import (
+        JsonLinesSink,
+        OpenTelemetrySink,
+        PrometheusTextSink,
+        RequestTracer,
+        SummarySink,
+        TracedClient,
+    )
+
+    summary = SummarySink()
+    sinks = [summary]
+    if FLAGS.prometheus_file:
+        sinks.append(PrometheusTextSink(FLAGS.prometheus_file))
+    if FLAGS.jsonl_file:
+        sinks.append(JsonLinesSink(open(FLAGS.jsonl_file, "a")))
+    if FLAGS.otel:
+        sinks.append(OpenTelemetrySink())
+    tracer = RequestTracer(sinks, enabled=not FLAGS.no_trace)
+
+    try:
+        triton_client = TracedClient(
+            client_from_flags(FLAGS), tracer, stats_interval_s=FLAGS.stats_interval
+        )
+        headers_dict = parse_headers(FLAGS.http_headers)
+        config = normalize_server_config(
+            triton_client.get_model_config(FLAGS.model, FLAGS.model_version)
+        )
+    except Exception as e:
+        print("channel creation failed: " + str(e))
+        sys.exit(1)
+
+    outputs = [
+        httpclient.InferRequestedOutput(output["name"], binary_data=True)
+        for output in config["output"]
+    ]
+    features = pd.read_csv(FLAGS.data, header=None, sep="\t", nrows=FLAGS.rows)
+    plan = RequestPlan(config)
+    features = features.drop(0, axis=1).to_numpy()[:, : plan.width]
+    for inputs in plan.requests(features):
+        triton_client.infer(
+            FLAGS.model,
+            inputs,
+            model_version=FLAGS.model_version,
+            outputs=outputs,
+            headers=headers_dict,
+            request_compression_algorithm=FLAGS.request_compression_algorithm,
+            response_compression_algorithm=FLAGS.response_compression_algorithm,
+        )
+
+    tracer.flush()
+    if tracer.enabled:
+        print(summary.format())
+    print(pool_stats(triton_client).format())
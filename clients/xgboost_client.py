@@ -28,11 +28,6 @@
 import argparse
 import sys
 
-import gevent.ssl
-import numpy as np
-import tritonclient.http as httpclient
-from tritonclient.utils import InferenceServerException
-
 
 def test_infer(
     model_name,
@@ -167,6 +162,12 @@ if __name__ == "__main__":
     )
 
     FLAGS = parser.parse_args()
+
+    # Imported once the arguments are parsed, so --help does not wait for them.
+    import numpy as np
+    import tritonclient.http as httpclient
+    from tritonclient.utils import InferenceServerException
+
     try:
         if FLAGS.ssl:
             ssl_options = {}
@@ -178,6 +179,8 @@ if __name__ == "__main__":
                 ssl_options["ca_certs"] = FLAGS.ca_certs
             ssl_context_factory = None
             if FLAGS.insecure:
+                import gevent.ssl
+
                 ssl_context_factory = gevent.ssl._create_unverified_context
             triton_client = httpclient.InferenceServerClient(
                 url=FLAGS.url,
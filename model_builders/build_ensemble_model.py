@@ -0,0 +1,124 @@
+import os
+
+import numpy as np
+import onnxruntime as rt
+import pandas as pd
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import FloatTensorType
+from sklearn.impute import SimpleImputer
+from sklearn.metrics import accuracy_score
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from xgboost import XGBClassifier
+
+from triton_onnx_demo.model_config import format_model_config
+
+MODEL_REPOSITORY = 'models'
+PREPROCESS_MODEL = 'regression_preprocess'
+CLASSIFIER_MODEL = 'regression_classifier'
+ENSEMBLE_MODEL = 'regression_ensemble'
+MAX_BATCH_SIZE = 256
+
+
+def tensor(name, dims, data_type='TYPE_FP32'):
+    return {'name': name, 'data_type': data_type, 'dims': dims}
+
+
+def write_config(model_name, config):
+    model_dir = os.path.join(MODEL_REPOSITORY, model_name)
+    os.makedirs(os.path.join(model_dir, '1'), exist_ok=True)
+    with open(os.path.join(model_dir, 'config.pbtxt'), 'w') as f:
+        f.write(format_model_config(config))
+    return model_dir
+
+
+def build_model():
+    # regression.train has a binary label in column 0 and 28 features.
+    df_train = pd.read_csv('data/lightgbm/regression.train', header=None, sep='\t')
+    df_test = pd.read_csv('data/lightgbm/regression.test', header=None, sep='\t')
+    y_train, y_test = df_train[0].to_numpy(), df_test[0].to_numpy()
+    X_train = df_train.drop(0, axis=1).to_numpy(dtype=np.float32)
+    X_test = df_test.drop(0, axis=1).to_numpy(dtype=np.float32)
+    n_features = X_train.shape[1]
+
+    # Preprocessing and the tree model are trained together so the classifier
+    # sees exactly what the ONNX preprocessing step produces at serve time.
+    pipeline = Pipeline([
+        ('impute', SimpleImputer(strategy='median')),
+        ('scale', StandardScaler()),
+        ('classifier', XGBClassifier(n_estimators=50, max_depth=4, objective='binary:logistic')),
+    ])
+    pipeline.fit(X_train, y_train)
+    print(f'Test Accuracy: {accuracy_score(y_test, pipeline.predict(X_test)) * 100.0:.2f}')
+
+    # Preprocessing step: the sklearn transformers exported as one ONNX graph.
+    preprocess = Pipeline(pipeline.steps[:-1])
+    onx = convert_sklearn(
+        preprocess,
+        initial_types=[('input__0', FloatTensorType([None, n_features]))],
+        final_types=[('features', FloatTensorType([None, n_features]))],
+    )
+    preprocess_dir = write_config(PREPROCESS_MODEL, {
+        'name': PREPROCESS_MODEL,
+        'backend': 'onnxruntime',
+        'max_batch_size': MAX_BATCH_SIZE,
+        'input': [tensor('input__0', [n_features])],
+        'output': [tensor('features', [n_features])],
+        'instance_group': [{'count': 1, 'kind': 'KIND_CPU'}],
+    })
+    with open(os.path.join(preprocess_dir, '1', 'model.onnx'), 'wb') as f:
+        f.write(onx.SerializeToString())
+
+    # Tree step: a FIL model over the preprocessed features.
+    classifier_dir = write_config(CLASSIFIER_MODEL, {
+        'name': CLASSIFIER_MODEL,
+        'backend': 'fil',
+        'max_batch_size': MAX_BATCH_SIZE,
+        'input': [tensor('input__0', [n_features])],
+        'output': [tensor('output__0', [1])],
+        'instance_group': [{'count': 1, 'kind': 'KIND_CPU'}],
+        'parameters': [
+            {'key': 'model_type', 'value': {'string_value': 'xgboost_json'}},
+            {'key': 'output_class', 'value': {'string_value': 'true'}},
+            {'key': 'threshold', 'value': {'string_value': '0.5'}},
+        ],
+    })
+    classifier = pipeline.named_steps['classifier']
+    classifier.save_model(os.path.join(classifier_dir, '1', 'xgboost.json'))
+
+    # The ensemble wires raw features through both steps inside the server.
+    ensemble_dir = write_config(ENSEMBLE_MODEL, {
+        'name': ENSEMBLE_MODEL,
+        'platform': 'ensemble',
+        'max_batch_size': MAX_BATCH_SIZE,
+        'input': [tensor('input__0', [n_features])],
+        'output': [tensor('output__0', [1])],
+        'ensemble_scheduling': {
+            'step': [
+                {
+                    'model_name': PREPROCESS_MODEL,
+                    'model_version': -1,
+                    'input_map': [{'key': 'input__0', 'value': 'input__0'}],
+                    'output_map': [{'key': 'features', 'value': 'preprocessed'}],
+                },
+                {
+                    'model_name': CLASSIFIER_MODEL,
+                    'model_version': -1,
+                    'input_map': [{'key': 'input__0', 'value': 'preprocessed'}],
+                    'output_map': [{'key': 'output__0', 'value': 'output__0'}],
+                },
+            ]
+        },
+    })
+    # Triton needs a version directory for ensembles even though it stays empty.
+    open(os.path.join(ensemble_dir, '1', '.gitkeep'), 'w').close()
+
+    # Check the exported preprocessing matches sklearn.
+    sess = rt.InferenceSession(os.path.join(preprocess_dir, '1', 'model.onnx'), providers=['CPUExecutionProvider'])
+    features = sess.run(['features'], {'input__0': X_test})[0]
+    np.testing.assert_allclose(features, preprocess.transform(X_test), rtol=1e-4, atol=1e-4)
+    print('ONNX preprocessing matches sklearn')
+
+
+if __name__ == '__main__':
+    build_model()
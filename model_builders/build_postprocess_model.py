@@ -0,0 +1,229 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import onnx
+import onnxruntime as rt
+from onnx import TensorProto, helper
+
+from triton_onnx_demo.model_config import format_model_config, load_model_config
+
+OPSET = 17
+ML_OPSET = 2
+# Probabilities are clipped this far from 0 and 1 before taking the logit.
+EPSILON = 1e-7
+
+
+def tensor(name, dims, data_type='TYPE_FP32'):
+    return {'name': name, 'data_type': data_type, 'dims': dims}
+
+
+def probabilities_output(config, name=None):
+    """The classifier's ``[..., classes]`` probability output: ``name`` or the only FP32 one."""
+    candidates = [output for output in config['output']
+                  if output['data_type'] == 'TYPE_FP32' and output['dims'][-1] > 1]
+    if name is not None:
+        candidates = [output for output in config['output'] if output['name'] == name]
+    if len(candidates) != 1:
+        raise ValueError(f'{config["name"]}: pick the probability output with --probabilities-output '
+                         f'from {[output["name"] for output in config["output"]]}')
+    return candidates[0]
+
+
+def build_graph(num_classes, top_k, threshold, platt, positive_class, class_names):
+    """ONNX graph from ``probabilities`` to the top-k classes and, for two classes, a score and label.
+
+    ``score`` is the positive class probability after Platt scaling,
+    ``sigmoid(a * logit(p) + b)``; ``(1, 0)`` leaves it unchanged. ``label`` is
+    ``score >= threshold``. With ``class_names`` the top-k classes are names.
+    """
+    nodes = [helper.make_node('TopK', ['probabilities', 'k'], ['top_k_scores', 'top_k_indices'], axis=1)]
+    initializers = [helper.make_tensor('k', TensorProto.INT64, [1], [top_k])]
+    outputs = [helper.make_tensor_value_info('top_k_scores', TensorProto.FLOAT, ['N', top_k])]
+    if class_names:
+        nodes.append(helper.make_node(
+            'LabelEncoder', ['top_k_indices'], ['top_k_classes'], domain='ai.onnx.ml',
+            keys_int64s=list(range(num_classes)), values_strings=class_names, default_string=''))
+        outputs.append(helper.make_tensor_value_info('top_k_classes', TensorProto.STRING, ['N', top_k]))
+    else:
+        nodes.append(helper.make_node('Identity', ['top_k_indices'], ['top_k_classes']))
+        outputs.append(helper.make_tensor_value_info('top_k_classes', TensorProto.INT64, ['N', top_k]))
+    if num_classes == 2:
+        a, b = platt
+        initializers.extend([
+            helper.make_tensor('positive_class', TensorProto.INT64, [], [positive_class]),
+            helper.make_tensor('epsilon', TensorProto.FLOAT, [], [EPSILON]),
+            helper.make_tensor('one_minus_epsilon', TensorProto.FLOAT, [], [1 - EPSILON]),
+            helper.make_tensor('one', TensorProto.FLOAT, [], [1.0]),
+            helper.make_tensor('platt_a', TensorProto.FLOAT, [], [a]),
+            helper.make_tensor('platt_b', TensorProto.FLOAT, [], [b]),
+            helper.make_tensor('threshold', TensorProto.FLOAT, [], [threshold]),
+        ])
+        nodes.extend([
+            helper.make_node('Gather', ['probabilities', 'positive_class'], ['positive'], axis=1),
+            helper.make_node('Clip', ['positive', 'epsilon', 'one_minus_epsilon'], ['clipped']),
+            helper.make_node('Sub', ['one', 'clipped'], ['negative']),
+            helper.make_node('Div', ['clipped', 'negative'], ['odds']),
+            helper.make_node('Log', ['odds'], ['logit']),
+            helper.make_node('Mul', ['logit', 'platt_a'], ['scaled']),
+            helper.make_node('Add', ['scaled', 'platt_b'], ['shifted']),
+            helper.make_node('Sigmoid', ['shifted'], ['score']),
+            helper.make_node('GreaterOrEqual', ['score', 'threshold'], ['above']),
+            helper.make_node('Cast', ['above'], ['label'], to=TensorProto.INT64),
+        ])
+        outputs.extend([
+            helper.make_tensor_value_info('score', TensorProto.FLOAT, ['N']),
+            helper.make_tensor_value_info('label', TensorProto.INT64, ['N']),
+        ])
+    graph = helper.make_graph(
+        nodes, 'postprocess',
+        [helper.make_tensor_value_info('probabilities', TensorProto.FLOAT, ['N', num_classes])],
+        outputs, initializers)
+    model = helper.make_model(graph, opset_imports=[
+        helper.make_opsetid('', OPSET), helper.make_opsetid('ai.onnx.ml', ML_OPSET)])
+    onnx.checker.check_model(model)
+    return model
+
+
+def reference(probabilities, top_k, threshold, platt, positive_class, class_names):
+    """The graph's outputs computed with NumPy, to check the export against."""
+    indices = np.argsort(-probabilities, axis=1, kind='stable')[:, :top_k]
+    expected = {
+        'top_k_scores': np.take_along_axis(probabilities, indices, axis=1),
+        'top_k_classes': np.array(class_names, dtype=object)[indices] if class_names else indices,
+    }
+    if probabilities.shape[1] == 2:
+        p = np.clip(probabilities[:, positive_class].astype(np.float64), EPSILON, 1 - EPSILON)
+        score = 1 / (1 + np.exp(-(platt[0] * np.log(p / (1 - p)) + platt[1])))
+        expected['score'] = score
+        expected['label'] = (score >= threshold).astype(np.int64)
+    return expected
+
+
+def check_graph(model, num_classes, top_k, flags, class_names, rows=1000, seed=0):
+    probabilities = np.random.default_rng(seed).dirichlet(np.ones(num_classes), size=rows).astype(np.float32)
+    session = rt.InferenceSession(model.SerializeToString(), providers=['CPUExecutionProvider'])
+    names = [output.name for output in session.get_outputs()]
+    got = dict(zip(names, session.run(names, {'probabilities': probabilities})))
+    expected = reference(probabilities, top_k, flags.threshold, flags.platt, flags.positive_class,
+                         class_names)
+    np.testing.assert_allclose(got['top_k_scores'], expected['top_k_scores'])
+    if 'score' in expected:
+        np.testing.assert_allclose(got['score'], expected['score'], rtol=1e-4, atol=1e-5)
+        # Scores within float rounding of the threshold may land either side.
+        clear = np.abs(expected['score'] - flags.threshold) > 1e-5
+        np.testing.assert_array_equal(got['label'][clear], expected['label'][clear])
+    # Ties between equal probabilities may be ordered either way.
+    distinct = np.all(np.diff(np.sort(probabilities, axis=1), axis=1) > 0, axis=1)
+    np.testing.assert_array_equal(got['top_k_classes'][distinct], expected['top_k_classes'][distinct])
+
+
+def write_config(model_repository, model_name, config):
+    model_dir = os.path.join(model_repository, model_name)
+    os.makedirs(os.path.join(model_dir, '1'), exist_ok=True)
+    with open(os.path.join(model_dir, 'config.pbtxt'), 'w') as f:
+        f.write(format_model_config(config))
+    return model_dir
+
+
+def build_postprocess(flags):
+    config = load_model_config(os.path.join(flags.model_repository, flags.model))
+    source = probabilities_output(config, flags.probabilities_output)
+    num_classes = source['dims'][-1]
+    class_names = flags.class_names.split(',') if flags.class_names else None
+    if class_names and len(class_names) != num_classes:
+        raise ValueError(f'{len(class_names)} class names for {num_classes} classes')
+    if not 0 <= flags.positive_class < num_classes:
+        raise ValueError(f'--positive-class {flags.positive_class} is not a class of a {num_classes} class model')
+    top_k = min(flags.top_k, num_classes)
+    model = build_graph(num_classes, top_k, flags.threshold, flags.platt, flags.positive_class, class_names)
+    check_graph(model, num_classes, top_k, flags, class_names)
+    print(f'{flags.model}: post-processing matches NumPy')
+
+    # Keep the classifier's layout: a leading -1 for unbatched models, none with batching.
+    batched = config.get('max_batch_size', 0) > 0
+    rows = [] if batched else [-1]
+    outputs = [
+        tensor('top_k_classes', rows + [top_k], 'TYPE_STRING' if class_names else 'TYPE_INT64'),
+        tensor('top_k_scores', rows + [top_k]),
+    ]
+    if num_classes == 2:
+        score = tensor('score', [-1])
+        label = tensor('label', [-1], 'TYPE_INT64')
+        if batched:
+            # One value per row: the graph's [N] is [N, 1] to Triton.
+            score = dict(score, dims=[1], reshape={'shape': []})
+            label = dict(label, dims=[1], reshape={'shape': []})
+        outputs.extend([score, label])
+    postprocess_name = f'{flags.model}_postprocess'
+    postprocess_dir = write_config(flags.model_repository, postprocess_name, {
+        'name': postprocess_name,
+        'backend': 'onnxruntime',
+        'max_batch_size': config.get('max_batch_size', 0),
+        'input': [tensor('probabilities', rows + [num_classes])],
+        'output': outputs,
+        'instance_group': [{'count': 1, 'kind': 'KIND_CPU'}],
+    })
+    onnx.save(model, os.path.join(postprocess_dir, '1', 'model.onnx'))
+
+    # The ensemble runs the classifier and the post-processing in the server,
+    # so callers can request only the outputs they use.
+    ensemble_name = f'{flags.model}_scored'
+    ensemble_dir = write_config(flags.model_repository, ensemble_name, {
+        'name': ensemble_name,
+        'platform': 'ensemble',
+        'max_batch_size': config.get('max_batch_size', 0),
+        'input': [tensor(i['name'], i['dims'], i['data_type']) for i in config['input']],
+        'output': outputs,
+        'ensemble_scheduling': {
+            'step': [
+                {
+                    'model_name': flags.model,
+                    'model_version': -1,
+                    'input_map': [{'key': i['name'], 'value': i['name']} for i in config['input']],
+                    'output_map': [{'key': source['name'], 'value': 'probabilities'}],
+                },
+                {
+                    'model_name': postprocess_name,
+                    'model_version': -1,
+                    'input_map': [{'key': 'probabilities', 'value': 'probabilities'}],
+                    'output_map': [{'key': output['name'], 'value': output['name']} for output in outputs],
+                },
+            ]
+        },
+    })
+    # Triton needs a version directory for ensembles even though it stays empty.
+    open(os.path.join(ensemble_dir, '1', '.gitkeep'), 'w').close()
+    print(f'wrote {postprocess_dir} and {ensemble_dir}')
+
+
+def platt_coefficients(text):
+    a, b = (float(value) for value in text.split(','))
+    return a, b
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Append a post-processing step to a classifier as an ensemble.')
+    parser.add_argument('--model-repository', default='models')
+    parser.add_argument('--model', dest='models', action='append',
+                        help='Classifier to post-process. Repeatable. Default is xgboost_model and scikit_learn_model.')
+    parser.add_argument('--probabilities-output', default=None,
+                        help='Output holding the class probabilities. Default is the only FP32 one with several classes.')
+    parser.add_argument('--top-k', type=int, default=1)
+    parser.add_argument('--threshold', type=float, default=0.5, help='label is 1 when score is at least this.')
+    parser.add_argument('--platt', type=platt_coefficients, default=(1.0, 0.0),
+                        help='Platt scaling "a,b" for score: sigmoid(a * logit(p) + b). Default 1,0 keeps p.')
+    parser.add_argument('--positive-class', type=int, default=1)
+    parser.add_argument('--class-names', default=None, help='Comma separated names to return as top_k_classes.')
+    FLAGS = parser.parse_args()
+    ok = True
+    for model in FLAGS.models or ['xgboost_model', 'scikit_learn_model']:
+        FLAGS.model = model
+        try:
+            build_postprocess(FLAGS)
+        except (AssertionError, ValueError) as e:
+            print(f'{model}: FAILED: {e}')
+            ok = False
+    if not ok:
+        sys.exit(1)
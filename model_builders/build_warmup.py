@@ -0,0 +1,66 @@
+import argparse
+import os
+import sys
+
+import pandas as pd
+from sklearn.datasets import load_diabetes, load_iris, make_classification
+
+from triton_onnx_demo.model_config import list_model_dirs, load_model_config, model_versions
+from triton_onnx_demo.warmup import build_model_warmup
+
+
+def load_regression_rows():
+    df_train = pd.read_csv('data/lightgbm/regression.train', header=None, sep='\t')
+    return df_train.drop(0, axis=1).to_numpy()
+
+
+def load_scikit_learn_rows():
+    # Same generator settings as build_scikit_learn_model.py.
+    x, _ = make_classification(n_samples=1000, n_features=4, n_informative=2, n_redundant=0, random_state=0, shuffle=False)
+    return x
+
+
+# The data each model was trained on; anything else falls back to regression.train.
+TRAINING_DATA = {
+    'xgboost_model': lambda: load_iris()['data'],
+    'scikit_learn_model': load_scikit_learn_rows,
+    'diabetes_example': lambda: load_diabetes()['data'],
+    'diabetes_model': lambda: load_diabetes()['data'],
+}
+
+
+def build_warmup(model_repository, model_names=None, count=1):
+    """Returns False if a model listed in TRAINING_DATA does not match its data."""
+    ok = True
+    for model_dir in list_model_dirs(model_repository):
+        model_name = os.path.basename(model_dir)
+        if model_names and model_name not in model_names:
+            continue
+        if load_model_config(model_dir).get('platform') == 'ensemble':
+            print(f'Skipping {model_name}: Triton does not warm up ensembles')
+            continue
+        if not model_versions(model_dir):
+            print(f'Skipping {model_name}: no version directory')
+            continue
+        rows = TRAINING_DATA.get(model_name, load_regression_rows)()
+        try:
+            entries = build_model_warmup(model_dir, rows, count=count)
+        except ValueError as e:
+            if model_name in TRAINING_DATA:
+                print(f'{model_name}: FAILED: {e}')
+                ok = False
+            else:
+                print(f'Skipping {model_name}: {e}')
+            continue
+        print(f'{model_name}: warmup batch sizes {[e["batch_size"] for e in entries]}')
+    return ok
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model-repository', default='models')
+    parser.add_argument('--model', dest='models', action='append', help='Only build warmup for this model. Repeatable.')
+    parser.add_argument('--count', type=int, default=1, help='Times Triton runs each warmup sample.')
+    FLAGS = parser.parse_args()
+    if not build_warmup(FLAGS.model_repository, FLAGS.models, FLAGS.count):
+        sys.exit(1)
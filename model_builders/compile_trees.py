@@ -0,0 +1,127 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from triton_onnx_demo.model_config import list_model_dirs, load_model_config, model_versions
+from triton_onnx_demo.server.backends import BackendError, fil_model_file, library_predictor
+from triton_onnx_demo.tree_compiler import (
+    COMPILED_DIR,
+    CompiledForest,
+    compile_model,
+    read_manifest,
+    write_manifest,
+)
+from triton_onnx_demo.trees import load_forest
+
+
+def parity_rows(forest, rows, seed=0):
+    """Random rows spanning every feature's split thresholds, with NaNs and zeros."""
+    rng = np.random.default_rng(seed)
+    low = np.full(forest.num_features, -1.0)
+    high = np.full(forest.num_features, 1.0)
+    internal = forest.left != -1
+    for feature in range(forest.num_features):
+        thresholds = forest.threshold[internal & (forest.feature == feature)]
+        if len(thresholds):
+            margin = 0.1 * (thresholds.max() - thresholds.min()) + 0.01
+            low[feature] = thresholds.min() - margin
+            high[feature] = thresholds.max() + margin
+    data = rng.uniform(low, high, size=(rows, forest.num_features)).astype(np.float32)
+    data[rng.random(data.shape) < 0.05] = np.nan
+    data[rng.random(data.shape) < 0.03] = 0.0
+    return data
+
+
+def single_row_us(predict, row, repeat):
+    predict(row)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        predict(row)
+        timings.append(time.perf_counter_ns() - start)
+    return np.median(timings) / 1000
+
+
+def compile_version(version_dir, model_type, file_name, flags):
+    source_path = os.path.join(version_dir, file_name)
+    forest = load_forest(source_path)
+    build_dir = tempfile.mkdtemp(prefix='.compiled-', dir=version_dir)
+    try:
+        start = time.perf_counter()
+        manifest = compile_model(source_path, build_dir, cc=flags.cc)
+        print(f'  {manifest["num_trees"]} trees compiled in {time.perf_counter() - start:.2f} s with {manifest["compiler"]}')
+        compiled = CompiledForest(build_dir)
+        rows = parity_rows(forest, flags.rows)
+        try:
+            native = library_predictor(model_type, source_path)
+        except Exception as e:
+            native = None
+            reason = (str(e).strip().splitlines() or [repr(e)])[0]
+            if not flags.no_check:
+                print(f'  FAILED: no native library to check against: {reason}')
+                return False
+            print(f'  unchecked: {reason}')
+        if native is not None:
+            difference = float(np.max(np.abs(native(rows) - compiled.predict(rows))))
+            print(f'  max abs difference over {flags.rows} rows: {difference:.3g}')
+            if difference > flags.tolerance and not flags.no_check:
+                print(f'  FAILED: above tolerance {flags.tolerance:g}')
+                return False
+            manifest['parity'] = {'rows': flags.rows, 'max_abs_difference': difference}
+            row = rows[:1]
+            print(f'  single row: compiled {single_row_us(compiled.predict, row, flags.repeat):.1f} us, '
+                  f'native {single_row_us(native, row, flags.repeat):.1f} us')
+        write_manifest(build_dir, manifest)
+        destination = os.path.join(version_dir, COMPILED_DIR)
+        shutil.rmtree(destination, ignore_errors=True)
+        os.replace(build_dir, destination)
+        print(f'  wrote {os.path.join(destination, read_manifest(destination)["library"])}')
+        return True
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+
+def compile_trees(model_repository, model_names, flags):
+    ok = True
+    for model_dir in list_model_dirs(model_repository):
+        config = load_model_config(model_dir)
+        model_name = config['name']
+        if model_names and model_name not in model_names:
+            continue
+        if config.get('backend') != 'fil':
+            continue
+        try:
+            model_type, file_name = fil_model_file(config)
+        except BackendError as e:
+            print(f'Skipping {model_name}: {e}')
+            continue
+        if model_type == 'xgboost':
+            print(f'Skipping {model_name}: binary xgboost.model; save it as xgboost.json to compile it')
+            continue
+        for version in model_versions(model_dir):
+            print(f'{model_name} version {version}:')
+            try:
+                ok = compile_version(os.path.join(model_dir, str(version)), model_type, file_name, flags) and ok
+            except (OSError, RuntimeError, ValueError) as e:
+                print(f'  FAILED: {e}')
+                ok = False
+    return ok
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compile FIL models into native libraries in <version>/compiled/.')
+    parser.add_argument('--model-repository', default='models')
+    parser.add_argument('--model', dest='models', action='append', help='Only compile this model. Repeatable.')
+    parser.add_argument('--cc', default=None, help='C compiler. Default is $CC, then cc.')
+    parser.add_argument('--rows', type=int, default=10000, help='Rows to compare against the native library.')
+    parser.add_argument('--tolerance', type=float, default=1e-5, help='Largest allowed difference from the native library.')
+    parser.add_argument('--repeat', type=int, default=2000, help='Single-row predictions to time.')
+    parser.add_argument('--no-check', action='store_true', help='Install even if the outputs cannot be checked or differ.')
+    FLAGS = parser.parse_args()
+    if not compile_trees(FLAGS.model_repository, FLAGS.models, FLAGS):
+        sys.exit(1)
@@ -0,0 +1,166 @@
+import argparse
+import os
+import shutil
+import sys
+
+import numpy as np
+import onnx
+import onnxruntime as rt
+
+from triton_onnx_demo.model_config import format_model_config, load_model_config, numpy_dtype
+
+
+def load_signature(model_dir, version):
+    import tensorflow as tf
+
+    imported = tf.saved_model.load(os.path.join(model_dir, str(version), 'model.savedmodel'))
+    # The signature only reaches the variables through ``imported``; keep both.
+    return imported, imported.signatures['serving_default']
+
+
+def check_names(signature, config):
+    _, specs = signature.structured_input_signature
+    inputs = {model_input['name'] for model_input in config['input']}
+    outputs = {output['name'] for output in config['output']}
+    if inputs != set(specs) or outputs != set(signature.structured_outputs):
+        raise ValueError(f'config.pbtxt tensors {sorted(inputs)} -> {sorted(outputs)} do not match the '
+                         f'serving signature {sorted(specs)} -> {sorted(signature.structured_outputs)}')
+
+
+def batched_function(signature, config):
+    """A tf.function over a batch of rows, each row one call of ``signature``.
+
+    Tensors are shaped ``[batch] + dims`` with the dims from ``config``, so a row
+    is exactly what the unbatched model took and returned. ``tf.vectorized_map``
+    rewrites the per-call ops into batched ones instead of looping over rows.
+    """
+    import tensorflow as tf
+
+    _, specs = signature.structured_input_signature
+    names = [model_input['name'] for model_input in config['input']]
+    output_dims = {output['name']: output['dims'] for output in config['output']}
+
+    def row(tensors):
+        feeds = {name: tf.reshape(tensor, specs[name].shape) for name, tensor in zip(names, tensors)}
+        results = signature(**feeds)
+        return {name: tf.reshape(results[name], dims) for name, dims in output_dims.items()}
+
+    @tf.function(input_signature=[
+        tf.TensorSpec([None, *model_input['dims']], specs[model_input['name']].dtype, name=model_input['name'])
+        for model_input in config['input']
+    ])
+    def batched(*tensors):
+        return tf.vectorized_map(row, tensors)
+
+    return batched
+
+
+def rename_tensors(model, names):
+    """Rename graph inputs and outputs per ``names``, and the nodes that use them."""
+    for value in list(model.graph.input) + list(model.graph.output):
+        value.name = names.get(value.name, value.name)
+    for node in model.graph.node:
+        node.input[:] = [names.get(name, name) for name in node.input]
+        node.output[:] = [names.get(name, name) for name in node.output]
+
+
+def convert(function, config, opset):
+    import tf2onnx
+
+    model, _ = tf2onnx.convert.from_function(function, input_signature=function.input_signature, opset=opset)
+    # tf2onnx names tensors after the graph (``input_0:0``, ``Identity:0``).
+    # Inputs keep the signature's order; dict outputs are flattened by sorted key.
+    names = dict(zip([value.name for value in model.graph.input],
+                     [model_input['name'] for model_input in config['input']]))
+    names.update(zip([value.name for value in model.graph.output],
+                     sorted(output['name'] for output in config['output'])))
+    rename_tensors(model, names)
+    onnx.checker.check_model(model)
+    return model
+
+
+def random_rows(config, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    batch = {}
+    for model_input in config['input']:
+        dtype = numpy_dtype(model_input['data_type'])
+        shape = [rows, *model_input['dims']]
+        if np.issubdtype(dtype, np.integer):
+            batch[model_input['name']] = rng.integers(-1000, 1000, size=shape, dtype=dtype)
+        else:
+            batch[model_input['name']] = rng.standard_normal(shape).astype(dtype)
+    return batch
+
+
+def max_difference(signature, session, config, rows):
+    """Largest difference between TensorFlow, one call per row, and onnxruntime on whole batches."""
+    import tensorflow as tf
+
+    _, specs = signature.structured_input_signature
+    names = [output['name'] for output in config['output']]
+    batch = random_rows(config, rows)
+    worst = 0.0
+    for size in (1, rows):
+        feeds = {name: values[:size] for name, values in batch.items()}
+        outputs = dict(zip(names, session.run(names, feeds)))
+        for i in range(size):
+            expected = signature(**{name: tf.reshape(values[i], specs[name].shape) for name, values in feeds.items()})
+            for name in names:
+                got = outputs[name][i]
+                difference = np.abs(expected[name].numpy().reshape(got.shape).astype(np.float64) - got)
+                worst = max(worst, float(np.max(difference, initial=0.0)))
+    return worst
+
+
+def onnx_config(config, name, max_batch_size):
+    return {
+        'name': name,
+        'backend': 'onnxruntime',
+        'max_batch_size': max_batch_size,
+        'input': config['input'],
+        'output': config['output'],
+        'instance_group': [{'count': 1, 'kind': 'KIND_CPU'}],
+        'dynamic_batching': {},
+    }
+
+
+def convert_model(flags):
+    config = load_model_config(flags.model_dir)
+    if config.get('max_batch_size', 0):
+        print(f'{config["name"]} already batches; only unbatched models are converted')
+        return False
+    imported, signature = load_signature(flags.model_dir, flags.version)
+    check_names(signature, config)
+    model = convert(batched_function(signature, config), config, flags.opset)
+    session = rt.InferenceSession(model.SerializeToString(), providers=['CPUExecutionProvider'])
+    difference = max_difference(signature, session, config, flags.rows)
+    print(f'max abs difference from TensorFlow over {flags.rows} rows: {difference:.3g}')
+    if difference > flags.tolerance:
+        print(f'FAILED: above tolerance {flags.tolerance:g}')
+        return False
+
+    output_dir = os.path.join(flags.output_repository, flags.name)
+    version_dir = os.path.join(output_dir, str(flags.version))
+    shutil.rmtree(version_dir, ignore_errors=True)
+    os.makedirs(version_dir)
+    onnx.save(model, os.path.join(version_dir, 'model.onnx'))
+    with open(os.path.join(output_dir, 'config.pbtxt'), 'w') as f:
+        f.write(format_model_config(onnx_config(config, flags.name, flags.max_batch_size)))
+    print(f'wrote {version_dir}/model.onnx with max_batch_size {flags.max_batch_size}')
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert an unbatched TensorFlow SavedModel to a batched ONNX model.')
+    parser.add_argument('--model-dir', default='models-non-in-use/dummy_model',
+                        help='Model directory with config.pbtxt and <version>/model.savedmodel.')
+    parser.add_argument('--version', type=int, default=1)
+    parser.add_argument('--output-repository', default='models')
+    parser.add_argument('--name', default='dummy_model', help='Name of the converted model.')
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--opset', type=int, default=15)
+    parser.add_argument('--rows', type=int, default=1000, help='Random rows to compare against TensorFlow.')
+    parser.add_argument('--tolerance', type=float, default=0.0, help='Largest allowed difference from TensorFlow.')
+    FLAGS = parser.parse_args()
+    if not convert_model(FLAGS):
+        sys.exit(1)
@@ -1,10 +1,16 @@
+import sys
+
 import tensorflow as tf
+# Registers the TF-DF ops that decision forest SavedModels use.
 import tensorflow_decision_forests as tfdf
 
 
-def load_model():
-    imported = tf.saved_model.load('failed-models/toy_model/1/model.savedmodel')
+def load_model(path='models-non-in-use/dummy_model/1/model.savedmodel'):
+    imported = tf.saved_model.load(path)
+    signature = imported.signatures['serving_default']
+    print(signature.structured_input_signature)
+    print(signature.structured_outputs)
 
 
 if __name__ == '__main__':
-    load_model()
+    load_model(*sys.argv[1:])
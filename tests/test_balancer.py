@@ -0,0 +1,154 @@
+"""Replica choice, ejection and return in ``BalancedClient``."""
+import time
+
+import pytest
+from tritonclient.utils import InferenceServerException
+
+from triton_onnx_demo.balancer import BalancedClient
+
+
+class FakeClient:
+    """Answers ``infer`` with its URL, or raises ``error`` when one is set."""
+
+    def __init__(self, url):
+        self.url = url
+        self.error = None
+        self.ready = True
+        self.model_ready = True
+        self.calls = 0
+
+    def infer(self, model_name, inputs, **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.url
+
+    def is_server_ready(self):
+        return self.ready
+
+    def is_model_ready(self, model_name):
+        return self.model_ready
+
+    def close(self):
+        pass
+
+
+def balanced(urls=("a", "b", "c"), **kwargs):
+    """A balancer without a health loop, and its request and health clients by URL."""
+    clients = {}
+    health = {}
+
+    def factory(url, **options):
+        created = FakeClient(url)
+        if "concurrency" in options:
+            health[url] = created
+        else:
+            clients[url] = created
+        return created
+
+    kwargs.setdefault("health_interval_s", 0)
+    client = BalancedClient(list(urls), client_factory=factory, seed=0, **kwargs)
+    return client, clients, health
+
+
+def replica(client, url):
+    return next(replica for replica in client.replicas if replica.url == url)
+
+
+def server_error(status="503"):
+    return InferenceServerException(msg="unavailable", status=status)
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        balanced(policy="random")
+
+
+def test_round_robin_cycles_through_replicas():
+    client, _, _ = balanced(policy="round_robin")
+    assert [client.infer("m", []) for _ in range(6)] == ["b", "c", "a", "b", "c", "a"]
+
+
+@pytest.mark.parametrize("policy", ["least_outstanding", "p2c"])
+def test_busy_replica_is_avoided(policy):
+    client, _, _ = balanced(urls=("a", "b"), policy=policy)
+    replica(client, "a").outstanding = 5
+    assert {client.infer("m", []) for _ in range(20)} == {"b"}
+
+
+def send(client, requests):
+    """Results of ``requests`` calls, with errors as values."""
+    results = []
+    for _ in range(requests):
+        try:
+            results.append(client.infer("m", []))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def test_consecutive_failures_eject_a_replica():
+    client, clients, _ = balanced(urls=("a", "b"), policy="round_robin", failure_threshold=3)
+    clients["a"].error = server_error()
+    send(client, 6)
+    assert clients["a"].calls == 3
+    assert replica(client, "a").ejected
+    assert send(client, 10) == ["b"] * 10
+
+
+def test_client_errors_do_not_eject():
+    client, clients, _ = balanced(urls=("a", "b"), policy="round_robin", failure_threshold=3)
+    clients["a"].error = server_error("400")
+    send(client, 20)
+    assert not replica(client, "a").ejected
+
+
+def test_repeated_ejections_double_up_to_the_maximum():
+    client, _, _ = balanced(ejection_s=1.0, max_ejection_s=3.0)
+    durations = []
+    for _ in range(4):
+        client.eject(replica(client, "a"))
+        durations.append(replica(client, "a").ejected_until - time.monotonic())
+        client._return(replica(client, "a"), time.monotonic())
+    assert [round(duration) for duration in durations] == [1, 2, 3, 3]
+
+
+def test_health_check_ejects_a_replica_without_the_model():
+    client, _, health = balanced(model_names=["m"])
+    health["b"].model_ready = False
+    client.check_health()
+    assert [r["state"] for r in client.stats()] == ["healthy", "ejected", "healthy"]
+    assert set(send(client, 20)) == {"a", "c"}
+
+
+def test_ejected_replica_returns_with_slow_start():
+    client, _, health = balanced(urls=("a", "b"), ejection_s=0.01, slow_start_s=60)
+    health["a"].ready = False
+    client.check_health()
+    health["a"].ready = True
+    client.check_health()
+    # Still ejected until ejection_s has passed.
+    assert replica(client, "a").ejected
+    time.sleep(0.02)
+    client.check_health()
+    assert replica(client, "a").as_dict()["state"] == "returning"
+    # At the start of the ramp "a" counts as ten times as loaded as "b".
+    replica(client, "b").outstanding = 5
+    assert set(send(client, 20)) == {"b"}
+
+
+def test_returning_replica_is_ejected_on_its_first_failure():
+    client, clients, _ = balanced(urls=("a", "b"), policy="round_robin", ejection_s=0.01)
+    client.eject(replica(client, "a"))
+    time.sleep(0.02)
+    client.check_health()
+    clients["a"].error = server_error()
+    send(client, 2)
+    assert replica(client, "a").ejected
+
+
+def test_requests_go_out_when_every_replica_is_ejected():
+    client, _, _ = balanced(ejection_s=60)
+    for r in client.replicas:
+        client.eject(r)
+    assert set(send(client, 30)) == {"a", "b", "c"}
@@ -0,0 +1,15 @@
+"""``--help`` of every CLI command must not import heavy modules.
+
+The pytest form of ``benchmarks/import_time_check.py``, without its timing limit.
+"""
+import pytest
+
+from benchmarks.import_time_check import HEAVY_MODULES, measure
+from triton_onnx_demo.cli import COMMANDS
+
+
+@pytest.mark.parametrize("command", [None, *COMMANDS])
+def test_help_imports_no_heavy_modules(command):
+    args = ["--help"] if command is None else [command, "--help"]
+    _, _, modules = measure(args, repeat=1)
+    assert sorted(module for module in HEAVY_MODULES if module in modules) == []
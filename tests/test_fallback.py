@@ -0,0 +1,126 @@
+"""Circuit breaker states and local fallback in ``FallbackClient``."""
+import os
+import time
+
+import pytest
+from tritonclient.utils import InferenceServerException, np_to_triton_dtype
+
+from triton_onnx_demo.artifacts import ArtifactStore
+from triton_onnx_demo.benchmark import request_tensors
+from triton_onnx_demo.fallback import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    FallbackClient,
+    LocalEngine,
+)
+from triton_onnx_demo.model_config import load_model_config
+from triton_onnx_demo.request_plan import ArrayInput
+
+MODEL_REPOSITORY = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models")
+
+
+def trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record(failed=True)
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, open_s=60)
+    breaker.record(failed=True)
+    breaker.record(failed=True)
+    breaker.record(latency_s=0.01)
+    assert breaker.state == CLOSED
+    trip(breaker)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_latency_breaches_count_as_failures():
+    breaker = CircuitBreaker(failure_threshold=2, latency_threshold_s=0.1, open_s=60)
+    breaker.record(latency_s=0.5)
+    breaker.record(latency_s=0.5)
+    assert breaker.state == OPEN
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success():
+    breaker = CircuitBreaker(failure_threshold=1, open_s=0.01)
+    trip(breaker)
+    time.sleep(0.02)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time.
+    assert not breaker.allow()
+    breaker.record(latency_s=0.001)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_for_twice_as_long():
+    breaker = CircuitBreaker(failure_threshold=1, open_s=0.05, max_open_s=0.08)
+    trip(breaker)
+    for open_for_s in (0.08, 0.08):
+        time.sleep(max(0.0, breaker._open_until - time.monotonic()))
+        assert breaker.allow()
+        breaker.record(failed=True)
+        assert breaker.state == OPEN
+        assert breaker._open_until - time.monotonic() == pytest.approx(open_for_s, abs=0.01)
+    assert breaker.trips == 3
+
+
+class Server:
+    def __init__(self):
+        self.error = None
+        self.calls = 0
+
+    def infer(self, model_name, inputs, **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return "remote"
+
+
+class Engine:
+    def infer(self, model_name, inputs, **kwargs):
+        return "local"
+
+
+def test_fallback_client_scores_locally_while_the_breaker_is_open():
+    server = Server()
+    client = FallbackClient(server, Engine(), failure_threshold=2, open_s=60)
+    assert client.infer("m", []) == "remote"
+    server.error = InferenceServerException(msg="unavailable", status="503")
+    assert [client.infer("m", []) for _ in range(2)] == ["local", "local"]
+    assert client.breaker.state == OPEN
+    calls = server.calls
+    assert client.infer("m", []) == "local"
+    assert server.calls == calls
+    assert client.stats()["fallbacks"] == 2
+
+
+def test_client_errors_are_raised_not_scored_locally():
+    server = Server()
+    server.error = InferenceServerException(msg="bad input", status="400")
+    client = FallbackClient(server, Engine(), failure_threshold=1)
+    with pytest.raises(InferenceServerException):
+        client.infer("m", [])
+    assert client.breaker.state == CLOSED
+
+
+@pytest.mark.parametrize("model_name", ["scikit_learn_model", "regression_classifier"])
+def test_local_engine_scores_array_inputs(model_name, tmp_path):
+    model_dir = os.path.join(MODEL_REPOSITORY, model_name)
+    config = load_model_config(model_dir)
+    inputs = []
+    for name, data in request_tensors(model_dir, config, 3).items():
+        infer_input = ArrayInput(name, list(data.shape), np_to_triton_dtype(data.dtype))
+        infer_input.set_data_from_numpy(data)
+        inputs.append(infer_input)
+    engine = LocalEngine(MODEL_REPOSITORY, fil_engine="numpy",
+                         artifacts=ArtifactStore(str(tmp_path)))
+    result = engine.infer(model_name, inputs)
+    for output in config["output"]:
+        assert result.as_numpy(output["name"]) is not None
+        assert result.get_output(output["name"])["shape"][0] == inputs[0].shape()[0]
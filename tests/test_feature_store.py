@@ -0,0 +1,88 @@
+"""Caching and batched backend calls in ``FeatureLookup``."""
+import gevent
+import numpy as np
+import pytest
+
+from triton_onnx_demo.feature_store import FeatureLookup, LRUCache, SQLiteFeatureStore
+
+
+class Backend:
+    """Vector ``[key, key]`` for every key below ``size``; records each call."""
+
+    def __init__(self, size=100, error=None):
+        self.size = size
+        self.error = error
+        self.calls = []
+
+    def get_many(self, keys):
+        self.calls.append(sorted(keys))
+        if self.error is not None:
+            raise self.error
+        return {key: np.full(2, key, np.float32) for key in keys if key < self.size}
+
+
+def lookup_together(lookup, key_lists):
+    greenlets = [gevent.spawn(lookup.lookup, keys) for keys in key_lists]
+    gevent.joinall(greenlets)
+    return greenlets
+
+
+def test_concurrent_misses_share_one_backend_call():
+    backend = Backend()
+    lookup = FeatureLookup(backend, width=2)
+    greenlets = lookup_together(lookup, [[1, 2], [2, 3], [4]])
+    assert backend.calls == [[1, 2, 3, 4]]
+    np.testing.assert_array_equal(greenlets[1].value, [[2, 2], [3, 3]])
+
+
+def test_batch_window_gathers_later_misses():
+    backend = Backend()
+    lookup = FeatureLookup(backend, width=2, batch_window_s=0.05)
+    first = gevent.spawn(lookup.lookup, [1])
+    gevent.sleep(0.01)
+    second = gevent.spawn(lookup.lookup, [2])
+    gevent.joinall([first, second])
+    assert backend.calls == [[1, 2]]
+
+
+def test_cached_rows_skip_the_backend():
+    backend = Backend()
+    lookup = FeatureLookup(backend, width=2)
+    lookup.lookup([1, 2])
+    out = np.zeros((4, 2), np.float32)
+    rows = lookup.lookup([2, 1, 2], out)
+    assert backend.calls == [[1, 2]]
+    np.testing.assert_array_equal(out[:3, 0], [2, 1, 2])
+    assert np.shares_memory(rows, out)
+    assert lookup.stats()["hits"] == 3
+
+
+def test_missing_ids_raise_unless_there_is_a_default():
+    with pytest.raises(ValueError, match=r"no features for ids \[500\]"):
+        FeatureLookup(Backend(), width=2).lookup([1, 500])
+    rows = FeatureLookup(Backend(), width=2, default=[0, -1]).lookup([1, 500])
+    np.testing.assert_array_equal(rows, [[1, 1], [0, -1]])
+
+
+def test_backend_error_reaches_every_waiting_lookup():
+    lookup = FeatureLookup(Backend(error=OSError("store down")), width=2)
+    greenlets = lookup_together(lookup, [[1], [2]])
+    assert all(isinstance(greenlet.exception, OSError) for greenlet in greenlets)
+
+
+def test_lru_cache_evicts_the_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert (cache.get("b"), cache.get("a"), cache.evictions) == (None, 1, 1)
+
+
+def test_sqlite_store_round_trips_vectors(tmp_path):
+    with SQLiteFeatureStore(str(tmp_path / "features.db")) as store:
+        store.put_many((key, [key, key + 0.5]) for key in range(1500))
+        assert len(store) == 1500
+        found = store.get_many(list(range(0, 1500, 3)) + [9999])
+    assert len(found) == 500
+    np.testing.assert_array_equal(found[3], np.array([3, 3.5], np.float32))
@@ -0,0 +1,44 @@
+"""Every FIL model in models/ returns one output row per input row."""
+import os
+
+import numpy as np
+import pytest
+
+from triton_onnx_demo.benchmark import request_tensors
+from triton_onnx_demo.model_config import list_model_dirs, load_model_config, supports_batching
+from triton_onnx_demo.server.backends import BackendError, shape_output
+from triton_onnx_demo.server.repository import ModelRepository
+
+MODEL_REPOSITORY = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models")
+FIL_MODELS = [
+    os.path.basename(model_dir)
+    for model_dir in list_model_dirs(MODEL_REPOSITORY)
+    if load_model_config(model_dir).get("backend") == "fil"
+]
+
+
+@pytest.fixture(scope="module", params=["auto", "numpy"])
+def repository(request):
+    return ModelRepository(MODEL_REPOSITORY, FIL_MODELS, fil_engine=request.param)
+
+
+@pytest.mark.parametrize("model_name", FIL_MODELS)
+def test_output_rows_match_input_rows(repository, model_name):
+    if model_name in repository.errors():
+        pytest.skip(repository.errors()[model_name])
+    model_dir = os.path.join(MODEL_REPOSITORY, model_name)
+    config = load_model_config(model_dir)
+    for rows in (1, 2, 7) if supports_batching(config) else (1,):
+        tensors = request_tensors(model_dir, config, rows)
+        input_rows = next(iter(tensors.values())).shape[0]
+        outputs = repository.infer(model_name, tensors)
+        for name, data in outputs.items():
+            assert data.shape[0] == input_rows, (name, data.shape)
+
+
+def test_shape_output_rejects_extra_values_per_row():
+    config = {"name": "m", "max_batch_size": 8}
+    output = {"name": "output__0", "dims": [1], "data_type": "TYPE_FP32"}
+    assert shape_output(config, output, np.zeros(3)).shape == (3, 1)
+    with pytest.raises(BackendError):
+        shape_output(config, output, np.zeros((3, 2)))
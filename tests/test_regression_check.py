@@ -0,0 +1,48 @@
+"""Per-repeat comparisons of ``benchmarks/regression_check.py``."""
+import argparse
+
+from benchmarks.regression_check import compare_level
+
+FLAGS = argparse.Namespace(p99_threshold=0.10, throughput_threshold=0.10, alpha=0.01)
+
+
+def level(p99s, throughputs, errors=0):
+    return {"p99s": p99s, "throughputs": throughputs, "errors": errors}
+
+
+def regressed(baseline, current):
+    return {metric: bad for metric, _, bad in compare_level(baseline, current, FLAGS)}
+
+
+def test_noise_between_repeats_is_not_a_regression():
+    # Repeats differ by more than the threshold, but the runs overlap.
+    baseline = level([10.0, 12.5, 9.5, 11.8, 10.2], [1000, 900, 1050, 980, 1010])
+    current = level([11.9, 10.1, 12.4, 9.8, 12.2], [910, 1040, 950, 990, 920])
+    assert regressed(baseline, current) == {"p99": False, "throughput": False}
+
+
+def test_consistent_shift_is_a_regression():
+    baseline = level([10.0, 10.3, 9.9, 10.1, 10.2], [1000, 1010, 990, 1005, 995])
+    current = level([13.0, 13.2, 12.9, 13.1, 13.3], [800, 810, 790, 805, 795])
+    assert regressed(baseline, current) == {"p99": True, "throughput": True}
+
+
+def test_shift_below_the_threshold_is_not_a_regression():
+    baseline = level([10.0, 10.1, 10.0, 10.1, 10.0], [1000, 1001, 1000, 1001, 1000])
+    current = level([10.5, 10.6, 10.5, 10.6, 10.5], [960, 961, 960, 961, 960])
+    assert regressed(baseline, current) == {"p99": False, "throughput": False}
+
+
+def test_failed_repeats_and_errors_regress():
+    baseline = level([10.0, 10.1], [1000, 1000])
+    current = level([None, None], [0.0, 0.0], errors=12)
+    assert regressed(baseline, current) == {"errors": True, "p99": True, "throughput": True}
+
+
+def test_schema_1_baseline_asks_for_a_new_baseline():
+    baseline = {"throughputs": [1000, 1000], "errors": 0, "samples_ms": [10.0] * 100}
+    current = level([20.0, 20.0], [1000, 1000])
+    findings = {metric: (detail, bad) for metric, detail, bad in compare_level(baseline, current, FLAGS)}
+    assert findings["p99"] == (
+        "baseline has no per-repeat p99s; run with --update-baseline", False
+    )
@@ -0,0 +1,105 @@
+"""Validation and packing of features in ``RequestPlan``."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from triton_onnx_demo.request_plan import ArrayInput, RequestPlan
+
+# One [4] input, up to 8 rows per request.
+VECTOR = {
+    "name": "vector",
+    "max_batch_size": 8,
+    "input": [{"name": "input__0", "data_type": "TYPE_FP32", "dims": [4]}],
+}
+# One scalar input per feature, named after it.
+SCALARS = {
+    "name": "scalars",
+    "max_batch_size": 8,
+    "input": [
+        {"name": name, "data_type": "TYPE_FP32", "dims": [1]} for name in ("a", "b", "c")
+    ],
+}
+# No batching: the row count is the first dim of the input.
+UNBATCHED = {
+    "name": "unbatched",
+    "max_batch_size": 0,
+    "input": [{"name": "input__0", "data_type": "TYPE_FP32", "dims": [-1, 4]}],
+}
+
+
+def test_every_feature_format_packs_the_same_tensors():
+    plan = RequestPlan(SCALARS)
+    rows = [{"a": 1.0, "b": 2.0, "c": 3.0}, {"a": 4.0, "b": 5.0, "c": 6.0}]
+    expected = plan.tensors(np.array([[1, 2, 3], [4, 5, 6]], np.float64))
+    expected = {name: array.copy() for name, array in expected.items()}
+    for features in (rows, pd.DataFrame(rows)[["c", "a", "b"]]):
+        tensors = plan.tensors(features)
+        assert sorted(tensors) == ["a", "b", "c"]
+        for name in tensors:
+            np.testing.assert_array_equal(tensors[name], expected[name])
+            assert tensors[name].shape == (2, 1)
+    np.testing.assert_array_equal(plan.tensors(rows[1])["c"], [[6.0]])
+
+
+def test_columns_go_to_inputs_in_declaration_order():
+    tensors = RequestPlan(SCALARS).tensors(np.array([[1, 2, 3]], np.float32))
+    assert [tensors[name].item() for name in ("a", "b", "c")] == [1, 2, 3]
+
+
+def test_matching_contiguous_features_are_not_copied():
+    features = np.ones((3, 4), np.float32)
+    tensors = RequestPlan(VECTOR).tensors(features)
+    assert np.shares_memory(tensors["input__0"], features)
+    converted = RequestPlan(VECTOR).tensors(features.astype(np.float64))
+    assert converted["input__0"].dtype == np.float32
+
+
+@pytest.mark.parametrize("features, message", [
+    (np.ones((2, 3)), "takes 4 features per row"),
+    (np.ones((9, 4)), "at most 8 rows"),
+    (np.ones((0, 4)), "no rows"),
+    (np.array([["x"] * 4]), "needs float32 values"),
+])
+def test_bad_features_raise(features, message):
+    with pytest.raises(ValueError, match=message):
+        RequestPlan(VECTOR).tensors(features)
+
+
+def test_missing_and_unexpected_names_are_reported():
+    plan = RequestPlan(SCALARS)
+    with pytest.raises(ValueError, match=r"missing features \['c'\] and unexpected \['d'\]"):
+        plan.tensors({"a": 1.0, "b": 2.0, "d": 3.0})
+    with pytest.raises(ValueError, match="missing features"):
+        plan.tensors(pd.DataFrame({"a": [1.0], "b": [2.0]}))
+    with pytest.raises(ValueError, match="no feature names"):
+        RequestPlan(VECTOR).tensors({"a": 1.0})
+
+
+def test_requests_split_rows_by_the_batch_limit():
+    requests = RequestPlan(VECTOR).requests(np.ones((20, 4), np.float32))
+    assert [infer_inputs[0].shape() for infer_inputs in requests] == [[8, 4], [8, 4], [4, 4]]
+
+
+def test_unbatched_model_takes_its_rows_in_the_first_dim():
+    plan = RequestPlan(UNBATCHED)
+    assert plan.max_rows is None
+    assert plan.tensors(np.ones((5, 4), np.float32))["input__0"].shape == (5, 4)
+
+
+def test_validate_checks_names_dtypes_and_shapes():
+    plan = RequestPlan(VECTOR)
+    plan.validate({"input__0": np.ones((3, 4), np.float32)})
+    with pytest.raises(ValueError, match="missing input 'input__0'"):
+        plan.validate({})
+    with pytest.raises(ValueError, match="has no inputs"):
+        plan.validate({"input__0": np.ones((3, 4), np.float32), "extra": np.ones(1)})
+    with pytest.raises(ValueError, match="must be float32"):
+        plan.validate({"input__0": np.ones((3, 4))})
+    with pytest.raises(ValueError, match=r"must have shape \[3, 4\]"):
+        plan.validate({"input__0": np.ones((3, 5), np.float32)})
+
+
+def test_keep_arrays_returns_array_inputs():
+    inputs = RequestPlan(VECTOR, keep_arrays=True).inputs(np.ones((2, 4), np.float32))
+    assert isinstance(inputs[0], ArrayInput)
+    np.testing.assert_array_equal(inputs[0].array, np.ones((2, 4)))
@@ -0,0 +1,105 @@
+"""Deadlines, retries and hedging in ``ResilientClient``."""
+import gevent
+import pytest
+from tritonclient.utils import InferenceServerException
+
+from triton_onnx_demo.resilience import DeadlineExceeded, ResilientClient
+
+
+class ScriptedClient:
+    """Plays ``(delay_s, error)`` per call, then repeats the last; records timeouts."""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+        self.timeouts = []
+
+    def infer(self, model_name, inputs, timeout=None, **kwargs):
+        delay_s, error = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        self.timeouts.append(timeout)
+        gevent.sleep(delay_s)
+        if error is not None:
+            raise error
+        return self.calls
+
+
+def unavailable():
+    return InferenceServerException(msg="unavailable", status="503")
+
+
+def test_hedge_delay_follows_a_latency_shift_after_the_window_fills():
+    client = ResilientClient(None, hedge=True, window=1000)
+    for _ in range(2000):
+        client._record_latency(0.001)
+        client.hedge_delay_s()
+    assert client.hedge_delay_s() == 0.001
+    for _ in range(5000):
+        client._record_latency(0.5)
+        client.hedge_delay_s()
+    assert client.hedge_delay_s() == 0.5
+
+
+def test_hedge_delay_waits_for_min_samples():
+    client = ResilientClient(None, hedge=True, hedge_min_samples=10)
+    for _ in range(9):
+        client._record_latency(0.01)
+    assert client.hedge_delay_s() is None
+    client._record_latency(0.01)
+    assert client.hedge_delay_s() == 0.01
+
+
+def test_transient_errors_are_retried():
+    client = ResilientClient(
+        ScriptedClient((0, unavailable()), (0, unavailable()), (0, None)), seed=0
+    )
+    assert client.infer("m", []) == 3
+    assert client.stats.retries == 2
+
+
+def test_retries_stop_after_max_retries():
+    scripted = ScriptedClient((0, unavailable()))
+    client = ResilientClient(scripted, max_retries=2, seed=0)
+    with pytest.raises(InferenceServerException):
+        client.infer("m", [])
+    assert scripted.calls == 3
+    assert client.stats.failures == 1
+
+
+def test_client_errors_are_not_retried():
+    scripted = ScriptedClient((0, InferenceServerException(msg="bad input", status="400")))
+    client = ResilientClient(scripted, seed=0)
+    with pytest.raises(InferenceServerException):
+        client.infer("m", [])
+    assert scripted.calls == 1
+
+
+def test_deadline_bounds_the_wait_and_is_sent_as_the_timeout():
+    scripted = ScriptedClient((1.0, None))
+    client = ResilientClient(scripted, deadline_s=0.05)
+    with pytest.raises(DeadlineExceeded):
+        client.infer("m", [])
+    assert 0 < scripted.timeouts[0] <= 50000
+    assert client.stats.deadline_exceeded == 1
+
+
+def test_slow_request_is_hedged_and_the_hedge_wins():
+    scripted = ScriptedClient((0.5, None), (0.001, None))
+    client = ResilientClient(scripted, hedge=True, hedge_min_samples=10, max_hedge_fraction=1)
+    for _ in range(10):
+        client._record_latency(0.01)
+    assert client.infer("m", []) == 2
+    assert (client.stats.hedges, client.stats.hedge_wins) == (1, 1)
+
+
+def test_hedges_are_capped_by_max_hedge_fraction():
+    scripted = ScriptedClient((0.03, None))
+    client = ResilientClient(
+        scripted, hedge=True, hedge_min_samples=10, max_hedge_fraction=0.1
+    )
+    for _ in range(10):
+        client._record_latency(0.001)
+    for _ in range(20):
+        client.infer("m", [])
+    assert client.stats.hedges <= 0.1 * client.stats.requests
+    assert client.stats.hedges > 0
@@ -0,0 +1,89 @@
+"""Requested outputs and buffer decoding in ``ResponsePlan``."""
+import json
+
+import numpy as np
+import pytest
+import tritonclient.http as httpclient
+from tritonclient.utils import np_to_triton_dtype
+
+from triton_onnx_demo.response_plan import ResponsePlan, decode_results
+
+CONFIG = {
+    "name": "classifier",
+    "max_batch_size": 8,
+    "output": [
+        {"name": "label", "data_type": "TYPE_INT64", "dims": [1]},
+        {"name": "probabilities", "data_type": "TYPE_FP32", "dims": [3]},
+    ],
+}
+
+
+def infer_result(outputs):
+    """An ``InferResult`` with ``outputs`` as binary data, as the server sends them."""
+    header = {"model_name": "classifier", "outputs": []}
+    blobs = []
+    for name, array in outputs.items():
+        header["outputs"].append({
+            "name": name,
+            "datatype": np_to_triton_dtype(array.dtype),
+            "shape": list(array.shape),
+            "parameters": {"binary_data_size": array.nbytes},
+        })
+        blobs.append(array.tobytes())
+    text = json.dumps(header).encode()
+    return httpclient.InferResult.from_response_body(
+        text + b"".join(blobs), header_length=len(text)
+    )
+
+
+def outputs(rows):
+    return {
+        "label": np.arange(rows, dtype=np.int64).reshape(rows, 1),
+        "probabilities": np.full((rows, 3), 0.5, np.float32),
+    }
+
+
+def test_only_the_named_outputs_are_requested():
+    plan = ResponsePlan(CONFIG, outputs=["probabilities"])
+    assert [output.name() for output in plan.requested] == ["probabilities"]
+    with pytest.raises(ValueError, match=r"has no outputs \['score'\]"):
+        ResponsePlan(CONFIG, outputs=["score"])
+
+
+def test_decode_without_buffers_reads_the_response_body():
+    decoded = ResponsePlan(CONFIG).decode(infer_result(outputs(2)))
+    np.testing.assert_array_equal(decoded["label"], [[0], [1]])
+    assert decoded["probabilities"].shape == (2, 3)
+    assert not decoded["probabilities"].flags.writeable
+
+
+def test_decode_writes_into_the_given_buffers():
+    plan = ResponsePlan(CONFIG)
+    buffers = plan.buffers(8)
+    decoded = plan.decode(infer_result(outputs(3)), buffers)
+    assert np.shares_memory(decoded["label"], buffers["label"])
+    np.testing.assert_array_equal(buffers["label"][:3, 0], [0, 1, 2])
+
+
+def test_decode_rejects_a_buffer_that_is_too_small():
+    plan = ResponsePlan(CONFIG)
+    with pytest.raises(ValueError, match="the buffer has"):
+        plan.decode(infer_result(outputs(3)), plan.buffers(2))
+
+
+def test_missing_output_is_reported():
+    result = infer_result({"label": np.zeros((1, 1), np.int64)})
+    with pytest.raises(ValueError, match="returned no output 'probabilities'"):
+        ResponsePlan(CONFIG).decode(result)
+
+
+def test_decode_results_reuses_buffers_and_grows_them():
+    plan = ResponsePlan(CONFIG)
+    batches = [(2, infer_result(outputs(2))), (2, infer_result(outputs(2))),
+               (12, infer_result(outputs(12)))]
+    seen = []
+    for rows, decoded in decode_results(plan, iter(batches), max_rows=8):
+        assert len(decoded["label"]) == rows
+        seen.append(decoded["label"].base)
+    assert seen[0] is seen[1]
+    assert seen[2] is not seen[0]
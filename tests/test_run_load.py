@@ -0,0 +1,20 @@
+"""Error handling of the closed-loop load generator."""
+import socket
+
+from triton_onnx_demo.benchmark import run_load
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_errors_back_off_and_skip_the_warmup():
+    url = "127.0.0.1:{}".format(closed_port())
+    result = run_load(url, "model", [], concurrency=2, duration_s=0.3, warmup_s=0.3,
+                      error_backoff_s=0.05)
+    # Refused connections fail at once: without the backoff each worker
+    # would fail thousands of times, and warmup errors would double the count.
+    assert 0 < result["errors"] <= 2 * (0.3 / 0.05 + 1)
+    assert result["requests"] == 0
@@ -0,0 +1,126 @@
+"""Dynamic batching and output splitting in the stand-in server's scheduler."""
+import threading
+
+import numpy as np
+import pytest
+
+from benchmarks.tune_dynamic_batching import config_fields
+from triton_onnx_demo.server.scheduler import BatchError, ModelScheduler, RequestTimeout
+from triton_onnx_demo.server.stats import ModelStatistics
+
+
+class EchoBackend:
+    """Returns twice its input, recording the rows of every execution."""
+
+    def __init__(self, extra_rows=0):
+        self.executions = []
+        self.extra_rows = extra_rows
+        self._lock = threading.Lock()
+
+    def execute(self, inputs):
+        data = inputs["input__0"]
+        with self._lock:
+            self.executions.append(len(data))
+        output = data * 2
+        if self.extra_rows:
+            output = np.concatenate([output, np.zeros((self.extra_rows,) + data.shape[1:])])
+        return {"output__0": output}
+
+
+class Model:
+    def __init__(self, backend, max_batch_size=8, delay_us=200000, preferred=(), batching=True):
+        self.name = "echo"
+        self.backend = backend
+        self.stats = ModelStatistics("echo", 1)
+        self.config = {"name": "echo", "max_batch_size": max_batch_size}
+        if batching:
+            self.config["dynamic_batching"] = {
+                "max_queue_delay_microseconds": delay_us,
+                "preferred_batch_size": list(preferred),
+            }
+        self.scheduler = ModelScheduler(self)
+
+
+def submit_together(model, requests, timeout_us=None):
+    """Submit ``requests`` (row counts) from one thread each; returns outputs or errors."""
+    results = [None] * len(requests)
+    barrier = threading.Barrier(len(requests))
+
+    def run(i, rows):
+        inputs = {"input__0": np.full((rows, 2), i, np.float32)}
+        barrier.wait()
+        try:
+            results[i] = model.scheduler.submit(inputs, timeout_us)[0]
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=item) for item in enumerate(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return results
+
+
+def test_requests_within_the_delay_share_one_execution():
+    backend = EchoBackend()
+    model = Model(backend)
+    submit_together(model, [1, 1, 1, 1])
+    assert backend.executions == [4]
+
+
+def test_batched_outputs_are_split_back_by_request():
+    model = Model(EchoBackend())
+    rows = [1, 2, 3]
+    results = submit_together(model, rows)
+    for i, (count, outputs) in enumerate(zip(rows, results)):
+        np.testing.assert_array_equal(outputs["output__0"], np.full((count, 2), 2 * i))
+
+
+def test_batches_never_exceed_max_batch_size():
+    backend = EchoBackend()
+    model = Model(backend, max_batch_size=4, delay_us=50000)
+    results = submit_together(model, [3, 3, 3, 1])
+    assert all(not isinstance(result, Exception) for result in results)
+    assert max(backend.executions) <= 4
+    assert sum(backend.executions) == 10
+
+
+def test_preferred_batch_size_dispatches_without_waiting():
+    backend = EchoBackend()
+    # A delay far longer than the test's timeout: only the preferred size dispatches.
+    model = Model(backend, delay_us=60 * 10 ** 6, preferred=[2])
+    results = submit_together(model, [1, 1])
+    assert backend.executions == [2]
+    assert all(not isinstance(result, Exception) for result in results)
+
+
+def test_output_row_mismatch_fails_the_whole_batch():
+    model = Model(EchoBackend(extra_rows=1))
+    results = submit_together(model, [1, 1, 1])
+    assert all(isinstance(result, BatchError) for result in results)
+
+
+def test_output_row_mismatch_fails_a_single_request():
+    model = Model(EchoBackend(extra_rows=2), batching=False)
+    with pytest.raises(BatchError):
+        model.scheduler.submit({"input__0": np.ones((3, 2), np.float32)})
+
+
+def test_expired_request_is_not_executed():
+    backend = EchoBackend()
+    model = Model(backend, delay_us=100000)
+    results = submit_together(model, [1], timeout_us=1000)
+    assert isinstance(results[0], RequestTimeout)
+    assert backend.executions == []
+
+
+def test_config_fields_keeps_the_instance_kind():
+    config = {"max_batch_size": 8, "instance_group": [{"count": 1, "kind": "KIND_AUTO"}]}
+    settings = {
+        "instances": 3,
+        "max_batch_size": 8,
+        "max_queue_delay_microseconds": 100,
+        "preferred_batch_size": [],
+    }
+    assert config_fields(config, settings)["instance_group"] == [{"count": 3, "kind": "KIND_AUTO"}]
@@ -0,0 +1,84 @@
+"""Request compression and resends of ``TracedClient``."""
+import socket
+import threading
+import zlib
+
+import numpy as np
+import pytest
+import tritonclient.http as httpclient
+from geventhttpclient.response import HTTPConnectionClosed
+
+from triton_onnx_demo.compression import AdaptiveCompressionClient, CompressionPolicy
+from triton_onnx_demo.tracing import RequestTracer, SummarySink, TracedClient
+
+# Compresses well, and large enough for the policy to consider.
+BODY = b"0.5," * 4096
+
+
+def plain_client():
+    # Building a client does not connect to the server.
+    return httpclient.InferenceServerClient("localhost:1")
+
+
+def adaptive_client(link_mbps):
+    return AdaptiveCompressionClient(plain_client(), CompressionPolicy(link_mbps))
+
+
+def test_auto_follows_the_adaptive_policy():
+    body, algorithm = TracedClient(adaptive_client(link_mbps=1))._encode(BODY, "auto")
+    assert algorithm == "deflate"
+    assert zlib.decompress(body) == BODY
+    # On a fast enough link compressing never pays.
+    assert TracedClient(adaptive_client(link_mbps=1e9))._encode(BODY, "auto") == (BODY, None)
+
+
+def test_explicit_algorithm_overrides_the_policy():
+    body, algorithm = TracedClient(adaptive_client(link_mbps=1e9))._encode(BODY, "deflate")
+    assert algorithm == "deflate"
+    assert zlib.decompress(body) == BODY
+
+
+def test_auto_without_an_adaptive_client_is_rejected():
+    traced = TracedClient(plain_client())
+    assert traced._encode(BODY, None) == (BODY, None)
+    with pytest.raises(ValueError):
+        traced._encode(BODY, "auto")
+
+
+class ClosingServer:
+    """Reads whole requests and closes each connection without a response."""
+
+    def __init__(self):
+        self.requests = 0
+        self._listener = socket.create_server(("127.0.0.1", 0))
+        self.url = "127.0.0.1:{}".format(self._listener.getsockname()[1])
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            conn, _ = self._listener.accept()
+            with conn:
+                data = b""
+                while b"\r\n\r\n" not in data:
+                    data += conn.recv(65536)
+                head, body = data.split(b"\r\n\r\n", 1)
+                length = int(next(
+                    line.split(b":")[1] for line in head.split(b"\r\n")
+                    if line.lower().startswith(b"content-length:")
+                ))
+                while len(body) < length:
+                    body += conn.recv(65536)
+                self.requests += 1
+
+
+def test_fully_sent_request_is_not_resent():
+    server = ClosingServer()
+    traced = TracedClient(
+        httpclient.InferenceServerClient(server.url), RequestTracer([SummarySink()])
+    )
+    inputs = [httpclient.InferInput("input__0", [1, 4], "FP32")]
+    inputs[0].set_data_from_numpy(np.zeros((1, 4), np.float32))
+    with pytest.raises(HTTPConnectionClosed):
+        traced.infer("model", inputs)
+    # Resending could run the inference twice on a server that closed after it.
+    assert server.requests == 1
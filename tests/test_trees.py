@@ -0,0 +1,102 @@
+"""Parity of ``Forest`` and compiled trees with the xgboost / lightgbm libraries.
+
+The pytest form of the check ``model_builders/compile_trees.py`` runs before it
+installs a compiled model.
+"""
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from model_builders.compile_trees import parity_rows
+from triton_onnx_demo.server.backends import library_predictor
+from triton_onnx_demo.tree_compiler import (
+    COMPILED_DIR,
+    CompiledForest,
+    compile_model,
+    load_compiled,
+)
+from triton_onnx_demo.trees import Forest, load_forest
+
+MODEL_REPOSITORY = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models")
+XGBOOST_MODELS = sorted(
+    name for name in os.listdir(MODEL_REPOSITORY)
+    if os.path.exists(os.path.join(MODEL_REPOSITORY, name, "1", "xgboost.json"))
+)
+TOLERANCE = 1e-5
+
+
+@pytest.fixture(scope="module")
+def lightgbm_model(tmp_path_factory):
+    """A small LightGBM model trained on data with NaNs and zeros."""
+    lightgbm = pytest.importorskip("lightgbm")
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(500, 5))
+    labels = (features[:, 0] + features[:, 1] ** 2 > 0.5).astype(int)
+    features[rng.random(features.shape) < 0.1] = np.nan
+    features[rng.random(features.shape) < 0.05] = 0.0
+    booster = lightgbm.train(
+        {"objective": "binary", "num_leaves": 8, "verbose": -1},
+        lightgbm.Dataset(features, labels),
+        num_boost_round=20,
+    )
+    path = str(tmp_path_factory.mktemp("lightgbm") / "model.txt")
+    booster.save_model(path)
+    return path
+
+
+@pytest.fixture(params=["lightgbm"] + XGBOOST_MODELS)
+def model(request):
+    """``(model_type, path)`` of each model file to check."""
+    if request.param == "lightgbm":
+        return "lightgbm", request.getfixturevalue("lightgbm_model")
+    return "xgboost_json", os.path.join(MODEL_REPOSITORY, request.param, "1", "xgboost.json")
+
+
+def compiler():
+    cc = os.environ.get("CC", "cc")
+    if shutil.which(cc) is None:
+        pytest.skip("no C compiler '{}'".format(cc))
+    return cc
+
+
+def test_forest_matches_the_library(model):
+    model_type, path = model
+    pytest.importorskip("lightgbm" if model_type == "lightgbm" else "xgboost")
+    try:
+        native = library_predictor(model_type, path)
+    except Exception as e:
+        # A model saved by a newer library; compile_trees.py leaves it unchecked too.
+        pytest.skip("the library cannot read {}: {}".format(path, str(e).splitlines()[0]))
+    forest = load_forest(path)
+    rows = parity_rows(forest, 2000)
+    np.testing.assert_allclose(forest.predict(rows), native(rows), atol=TOLERANCE)
+
+
+def test_compiled_forest_matches_the_forest(model, tmp_path):
+    _, path = model
+    compile_model(path, str(tmp_path), cc=compiler())
+    forest = load_forest(path)
+    rows = parity_rows(forest, 2000)
+    np.testing.assert_allclose(
+        CompiledForest(str(tmp_path)).predict(rows), forest.predict(rows), atol=TOLERANCE
+    )
+
+
+def test_saved_forest_loads_back(model, tmp_path):
+    _, path = model
+    forest = load_forest(path)
+    forest.save(str(tmp_path))
+    rows = parity_rows(forest, 200)
+    np.testing.assert_array_equal(Forest.load(str(tmp_path)).predict(rows), forest.predict(rows))
+
+
+def test_stale_compiled_model_is_not_loaded(lightgbm_model, tmp_path):
+    version_dir = str(tmp_path)
+    path = shutil.copy(lightgbm_model, version_dir)
+    compile_model(path, os.path.join(version_dir, COMPILED_DIR), cc=compiler())
+    assert load_compiled(version_dir, "model.txt") is not None
+    with open(path, "a") as f:
+        f.write("\n")
+    assert load_compiled(version_dir, "model.txt") is None
@@ -0,0 +1 @@
+"""Shared helpers for the Triton / ONNX demo clients, builders and benchmarks."""
@@ -0,0 +1,6 @@
+import sys
+
+from triton_onnx_demo.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""Content-addressed loading of model artifacts, shared between model entries.
+
+``ArtifactStore`` keys every model file by the SHA-256 of its contents, read
+through ``mmap``. A loaded model (an xgboost / lightgbm booster, an
+onnxruntime session, a ``Forest``) is kept per content and kind, so model
+entries and versions that ship the same file share one parsed copy. Digests
+are remembered by path, size and mtime, so a file is hashed once per process.
+
+With ``cache_dir``, parsed forms are also kept on disk under
+``<cache_dir>/v<FORMAT_VERSION>/<digest>/``: a ``Forest`` as ``.npy`` arrays
+that are memory-mapped back, and an xgboost booster in its binary format,
+which loads several times faster than JSON. Entries are written to a
+temporary directory and renamed into place, so processes can share a cache
+directory. The digest is of the source file, so a changed model gets a new
+entry; stale entries are never read and can be deleted at any time.
+
+``onnx_threads`` caps the threads of each onnxruntime session. Pre-fork server
+workers use 1: a session's thread pool is started when it is created and does
+not survive ``fork``, and one thread per worker process fills the cores anyway.
+"""
+import hashlib
+import mmap
+import os
+import shutil
+import tempfile
+
+FORMAT_VERSION = 1
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "triton_onnx_demo", "artifacts")
+
+
+def content_digest(path):
+    """SHA-256 of a file's contents, read through ``mmap``."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+    return digest.hexdigest()
+
+
+class ArtifactStore:
+    """Shares parsed model files by content; see the module docstring."""
+
+    def __init__(self, cache_dir=None, onnx_threads=None):
+        self.cache_dir = cache_dir
+        self.onnx_threads = onnx_threads
+        self._digests = {}
+        self._loaded = {}
+        self.requests = 0
+        self.loads = 0
+        self.disk_hits = 0
+
+    def digest(self, path):
+        stat = os.stat(path)
+        key = (os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+        digest = self._digests.get(key)
+        if digest is None:
+            digest = self._digests[key] = content_digest(path)
+        return digest
+
+    def load(self, path, kind, loader):
+        """``loader(path, digest)``, once per content and ``kind``; later calls share it."""
+        self.requests += 1
+        digest = self.digest(path)
+        key = (kind, digest)
+        if key not in self._loaded:
+            self._loaded[key] = loader(path, digest)
+            self.loads += 1
+        return self._loaded[key]
+
+    def _cached(self, digest, kind, build, read, write):
+        """``build()``, or ``read(directory)`` of what ``write`` stored for it before."""
+        if self.cache_dir is None:
+            return build()
+        parent = os.path.join(self.cache_dir, "v{}".format(FORMAT_VERSION), digest)
+        directory = os.path.join(parent, kind)
+        if os.path.isdir(directory):
+            try:
+                value = read(directory)
+                self.disk_hits += 1
+                return value
+            except (OSError, ValueError):
+                pass
+        value = build()
+        try:
+            os.makedirs(parent, exist_ok=True)
+            staging = tempfile.mkdtemp(prefix="." + kind + "-", dir=parent)
+            try:
+                write(value, staging)
+                shutil.rmtree(directory, ignore_errors=True)
+                os.replace(staging, directory)
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+        except OSError:
+            # Another process won the rename, or the cache is read-only.
+            pass
+        return value
+
+    def forest(self, path):
+        """``Forest`` parsed from an ``xgboost.json`` or LightGBM ``model.txt``."""
+        from triton_onnx_demo.trees import Forest, load_forest
+
+        return self.load(path, "forest", lambda path, digest: self._cached(
+            digest, "forest", lambda: load_forest(path), Forest.load,
+            lambda forest, directory: forest.save(directory),
+        ))
+
+    def booster(self, model_type, path):
+        """xgboost or lightgbm ``Booster`` for ``path``."""
+        if model_type == "lightgbm":
+            import lightgbm as lgb
+
+            return self.load(path, "lightgbm", lambda path, digest: lgb.Booster(model_file=path))
+        import xgboost as xgb
+
+        def write(booster, directory):
+            with open(os.path.join(directory, "booster.bin"), "wb") as f:
+                f.write(booster.save_raw())
+
+        def read(directory):
+            with open(os.path.join(directory, "booster.bin"), "rb") as f:
+                return xgb.Booster(model_file=bytearray(f.read()))
+
+        return self.load(path, "xgboost", lambda path, digest: self._cached(
+            digest, "xgboost", lambda: xgb.Booster(model_file=path), read, write,
+        ))
+
+    def onnx_session(self, path):
+        import onnxruntime as rt
+
+        options = rt.SessionOptions()
+        if self.onnx_threads:
+            options.intra_op_num_threads = self.onnx_threads
+            options.inter_op_num_threads = self.onnx_threads
+        return self.load(path, "onnxruntime", lambda path, digest: rt.InferenceSession(
+            path, options, providers=["CPUExecutionProvider"]
+        ))
+
+    def stats(self):
+        """Artifact requests, distinct artifacts loaded and loads served from disk."""
+        return {"requests": self.requests, "loads": self.loads, "disk_hits": self.disk_hits}
@@ -0,0 +1,239 @@
+"""Client-side load balancing of ``infer`` across inference server replicas.
+
+``BalancedClient`` holds one ``InferenceServerClient`` per replica and sends
+each request to the replica picked by ``policy``:
+
+* ``least_outstanding``: fewest requests in flight from this client
+* ``p2c``: power of two choices, the less loaded of two random replicas,
+  which avoids every client herding onto the same replica
+* ``round_robin``: for comparison
+
+A replica is ejected after ``failure_threshold`` consecutive failures
+(connection errors and 5xx responses) or a failed health check
+(``is_server_ready`` and ``is_model_ready`` for ``model_names``, every
+``health_interval_s``). It stays out for ``ejection_s``, doubling with every
+repeated ejection up to ``max_ejection_s``, and comes back once a health check
+passes. Then its share of traffic ramps up over ``slow_start_s``. If every
+replica is ejected, requests go to all of them rather than failing outright.
+"""
+import random
+import time
+
+import gevent
+from tritonclient.utils import InferenceServerException
+
+from triton_onnx_demo.client import create_client
+
+POLICIES = ("least_outstanding", "p2c", "round_robin")
+# Share of traffic a replica gets on its way back from ejection.
+MIN_WEIGHT = 0.1
+
+
+def is_replica_failure(error):
+    if isinstance(error, InferenceServerException):
+        status = error.status()
+        return status is None or str(status).startswith("5")
+    return isinstance(error, (OSError, gevent.Timeout))
+
+
+class Replica:
+    def __init__(self, url, client, health_client):
+        self.url = url
+        self.client = client
+        self.health_client = health_client
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = None
+        self.returned_at = None
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def ejected(self):
+        return self.ejected_until is not None
+
+    def weight(self, now, slow_start_s):
+        if self.returned_at is None or not slow_start_s:
+            return 1.0
+        ramp = (now - self.returned_at) / slow_start_s
+        if ramp >= 1:
+            self.returned_at = None
+            return 1.0
+        return max(MIN_WEIGHT, ramp)
+
+    def as_dict(self):
+        return {
+            "url": self.url,
+            "state": "ejected" if self.ejected else
+            "returning" if self.returned_at is not None else "healthy",
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+        }
+
+
+class BalancedClient:
+    """``infer`` balanced across ``urls``; see the module docstring.
+
+    Extra kwargs go to ``create_client`` for every replica; ``client_factory``
+    replaces it. Health checks run on a greenlet started with ``start`` (or by
+    using the client as a context manager) on separate clients, so they never
+    wait behind requests for a pooled connection. Other attribute lookups
+    (``get_model_config`` and the like) go to a balanced replica.
+    """
+
+    def __init__(
+        self,
+        urls,
+        policy="least_outstanding",
+        model_names=(),
+        health_interval_s=1.0,
+        health_timeout_s=1.0,
+        failure_threshold=3,
+        ejection_s=5.0,
+        max_ejection_s=60.0,
+        slow_start_s=10.0,
+        client_factory=None,
+        seed=None,
+        **kwargs,
+    ):
+        if policy not in POLICIES:
+            raise ValueError("unknown balancing policy '{}'".format(policy))
+        if not urls:
+            raise ValueError("at least one replica URL is required")
+        factory = client_factory or (lambda url, **options: create_client(url, **options))
+        health_options = dict(
+            kwargs,
+            concurrency=1,
+            connection_timeout=health_timeout_s,
+            network_timeout=health_timeout_s,
+        )
+        self.replicas = [
+            Replica(url, factory(url, **kwargs), factory(url, **health_options))
+            for url in urls
+        ]
+        self.policy = policy
+        self.model_names = list(model_names)
+        self.health_interval_s = health_interval_s
+        self.failure_threshold = failure_threshold
+        self.ejection_s = ejection_s
+        self.max_ejection_s = max_ejection_s
+        self.slow_start_s = slow_start_s
+        self._random = random.Random(seed)
+        self._next = 0
+        self._health = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self.pick().client, name)
+
+    def start(self):
+        if self._health is None and self.health_interval_s:
+            self._health = gevent.spawn(self._health_loop)
+
+    def close(self):
+        if self._health is not None:
+            self._health.kill()
+            self._health = None
+        for replica in self.replicas:
+            replica.client.close()
+            replica.health_client.close()
+
+    def _load(self, replica, now):
+        return (replica.outstanding + 1) / replica.weight(now, self.slow_start_s)
+
+    def pick(self):
+        now = time.monotonic()
+        if self._health is None:
+            # Without health checks, ejections simply expire.
+            for replica in self.replicas:
+                if replica.ejected and now >= replica.ejected_until:
+                    self._return(replica, now)
+        candidates = [replica for replica in self.replicas if not replica.ejected]
+        if not candidates:
+            candidates = self.replicas
+        if self.policy == "round_robin":
+            self._next += 1
+            return candidates[self._next % len(candidates)]
+        if self.policy == "p2c" and len(candidates) > 2:
+            candidates = self._random.sample(candidates, 2)
+        lowest = min(self._load(replica, now) for replica in candidates)
+        return self._random.choice(
+            [replica for replica in candidates if self._load(replica, now) == lowest]
+        )
+
+    def infer(self, model_name, inputs, **kwargs):
+        replica = self.pick()
+        replica.outstanding += 1
+        replica.requests += 1
+        try:
+            result = replica.client.infer(model_name, inputs, **kwargs)
+        except Exception as e:
+            if is_replica_failure(e):
+                self._record_failure(replica)
+            raise
+        finally:
+            replica.outstanding -= 1
+        replica.consecutive_failures = 0
+        return result
+
+    def _record_failure(self, replica):
+        replica.failures += 1
+        replica.consecutive_failures += 1
+        # A replica still ramping back up has not earned the full threshold.
+        if (
+            replica.consecutive_failures >= self.failure_threshold
+            or replica.returned_at is not None
+        ):
+            self.eject(replica)
+
+    def eject(self, replica):
+        if replica.ejected:
+            return
+        replica.ejections += 1
+        duration = min(self.max_ejection_s, self.ejection_s * 2 ** (replica.ejections - 1))
+        replica.ejected_until = time.monotonic() + duration
+        replica.returned_at = None
+        replica.consecutive_failures = 0
+
+    def _return(self, replica, now):
+        replica.ejected_until = None
+        replica.returned_at = now
+
+    def _healthy(self, replica):
+        try:
+            if not replica.health_client.is_server_ready():
+                return False
+            return all(replica.health_client.is_model_ready(name) for name in self.model_names)
+        except Exception:
+            return False
+
+    def check_health(self):
+        """One round of health checks; ejects and returns replicas as needed."""
+        now = time.monotonic()
+        checks = {replica: gevent.spawn(self._healthy, replica) for replica in self.replicas}
+        gevent.joinall(list(checks.values()))
+        for replica, check in checks.items():
+            if not check.value:
+                self.eject(replica)
+            elif replica.ejected and now >= replica.ejected_until:
+                self._return(replica, now)
+            elif not replica.ejected and replica.weight(now, self.slow_start_s) == 1.0:
+                # Ejections are forgiven once a replica has fully recovered.
+                replica.ejections = 0
+
+    def _health_loop(self):
+        while True:
+            self.check_health()
+            gevent.sleep(self.health_interval_s)
+
+    def stats(self):
+        return [replica.as_dict() for replica in self.replicas]
@@ -0,0 +1,272 @@
+"""Shared pieces of the scripts in ``benchmarks/``: server processes and load generation.
+
+``ServerProcess`` starts a server on a model repository from a command template
+(Triton or the local stand-in) and waits for the models to be ready.
+``run_load`` drives closed-loop load at a fixed concurrency, one greenlet per
+outstanding request, and reports throughput and latency percentiles.
+"""
+import hashlib
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+
+import gevent
+import numpy as np
+import tritonclient.http as httpclient
+
+from triton_onnx_demo.client import instrument_pool
+from triton_onnx_demo.latency import summarize
+from triton_onnx_demo.model_config import (
+    load_model_config,
+    model_dependencies,
+    supports_batching,
+    triton_dtype,
+)
+from triton_onnx_demo.request_plan import ArrayInput
+from triton_onnx_demo.warmup import load_warmup_samples
+
+TRITON_SERVER_CMD = (
+    "tritonserver --model-repository={model_repository} --http-port={http_port}"
+    " --grpc-port={grpc_port} --metrics-port={metrics_port}"
+)
+STANDIN_SERVER_CMD = (
+    shlex.quote(sys.executable) + " -m triton_onnx_demo.server"
+    " --model-repository {model_repository} --http-port {http_port}"
+)
+
+
+def make_inputs(config, tensors):
+    # Built once per run, so keeping the arrays for local scoring costs nothing per request.
+    inputs = []
+    for model_input in config["input"]:
+        data = tensors[model_input["name"]]
+        infer_input = ArrayInput(
+            model_input["name"], list(data.shape), triton_dtype(model_input["data_type"])
+        )
+        infer_input.set_data_from_numpy(data, binary_data=True)
+        inputs.append(infer_input)
+    return inputs
+
+
+def copy_models(model_repository, model_name, destination):
+    """Copy a model and the models its ensemble steps use into ``destination``."""
+    for name in model_dependencies(model_repository, model_name):
+        shutil.copytree(
+            os.path.join(model_repository, name), os.path.join(destination, name)
+        )
+
+
+def artifact_digest(model_repository, model_name):
+    """SHA-256 over the config and version files of a model and its dependencies.
+
+    Warmup samples are left out so regenerating them does not look like a rebuild.
+    """
+    digest = hashlib.sha256()
+    for name in model_dependencies(model_repository, model_name):
+        model_dir = os.path.join(model_repository, name)
+        for root, dirs, files in os.walk(model_dir):
+            dirs[:] = sorted(d for d in dirs if d != "warmup")
+            for file_name in sorted(files):
+                path = os.path.join(root, file_name)
+                digest.update(os.path.relpath(path, model_repository).encode())
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _stat_fields(pid):
+    with open("/proc/{}/stat".format(pid)) as f:
+        # Fields after the command name, which may itself contain spaces.
+        return f.read().rsplit(")", 1)[1].split()
+
+
+def process_cpu_seconds(pid):
+    """User plus system CPU time of a process and its children, live or reaped, or None.
+
+    Live children count so pre-fork server workers are included. Reads
+    ``/proc``, so it only works on Linux.
+    """
+    try:
+        fields = _stat_fields(pid)
+    except OSError:
+        return None
+    # utime, stime, cutime and cstime are fields 14-17 of stat(5).
+    ticks = sum(int(value) for value in fields[11:15])
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            child = _stat_fields(entry)
+        except OSError:
+            continue
+        # ppid is field 4.
+        if child[1] == str(pid):
+            ticks += sum(int(value) for value in child[11:13])
+    return ticks / os.sysconf("SC_CLK_TCK")
+
+
+def request_tensors(model_dir, config, rows=1):
+    """Input tensors of ``rows`` rows taken from the model's warmup samples.
+
+    Ensembles have no warmup of their own; their first step's samples are used,
+    renamed through its ``input_map``.
+    """
+    if config.get("platform") == "ensemble":
+        step = config["ensemble_scheduling"]["step"][0]
+        step_dir = os.path.join(os.path.dirname(model_dir), step["model_name"])
+        tensors = request_tensors(step_dir, load_model_config(step_dir), rows)
+        return {item["value"]: tensors[item["key"]] for item in step["input_map"]}
+    samples = load_warmup_samples(model_dir, config)
+    if not samples:
+        raise RuntimeError(
+            "{} has no model_warmup; run model_builders/build_warmup.py".format(model_dir)
+        )
+    if not supports_batching(config):
+        return samples[0][1]
+    _, tensors = max(samples, key=lambda sample: sample[0])
+    available = next(iter(tensors.values())).shape[0]
+    index = np.arange(rows) % available
+    return {name: data[index] for name, data in tensors.items()}
+
+
+def wait_until_ready(client, model_names, process, timeout):
+    if isinstance(model_names, str):
+        model_names = [model_names]
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("server exited with code {}".format(process.returncode))
+        try:
+            if client.is_server_ready() and all(
+                client.is_model_ready(name) for name in model_names
+            ):
+                return
+            index = client.get_model_repository_index()
+        except Exception:
+            index = []
+        for entry in index:
+            if entry.get("name") in model_names and entry.get("reason"):
+                raise RuntimeError(
+                    "{} failed to load: {}".format(entry["name"], entry["reason"])
+                )
+        time.sleep(0.05)
+    raise RuntimeError("server not ready after {}s".format(timeout))
+
+
+class ServerProcess:
+    """Context manager running ``server_cmd`` on ``model_repository``."""
+
+    def __init__(self, model_repository, model_names, server_cmd=STANDIN_SERVER_CMD,
+                 http_port=18000, ready_timeout=120.0):
+        self.model_repository = model_repository
+        self.model_names = model_names
+        self.server_cmd = server_cmd
+        self.http_port = http_port
+        self.ready_timeout = ready_timeout
+        self.url = "localhost:{}".format(http_port)
+        self.process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self, wait=True):
+        """Start the server; with ``wait`` block until the models are ready."""
+        command = self.server_cmd.format(
+            model_repository=self.model_repository,
+            http_port=self.http_port,
+            grpc_port=self.http_port + 1,
+            metrics_port=self.http_port + 2,
+        )
+        self.process = subprocess.Popen(
+            shlex.split(command), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        if not wait:
+            return self
+        client = httpclient.InferenceServerClient(url=self.url)
+        try:
+            wait_until_ready(client, self.model_names, self.process, self.ready_timeout)
+        except Exception:
+            self.stop()
+            raise
+        finally:
+            client.close()
+        return self
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+def run_load(url, model_name, inputs, concurrency, duration_s=5.0, warmup_s=1.0,
+             model_version="", rows_per_request=1, keep_samples=False, wrap=None,
+             connections=None, client_factory=None, error_backoff_s=0.05):
+    """Closed-loop load: ``concurrency`` requests always in flight for ``duration_s``.
+
+    Requests sent during the first ``warmup_s`` are not measured, and neither
+    are their errors. After an error a worker sleeps ``error_backoff_s`` before
+    the next request, so a server that is down is not hammered. Returns
+    the concurrency, request and error counts, ``throughput`` in requests/s,
+    ``inferences_per_s`` (throughput times ``rows_per_request``) and the latency
+    summary in ms, plus every latency as ``samples_ms`` if ``keep_samples`` is set.
+    ``pool`` holds the client connection pool stats; waits there mean the
+    client, not the server, was the bottleneck.
+
+    ``wrap(client)``, if given, returns the object whose ``infer`` is called,
+    such as a ``ResilientClient``; ``connections`` sizes the connection pool
+    (default ``concurrency``) for wrappers that send more than one request.
+    ``client_factory(url, connections)`` replaces the default client; its pool
+    is not instrumented and ``pool`` is None.
+    """
+    if client_factory is None:
+        client = httpclient.InferenceServerClient(
+            url=url, concurrency=connections or concurrency
+        )
+        stats = instrument_pool(client)
+    else:
+        client = client_factory(url, connections or concurrency)
+        stats = None
+    target = client if wrap is None else wrap(client)
+    latencies = []
+    errors = [0]
+    measure_from = time.perf_counter() + warmup_s
+    stop_at = measure_from + duration_s
+
+    def worker():
+        while True:
+            start = time.perf_counter()
+            if start >= stop_at:
+                return
+            try:
+                target.infer(model_name, inputs, model_version=model_version)
+            except Exception:
+                if start >= measure_from:
+                    errors[0] += 1
+                gevent.sleep(error_backoff_s)
+                continue
+            if start >= measure_from:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    gevent.joinall([gevent.spawn(worker) for _ in range(concurrency)])
+    client.close()
+    throughput = len(latencies) / duration_s
+    result = {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "throughput": throughput,
+        "inferences_per_s": throughput * rows_per_request,
+        "latency_ms": summarize(latencies),
+        "pool": None if stats is None else stats.as_dict(),
+    }
+    if keep_samples:
+        result["samples_ms"] = latencies
+    return result
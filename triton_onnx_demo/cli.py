@@ -0,0 +1,68 @@
+"""One command line for the scripts in ``clients/``.
+
+    python -m triton_onnx_demo xgboost -u localhost:8000
+
+runs ``clients/xgboost_client.py -u localhost:8000``. Each command runs its
+script as ``__main__`` with the remaining arguments. This module imports only
+the standard library, and the scripts parse their arguments before importing
+numpy, pandas, gevent or tritonclient. A command therefore loads only what it
+uses, and ``--help`` or a bad argument returns quickly, which matters for
+short-lived jobs. ``benchmarks/import_time_check.py`` checks this with
+``-X importtime``, and ``tests/test_cli_imports.py`` runs the same check
+under pytest.
+
+The scripts are not part of the installed package: the CLI runs them from the
+``clients/`` directory next to the package, so it only works from a checkout
+of the repository.
+"""
+import os
+import runpy
+import sys
+
+CLIENTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "clients")
+
+COMMANDS = {
+    "diabetes": ("diabetes_example_client.py", "Query diabetes_example."),
+    "dummy": ("dummy_model_client.py", "Query onnx_test or the converted dummy_model."),
+    "fanout": ("fanout_client.py", "Score rows on several models at once."),
+    "features": ("feature_client.py", "Score IDs through a cached feature store lookup."),
+    "lightgbm": ("lightgbm_client.py", "Query lightgbm_model."),
+    "scikit-learn": ("scikit_learn_client.py", "Query scikit_learn_model."),
+    "score-frame": ("score_frame.py", "Score a CSV or Parquet file."),
+    "shadow": ("shadow_client.py", "Compare a candidate model version with the primary."),
+    "stats": ("stats_poller.py", "Poll and print model statistics."),
+    "traced": ("traced_client.py", "Score rows with per-request tracing."),
+    "xgboost": ("xgboost_client.py", "Query xgboost_model."),
+}
+
+
+def usage():
+    width = max(len(name) for name in COMMANDS)
+    lines = ["usage: python -m triton_onnx_demo <command> [arguments]", "", "commands:"]
+    lines.extend(
+        "  {:<{}}  {}".format(name, width, description)
+        for name, (_, description) in COMMANDS.items()
+    )
+    lines.extend(["", "Run a command with --help for its arguments."])
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """Run the command in ``argv`` (default ``sys.argv[1:]``); returns an exit status."""
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0
+    if not argv or argv[0] not in COMMANDS:
+        print(usage(), file=sys.stderr)
+        if argv:
+            print("\nunknown command '{}'".format(argv[0]), file=sys.stderr)
+        return 2
+    script = os.path.join(CLIENTS_DIR, COMMANDS[argv[0]][0])
+    if not os.path.isfile(script):
+        print("{} not found; the CLI runs the scripts in clients/ and only works "
+              "from a checkout of the repository".format(script), file=sys.stderr)
+        return 1
+    sys.argv = [script] + argv[1:]
+    runpy.run_path(script, run_name="__main__")
+    return 0
@@ -0,0 +1,480 @@
+"""Shared construction of ``tritonclient.http`` clients for scripts in this repo.
+
+Mirrors the connection flags and SSL handling of the scripts in ``clients/`` so
+new tools take the same command line, and adds connection pool settings:
+pool size, timeouts, TCP keep-alive, an idle limit for pooled connections,
+pre-warming, and ``PoolStats`` to see whether callers wait on the pool.
+tritonclient has no public hook into its pool, so the instrumentation wraps
+the geventhttpclient pool behind the client's private attributes. It checks for
+them first and raises TypeError on a tritonclient without them.
+Scripts that also call ``add_balancing_arguments`` accept a comma separated
+``--url`` and balance requests across those replicas (see
+``triton_onnx_demo.balancer``); those that call ``add_fallback_arguments`` can
+score in-process when the server is unavailable (see
+``triton_onnx_demo.fallback``). With ``--request-compression-algorithm auto``
+each request is compressed only when it pays at ``--link-mbps`` (see
+``triton_onnx_demo.compression``).
+
+Only the standard library is imported up front: gevent and tritonclient are
+imported when a client is created, so a script that parses its arguments
+first, including ``--help``, stays quick to start.
+"""
+import socket
+import time
+
+
+def add_connection_arguments(parser):
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Enable verbose output",
+    )
+    parser.add_argument(
+        "-u",
+        "--url",
+        type=str,
+        required=False,
+        default="localhost:8000",
+        help="Inference server URL. Default is localhost:8000.",
+    )
+    parser.add_argument(
+        "-s",
+        "--ssl",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Enable encrypted link to the server using HTTPS",
+    )
+    parser.add_argument(
+        "--key-file",
+        type=str,
+        required=False,
+        default=None,
+        help="File holding client private key. Default is None.",
+    )
+    parser.add_argument(
+        "--cert-file",
+        type=str,
+        required=False,
+        default=None,
+        help="File holding client certificate. Default is None.",
+    )
+    parser.add_argument(
+        "--ca-certs",
+        type=str,
+        required=False,
+        default=None,
+        help="File holding ca certificate. Default is None.",
+    )
+    parser.add_argument(
+        "--insecure",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Use no peer verification in SSL communications. Use with caution. Default is False.",
+    )
+    parser.add_argument(
+        "-H",
+        dest="http_headers",
+        metavar="HTTP_HEADER",
+        required=False,
+        action="append",
+        help="HTTP headers to add to inference server requests. "
+        + 'Format is -H"Header:Value".',
+    )
+    parser.add_argument(
+        "--request-compression-algorithm",
+        type=str,
+        required=False,
+        default=None,
+        help="The compression algorithm to be used when sending request body to server: "
+        "gzip, deflate, or auto to compress each request only when it pays at "
+        "--link-mbps. Default is None.",
+    )
+    parser.add_argument(
+        "--link-mbps",
+        type=float,
+        required=False,
+        default=100.0,
+        help="Client to server bandwidth in megabits per second, for "
+        "--request-compression-algorithm auto. Default is 100.",
+    )
+    parser.add_argument(
+        "--response-compression-algorithm",
+        type=str,
+        required=False,
+        default=None,
+        help="The compression algorithm to be used when receiving response body from server. Default is None.",
+    )
+
+
+def add_pool_arguments(parser):
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Connection pool size; concurrent requests beyond it wait for a "
+        "connection. Default is 1.",
+    )
+    parser.add_argument(
+        "--connection-timeout",
+        type=float,
+        default=60.0,
+        help="Seconds to wait for a connection to be established. Default is 60.",
+    )
+    parser.add_argument(
+        "--network-timeout",
+        type=float,
+        default=60.0,
+        help="Seconds to wait on a socket read or write. Default is 60.",
+    )
+    parser.add_argument(
+        "--tcp-keepalive",
+        type=float,
+        default=None,
+        help="Enable TCP keep-alive probes after this many idle seconds, so "
+        "load balancers and NAT do not drop pooled connections.",
+    )
+    parser.add_argument(
+        "--max-idle",
+        type=float,
+        default=None,
+        help="Close pooled connections idle for longer than this many seconds "
+        "instead of reusing them; set it below the server's keep-alive timeout.",
+    )
+    parser.add_argument(
+        "--prewarm",
+        type=int,
+        default=0,
+        help="Open this many pooled connections up front. Default is 0.",
+    )
+
+
+def add_balancing_arguments(parser):
+    """Lets ``--url`` list several replicas, comma separated."""
+    parser.add_argument(
+        "--balance",
+        choices=("least_outstanding", "p2c", "round_robin"),
+        default="least_outstanding",
+        help="How to pick a replica when --url lists several. Default is "
+        "least_outstanding.",
+    )
+    parser.add_argument(
+        "--health-interval",
+        type=float,
+        default=1.0,
+        help="Seconds between replica health checks; 0 disables them. Default is 1.",
+    )
+
+
+def add_fallback_arguments(parser):
+    """Lets requests be scored in-process while the server is unavailable."""
+    parser.add_argument(
+        "--fallback-repository",
+        default=None,
+        help="Model repository to score from locally when the server fails or "
+        "is too slow.",
+    )
+    parser.add_argument(
+        "--fallback-latency-ms",
+        type=float,
+        default=None,
+        help="Requests slower than this count as failures towards switching "
+        "to local scoring.",
+    )
+
+
+class PoolStats:
+    """Counters for an instrumented connection pool.
+
+    ``wait`` is time spent blocked on a free pool slot; connect time is counted
+    separately. ``reconnects`` are connections opened to replace one that was
+    closed after an error or by the server, or expired through ``max_idle_s``.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.acquires = 0
+        self.waits = 0
+        self.wait_s = 0.0
+        self.max_wait_s = 0.0
+        self.connects = 0
+        self.connect_s = 0.0
+        self.reconnects = 0
+        self.discarded = 0
+        self.expired = 0
+        self.in_use = 0
+        self.max_in_use = 0
+
+    def as_dict(self):
+        return {
+            "size": self.size,
+            "in_use": self.in_use,
+            "max_in_use": self.max_in_use,
+            "acquires": self.acquires,
+            "waits": self.waits,
+            "wait_ms_total": self.wait_s * 1000,
+            "wait_ms_mean": self.wait_s * 1000 / self.acquires if self.acquires else 0.0,
+            "wait_ms_max": self.max_wait_s * 1000,
+            "connects": self.connects,
+            "connect_ms_mean": self.connect_s * 1000 / self.connects if self.connects else 0.0,
+            "reconnects": self.reconnects,
+            "discarded": self.discarded,
+            "expired": self.expired,
+        }
+
+    def format(self):
+        return (
+            "pool {in_use}/{size} in use (max {max_in_use}), {acquires} acquires, "
+            "{waits} waited (mean {wait_ms_mean:.3f} ms, max {wait_ms_max:.3f} ms), "
+            "{connects} connects (mean {connect_ms_mean:.3f} ms), {reconnects} "
+            "reconnects, {discarded} discarded, {expired} expired".format(**self.as_dict())
+        )
+
+
+# Private attributes of tritonclient.http's client (the pinned 2.34 to 2.36)
+# and of the geventhttpclient stub and pool under it. Pool instrumentation and
+# TracedClient drive the pool directly, so http_internals checks for them up
+# front and a tritonclient that renames one fails with a clear error.
+_HTTP_INTERNALS = (
+    ("client", ("_client_stub", "_base_uri")),
+    ("stub", ("_connection_pool", "_build_request", "block_size", "headers_type")),
+    ("pool", ("size", "get_socket", "return_socket", "release_socket", "_create_socket")),
+)
+
+
+def http_internals(client, purpose):
+    """The geventhttpclient stub and connection pool of ``client``, checked for ``purpose``.
+
+    Raises TypeError when any attribute in ``_HTTP_INTERNALS`` is missing.
+    """
+    stub = getattr(client, "_client_stub", None)
+    objects = {"client": client, "stub": stub, "pool": getattr(stub, "_connection_pool", None)}
+    for role, names in _HTTP_INTERNALS:
+        missing = [name for name in names if not hasattr(objects[role], name)]
+        if missing:
+            raise TypeError(
+                "{} needs a tritonclient.http InferenceServerClient from tritonclient "
+                "2.34 to 2.36; {} has no {} attributes {}".format(
+                    purpose, type(client).__name__, role, missing)
+            )
+    return stub, objects["pool"]
+
+
+class _InstrumentedPool:
+    """Wraps a geventhttpclient ``ConnectionPool``, counting into ``stats``."""
+
+    def __init__(self, pool, tcp_keepalive_s=None, max_idle_s=None):
+        self._pool = pool
+        self._tcp_keepalive_s = tcp_keepalive_s
+        self._max_idle_s = max_idle_s
+        self._returned_at = {}
+        self._lost = 0
+        import gevent.local
+
+        # Connect time of the current greenlet's acquire, kept out of the wait.
+        self._local = gevent.local.local()
+        self.stats = PoolStats(pool.size)
+        create_socket = pool._create_socket
+
+        def _create_socket():
+            start = time.perf_counter()
+            sock = create_socket()
+            self._local.connect_s = time.perf_counter() - start
+            self.stats.connect_s += self._local.connect_s
+            self.stats.connects += 1
+            if self._lost:
+                self._lost -= 1
+                self.stats.reconnects += 1
+            if self._tcp_keepalive_s is not None:
+                _set_tcp_keepalive(sock, self._tcp_keepalive_s)
+            return sock
+
+        # get_socket looks the factory up on the instance, so this covers the
+        # SSL pool too.
+        pool._create_socket = _create_socket
+
+    def __getattr__(self, name):
+        return getattr(self._pool, name)
+
+    def get_socket(self):
+        stats = self.stats
+        while True:
+            # Every pooled socket is acquired through this wrapper, so its
+            # count says whether get_socket is about to block.
+            waited = stats.in_use >= self._pool.size
+            self._local.connect_s = 0.0
+            start = time.perf_counter()
+            sock = self._pool.get_socket()
+            wait_s = time.perf_counter() - start - self._local.connect_s
+            stats.acquires += 1
+            stats.wait_s += wait_s
+            if waited:
+                stats.waits += 1
+                stats.max_wait_s = max(stats.max_wait_s, wait_s)
+            returned_at = self._returned_at.pop(id(sock), None)
+            if (
+                self._max_idle_s is not None
+                and returned_at is not None
+                and time.monotonic() - returned_at > self._max_idle_s
+            ):
+                stats.expired += 1
+                self._lost += 1
+                self._pool.release_socket(sock)
+                continue
+            stats.in_use += 1
+            stats.max_in_use = max(stats.max_in_use, stats.in_use)
+            return sock
+
+    def return_socket(self, sock):
+        self.stats.in_use -= 1
+        self._returned_at[id(sock)] = time.monotonic()
+        self._pool.return_socket(sock)
+
+    def release_socket(self, sock):
+        self.stats.in_use -= 1
+        self.stats.discarded += 1
+        self._lost += 1
+        self._returned_at.pop(id(sock), None)
+        self._pool.release_socket(sock)
+
+
+def _set_tcp_keepalive(sock, idle_s):
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, max(1, int(idle_s)))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(1, int(idle_s)))
+
+
+def instrument_pool(client, tcp_keepalive_s=None, max_idle_s=None):
+    """Install pool instrumentation on ``client``; returns its ``PoolStats``."""
+    stub, pool = http_internals(client, "connection pool instrumentation")
+    if not isinstance(pool, _InstrumentedPool):
+        stub._connection_pool = _InstrumentedPool(pool, tcp_keepalive_s, max_idle_s)
+    return stub._connection_pool.stats
+
+
+def pool_stats(client):
+    """``PoolStats`` of an instrumented client, otherwise None."""
+    pool = getattr(getattr(client, "_client_stub", None), "_connection_pool", None)
+    return pool.stats if isinstance(pool, _InstrumentedPool) else None
+
+
+def prewarm(client, connections):
+    """Open up to ``connections`` pooled connections now rather than on first use."""
+    _, pool = http_internals(client, "prewarm")
+    sockets = [pool.get_socket() for _ in range(min(connections, pool.size))]
+    for sock in sockets:
+        pool.return_socket(sock)
+
+
+def create_client(
+    url,
+    verbose=False,
+    ssl=False,
+    key_file=None,
+    cert_file=None,
+    ca_certs=None,
+    insecure=False,
+    **kwargs,
+):
+    """Create an ``InferenceServerClient``; extra kwargs go to its constructor."""
+    import tritonclient.http as httpclient
+
+    if not ssl:
+        return httpclient.InferenceServerClient(url=url, verbose=verbose, **kwargs)
+    ssl_options = {}
+    if key_file is not None:
+        ssl_options["keyfile"] = key_file
+    if cert_file is not None:
+        ssl_options["certfile"] = cert_file
+    if ca_certs is not None:
+        ssl_options["ca_certs"] = ca_certs
+    ssl_context_factory = None
+    if insecure:
+        import gevent.ssl
+
+        ssl_context_factory = gevent.ssl._create_unverified_context
+    return httpclient.InferenceServerClient(
+        url=url,
+        verbose=verbose,
+        ssl=True,
+        ssl_options=ssl_options,
+        insecure=insecure,
+        ssl_context_factory=ssl_context_factory,
+        **kwargs,
+    )
+
+
+def client_from_flags(flags, model_names=(), **kwargs):
+    """Client for ``add_connection_arguments`` flags, plus ``add_pool_arguments`` if used.
+
+    A ``concurrency`` kwarg is a minimum; a larger ``--concurrency`` wins. With
+    several URLs, allowed with ``add_balancing_arguments`` only, the result is a
+    started ``BalancedClient``. Its health checks eject a replica unless every
+    model in ``model_names``, the models the command uses, is ready there. With ``--request-compression-algorithm auto``
+    each server's client is an ``AdaptiveCompressionClient``. With
+    ``--fallback-repository`` the result is wrapped in a ``FallbackClient``.
+    """
+    if hasattr(flags, "concurrency"):
+        kwargs["concurrency"] = max(flags.concurrency, kwargs.get("concurrency", 1))
+        kwargs.setdefault("connection_timeout", flags.connection_timeout)
+        kwargs.setdefault("network_timeout", flags.network_timeout)
+
+    def connect(url, **options):
+        client = create_client(
+            url,
+            verbose=flags.verbose,
+            ssl=flags.ssl,
+            key_file=flags.key_file,
+            cert_file=flags.cert_file,
+            ca_certs=flags.ca_certs,
+            insecure=flags.insecure,
+            **options,
+        )
+        if hasattr(flags, "concurrency"):
+            instrument_pool(client, flags.tcp_keepalive, flags.max_idle)
+            if flags.prewarm:
+                prewarm(client, flags.prewarm)
+        if getattr(flags, "request_compression_algorithm", None) == "auto":
+            from triton_onnx_demo.compression import AdaptiveCompressionClient, CompressionPolicy
+
+            client = AdaptiveCompressionClient(client, CompressionPolicy(flags.link_mbps))
+        return client
+
+    urls = [url for url in flags.url.split(",") if url]
+    if len(urls) == 1:
+        client = connect(urls[0], **kwargs)
+    elif not hasattr(flags, "balance"):
+        raise ValueError("--url takes a single server URL for this client")
+    else:
+        from triton_onnx_demo.balancer import BalancedClient
+
+        client = BalancedClient(
+            urls,
+            policy=flags.balance,
+            model_names=model_names,
+            health_interval_s=flags.health_interval,
+            client_factory=connect,
+            **kwargs,
+        )
+        client.start()
+    if getattr(flags, "fallback_repository", None):
+        from triton_onnx_demo.fallback import FallbackClient, LocalEngine
+
+        latency_ms = flags.fallback_latency_ms
+        client = FallbackClient(
+            client,
+            LocalEngine(flags.fallback_repository),
+            latency_threshold_s=None if latency_ms is None else latency_ms / 1000,
+        )
+    return client
+
+
+def parse_headers(http_headers):
+    if http_headers is None:
+        return None
+    return {l.split(":")[0]: l.split(":")[1] for l in http_headers}
@@ -0,0 +1,253 @@
+"""Per-request choice between sending an inference request compressed or not.
+
+Compression pays off when the transfer time it saves on the link is larger
+than the time spent compressing on the client plus decompressing on the
+server. ``CompressionPolicy`` measures both on real request bodies, per
+algorithm and per power-of-two body size, and compresses only when
+``saved_bytes / link_bandwidth > compress_time + decompress_time``. Bodies
+below ``min_bytes`` (single rows, typically) are never compressed.
+
+``AdaptiveCompressionClient`` applies a policy to every ``infer`` call. It
+builds and sends the request itself, through ``InferenceServerClient._post``,
+so it checks for that method up front: it is private, but present in the
+tritonclient 2.34 to 2.36 that ``pyproject.toml`` allows.
+"""
+import gzip
+import json
+import math
+import time
+import zlib
+from urllib.parse import quote
+
+import tritonclient.http as httpclient
+from tritonclient.utils import InferenceServerException
+
+ALGORITHMS = ("gzip", "deflate")
+# Private InferenceServerClient members AdaptiveCompressionClient relies on.
+_CLIENT_INTERNALS = ("_post", "_verbose")
+
+
+def compress(body, algorithm, level=6):
+    # gzip.compress defaults to level 9, which (as tritonclient uses it) costs
+    # several times the CPU of zlib's default 6 for a few percent smaller bodies.
+    if algorithm == "gzip":
+        return gzip.compress(body, compresslevel=level)
+    if algorithm == "deflate":
+        # Content-Encoding: deflate means the zlib format.
+        return zlib.compress(body, level)
+    raise ValueError("unsupported compression algorithm '{}'".format(algorithm))
+
+
+def decompress(body, algorithm):
+    if algorithm == "gzip":
+        return gzip.decompress(body)
+    if algorithm == "deflate":
+        return zlib.decompress(body)
+    raise ValueError("unsupported compression algorithm '{}'".format(algorithm))
+
+
+def measure(body, algorithm):
+    """Compressed body, compression ratio and compress/decompress seconds."""
+    start = time.perf_counter()
+    compressed = compress(body, algorithm)
+    compressed_at = time.perf_counter()
+    decompress(compressed, algorithm)
+    end = time.perf_counter()
+    return compressed, len(compressed) / len(body), compressed_at - start, end - compressed_at
+
+
+def break_even_mbps(size, ratio, compress_s, decompress_s):
+    """Link speed below which compressing a ``size`` byte body saves time."""
+    cost_s = compress_s + decompress_s
+    saved_bits = size * (1 - ratio) * 8
+    if saved_bits <= 0:
+        return 0.0
+    if cost_s <= 0:
+        return math.inf
+    return saved_bits / cost_s / 1e6
+
+
+class _Estimate:
+    __slots__ = ("ratio", "compress_s_per_byte", "decompress_s_per_byte", "requests")
+
+    def __init__(self, size, ratio, compress_s, decompress_s):
+        self.ratio = ratio
+        self.compress_s_per_byte = compress_s / size
+        self.decompress_s_per_byte = decompress_s / size
+        self.requests = 0
+
+    def update(self, size, ratio, compress_s, decompress_s, weight):
+        self.ratio += weight * (ratio - self.ratio)
+        self.compress_s_per_byte += weight * (compress_s / size - self.compress_s_per_byte)
+        self.decompress_s_per_byte += weight * (
+            decompress_s / size - self.decompress_s_per_byte
+        )
+
+
+def _as_bytes(body):
+    # Requests without binary tensors are encoded as a JSON string.
+    return body.encode() if isinstance(body, str) else body
+
+
+class FixedCompression:
+    """Always sends bodies with ``algorithm``, or as is when it is None."""
+
+    def __init__(self, algorithm=None):
+        if algorithm is not None and algorithm not in ALGORITHMS:
+            raise ValueError("unsupported compression algorithm '{}'".format(algorithm))
+        self.algorithm = algorithm
+
+    def encode(self, body):
+        body = _as_bytes(body)
+        if self.algorithm is None:
+            return body, None
+        return compress(body, self.algorithm), self.algorithm
+
+
+class CompressionPolicy:
+    """Decides per request body whether to compress it, learning from the bodies it sees.
+
+    ``link_mbps`` is the bandwidth between client and server in megabits per
+    second. The first body in each size bucket, and every ``remeasure_every``-th
+    after that, is compressed and decompressed to refresh the estimates (an
+    exponentially weighted average with ``weight``). Decompression is timed on
+    the client as a stand-in for the server's cost.
+    """
+
+    def __init__(self, link_mbps, algorithm="deflate", min_bytes=4096,
+                 remeasure_every=100, weight=0.2):
+        if algorithm not in ALGORITHMS:
+            raise ValueError("unsupported compression algorithm '{}'".format(algorithm))
+        self.link_mbps = link_mbps
+        self.algorithm = algorithm
+        self.min_bytes = min_bytes
+        self.remeasure_every = remeasure_every
+        self.weight = weight
+        self._estimates = {}
+        self.decisions = {"small": 0, "compressed": 0, "uncompressed": 0}
+
+    def _worth_it(self, size, estimate):
+        saved_s = size * (1 - estimate.ratio) * 8 / (self.link_mbps * 1e6)
+        cost_s = size * (estimate.compress_s_per_byte + estimate.decompress_s_per_byte)
+        return saved_s > cost_s
+
+    def encode(self, body):
+        """Returns the body to send and its algorithm (None when sent as is)."""
+        body = _as_bytes(body)
+        size = len(body)
+        if size < self.min_bytes:
+            self.decisions["small"] += 1
+            return body, None
+        bucket = size.bit_length()
+        estimate = self._estimates.get(bucket)
+        compressed = None
+        if estimate is None or estimate.requests % self.remeasure_every == 0:
+            compressed, ratio, compress_s, decompress_s = measure(body, self.algorithm)
+            if estimate is None:
+                estimate = self._estimates[bucket] = _Estimate(
+                    size, ratio, compress_s, decompress_s
+                )
+            else:
+                estimate.update(size, ratio, compress_s, decompress_s, self.weight)
+        estimate.requests += 1
+        if not self._worth_it(size, estimate):
+            self.decisions["uncompressed"] += 1
+            return body, None
+        self.decisions["compressed"] += 1
+        if compressed is None:
+            compressed = compress(body, self.algorithm)
+        return compressed, self.algorithm
+
+    def estimates(self):
+        """Current estimates per size bucket, with the break-even link speed."""
+        return {
+            2 ** (bucket - 1): {
+                "ratio": estimate.ratio,
+                "break_even_mbps": break_even_mbps(
+                    2 ** (bucket - 1),
+                    estimate.ratio,
+                    2 ** (bucket - 1) * estimate.compress_s_per_byte,
+                    2 ** (bucket - 1) * estimate.decompress_s_per_byte,
+                ),
+            }
+            for bucket, estimate in sorted(self._estimates.items())
+        }
+
+
+class AdaptiveCompressionClient:
+    """``InferenceServerClient`` wrapper whose ``infer`` lets a policy pick compression.
+
+    The request body is built once; the policy sees the exact bytes that would
+    be sent. An explicit ``request_compression_algorithm`` of ``gzip`` or
+    ``deflate`` overrides the policy for that request; anything else, such as
+    ``"auto"`` or None, leaves the choice to it. Everything other than
+    ``infer`` goes to the wrapped client, which must be a
+    ``tritonclient.http.InferenceServerClient``.
+    """
+
+    def __init__(self, client, policy):
+        missing = [name for name in _CLIENT_INTERNALS if not hasattr(client, name)]
+        if missing:
+            raise TypeError(
+                "AdaptiveCompressionClient sends requests with the {} of "
+                "tritonclient.http.InferenceServerClient (tritonclient 2.34 to 2.36); "
+                "{} has none".format(", ".join(missing), type(client).__name__))
+        self.client = client
+        self.policy = policy
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def infer(
+        self,
+        model_name,
+        inputs,
+        model_version="",
+        outputs=None,
+        request_id="",
+        priority=0,
+        timeout=None,
+        headers=None,
+        query_params=None,
+        request_compression_algorithm=None,
+        response_compression_algorithm=None,
+        parameters=None,
+    ):
+        body, json_size = self.client.generate_request_body(
+            inputs,
+            outputs=outputs,
+            request_id=request_id,
+            priority=priority,
+            timeout=timeout,
+            parameters=parameters,
+        )
+        headers = dict(headers or {})
+        if request_compression_algorithm in ALGORITHMS:
+            body, algorithm = FixedCompression(request_compression_algorithm).encode(body)
+        else:
+            body, algorithm = self.policy.encode(body)
+        if algorithm is not None:
+            headers["Content-Encoding"] = algorithm
+        if response_compression_algorithm in ALGORITHMS:
+            headers["Accept-Encoding"] = response_compression_algorithm
+        if json_size is not None:
+            headers["Inference-Header-Content-Length"] = json_size
+        if model_version:
+            uri = "v2/models/{}/versions/{}/infer".format(quote(model_name), model_version)
+        else:
+            uri = "v2/models/{}/infer".format(quote(model_name))
+        return self._send(uri, body, headers, query_params)
+
+    def _send(self, uri, body, headers, query_params):
+        # The only use of the wrapped client's internals; see _CLIENT_INTERNALS.
+        response = self.client._post(
+            request_uri=uri, request_body=body, headers=headers, query_params=query_params
+        )
+        if response.status_code != 200:
+            content = response.read()
+            try:
+                message = json.loads(content)["error"]
+            except Exception:
+                message = content.decode(errors="replace")
+            raise InferenceServerException(msg=message, status=str(response.status_code))
+        return httpclient.InferResult(response, self.client._verbose)
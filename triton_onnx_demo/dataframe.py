@@ -0,0 +1,162 @@
+"""Score pandas DataFrames and Arrow tables against a served model.
+
+``FramePredictor.predict(frame)`` maps columns to the model's inputs through a
+``RequestPlan``. Columns are matched by name when ``columns`` is given, or when
+the model has one scalar input per feature and the frame has a column for each.
+Otherwise they are matched by position, and the frame must have exactly as
+many columns as the model takes features. The frame is split into requests of
+up to ``batch_size`` rows, sent ``concurrency`` at a time. The predictions come
+back in frame order: a Series (or a DataFrame, for several values per row) on
+the frame's index, or an Arrow array for an Arrow table.
+
+Conversion copies as little as possible. A frame whose columns are all the
+input dtype is read as one array without conversion, and an Arrow column
+without nulls is used as a view of its buffer. The data is copied once into
+the row-major request layout, and not even that when it is already laid out
+that way. Only ``output`` is requested, and each response is decoded straight
+into one array for the whole frame (see ``ResponsePlan``). Arrow support needs
+the ``pyarrow`` package.
+"""
+import gevent.pool
+import numpy as np
+import pandas as pd
+
+from triton_onnx_demo.model_config import normalize_server_config
+from triton_onnx_demo.request_plan import RequestPlan
+from triton_onnx_demo.response_plan import ResponsePlan
+
+
+def _is_arrow(frame):
+    return type(frame).__module__.split(".")[0] == "pyarrow"
+
+
+class FramePredictor:
+    """``predict(frame)`` for one model; see the module docstring.
+
+    ``output`` defaults to the model's first output. The client's connection
+    pool should hold at least ``concurrency`` connections.
+    """
+
+    def __init__(
+        self,
+        client,
+        model_name,
+        model_version="",
+        columns=None,
+        output=None,
+        batch_size=None,
+        concurrency=1,
+        headers=None,
+    ):
+        self.client = client
+        self.model_name = model_name
+        self.model_version = model_version
+        self.headers = headers
+        self.concurrency = concurrency
+        config = normalize_server_config(
+            client.get_model_config(model_name, model_version, headers=headers)
+        )
+        self.plan = RequestPlan(
+            config,
+            feature_names=columns,
+            keep_arrays=getattr(client, "needs_input_arrays", False),
+        )
+        self.output = output or config["output"][0]["name"]
+        self.responses = ResponsePlan(config, [self.output])
+        limit = self.plan.max_rows
+        if batch_size is None:
+            batch_size = limit or 1024
+        elif limit is not None and batch_size > limit:
+            raise ValueError("model '{}' takes at most {} rows per request".format(
+                model_name, limit))
+        self.batch_size = batch_size
+
+    def _names(self, available):
+        names = self.plan.feature_names
+        if names is not None and all(name in available for name in names):
+            return names
+        if len(available) != self.plan.width:
+            raise ValueError(
+                "model '{}' takes {} features; the frame has {} columns and "
+                "no feature names to select them by".format(
+                    self.model_name, self.plan.width, len(available)))
+        return list(available)
+
+    def _arrow_matrix(self, table):
+        columns = [
+            table.column(name).to_numpy() for name in self._names(table.column_names)
+        ]
+        if len(columns) == 1:
+            return columns[0].reshape(-1, 1)
+        return np.column_stack(columns)
+
+    def _pandas_matrix(self, frame):
+        names = self._names(list(frame.columns))
+        if names != list(frame.columns):
+            frame = frame[names]
+        return frame.to_numpy()
+
+    def _score(self, matrix, start):
+        # Inputs are built before the first yield, so greenlets do not share
+        # the plan's buffers while they are being filled.
+        inputs = self.plan.inputs(matrix[start:start + self.batch_size])
+        return start, self.client.infer(
+            self.model_name,
+            inputs,
+            model_version=self.model_version,
+            outputs=self.responses.requested,
+            headers=self.headers,
+        )
+
+    def predict_numpy(self, matrix):
+        """Predictions for a 2-D feature array, one row per input row."""
+        if len(matrix) == 0:
+            return np.empty((0,), np.float32)
+        try:
+            values = self.responses.buffers(len(matrix))[self.output]
+        except ValueError:
+            # Variable output dims: the shape is only known from the responses.
+            values = None
+        parts = []
+        pool = gevent.pool.Pool(self.concurrency)
+        for start, result in pool.imap(
+            lambda start: self._score(matrix, start),
+            range(0, len(matrix), self.batch_size),
+        ):
+            if values is None:
+                parts.append(self.responses.decode(result)[self.output])
+                continue
+            rows = min(self.batch_size, len(matrix) - start)
+            part = self.responses.decode(result, {self.output: values[start:]})[self.output]
+            if len(part) != rows:
+                raise ValueError("model '{}' returned {} rows for {}".format(
+                    self.model_name, len(part), rows))
+        if values is None:
+            values = np.concatenate(parts)
+        values = values.reshape(len(values), -1)
+        if values.shape[0] != len(matrix):
+            raise ValueError("model '{}' returned {} rows for {}".format(
+                self.model_name, values.shape[0], len(matrix)))
+        return values[:, 0] if values.shape[1] == 1 else values
+
+    def predict(self, frame):
+        if _is_arrow(frame):
+            import pyarrow as pa
+
+            values = self.predict_numpy(self._arrow_matrix(frame))
+            if values.ndim == 1:
+                return pa.array(values)
+            return pa.FixedSizeListArray.from_arrays(pa.array(values.ravel()), values.shape[1])
+        values = self.predict_numpy(self._pandas_matrix(frame))
+        if values.ndim == 1:
+            return pd.Series(values, index=frame.index, name=self.output)
+        return pd.DataFrame(
+            values,
+            index=frame.index,
+            columns=["{}_{}".format(self.output, i) for i in range(values.shape[1])],
+        )
+
+
+def predict(client, model_name, frame, **kwargs):
+    """One-off ``FramePredictor(client, model_name, **kwargs).predict(frame)``."""
+    return FramePredictor(client, model_name, **kwargs).predict(frame)
@@ -0,0 +1,235 @@
+"""In-process fallback scoring for when the inference server is down or overloaded.
+
+``LocalEngine`` loads models from a copy of the model repository (the same
+``xgboost.json``, ``model.txt`` and ``model.onnx`` files the server loads) with
+the stand-in server's backends, and scores ``InferInput`` lists in-process on
+the CPU. It loads a model, and any models its ensemble steps use, on first use.
+The inputs must be ``request_plan.ArrayInput`` objects, which keep the arrays
+they were built from. ``FallbackClient`` sets ``needs_input_arrays``, so
+request plans built for it with ``RequestPlan.from_client`` return them.
+
+``FallbackClient`` wraps a client and sends ``infer`` to the server through a
+``CircuitBreaker``. The breaker opens after ``failure_threshold`` consecutive
+failures (connection errors, 5xx responses) or latency breaches (calls slower
+than ``latency_threshold_s``). While it is open, requests are scored locally.
+After ``open_s`` one request is let through as a probe: if it succeeds in time
+the breaker closes and traffic goes back to the server, otherwise it stays
+open for twice as long, up to ``max_open_s``. A failed remote call is scored
+locally too, so callers only see errors the server would also return locally,
+such as a bad payload (4xx).
+
+Local results are ``LocalResult`` objects with the ``as_numpy``,
+``get_output`` and ``get_response`` methods of ``InferResult``.
+"""
+import time
+
+from tritonclient.utils import InferenceServerException, np_to_triton_dtype
+
+from triton_onnx_demo.artifacts import ArtifactStore, default_cache_dir
+from triton_onnx_demo.balancer import is_replica_failure
+from triton_onnx_demo.model_config import model_dependencies
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def input_array(infer_input):
+    """The array an ``ArrayInput`` was built from."""
+    array = getattr(infer_input, "array", None)
+    if array is None:
+        raise ValueError(
+            "input '{}' keeps no array to score locally; build requests with "
+            "RequestPlan(keep_arrays=True) or request_plan.ArrayInput".format(
+                infer_input.name()
+            )
+        )
+    return array
+
+
+class LocalResult:
+    """Outputs of a local inference, read like an ``InferResult``."""
+
+    def __init__(self, model_name, model_version, outputs):
+        self._model_name = model_name
+        self._model_version = model_version
+        self._outputs = outputs
+
+    def as_numpy(self, name):
+        return self._outputs.get(name)
+
+    def get_output(self, name):
+        data = self._outputs.get(name)
+        if data is None:
+            return None
+        return {"name": name, "datatype": np_to_triton_dtype(data.dtype),
+                "shape": list(data.shape)}
+
+    def get_response(self):
+        return {
+            "model_name": self._model_name,
+            "model_version": self._model_version,
+            "outputs": [self.get_output(name) for name in self._outputs],
+        }
+
+
+class LocalEngine:
+    """Scores requests in-process from the model repository at ``model_repository``.
+
+    ``fil_engine`` is what FIL models evaluate their trees with; see ``FilModel``.
+    Models share ``artifacts``, by default an ``ArtifactStore`` on the default
+    on-disk cache, so a model file used by several models is loaded once.
+    """
+
+    def __init__(self, model_repository, fil_engine="auto", artifacts=None):
+        self.model_repository = model_repository
+        self.fil_engine = fil_engine
+        self.artifacts = artifacts or ArtifactStore(default_cache_dir())
+        self._repositories = {}
+
+    def repository(self, model_name):
+        """The in-memory repository serving ``model_name``, loaded on first use."""
+        repository = self._repositories.get(model_name)
+        if repository is None:
+            from triton_onnx_demo.server.repository import ModelRepository
+
+            names = model_dependencies(self.model_repository, model_name)
+            repository = ModelRepository(
+                self.model_repository, names, self.fil_engine, self.artifacts
+            )
+            if model_name not in repository.names():
+                reason = repository.errors().get(model_name, "not in the repository")
+                raise InferenceServerException(
+                    msg="model '{}' cannot be loaded locally: {}".format(model_name, reason)
+                )
+            self._repositories[model_name] = repository
+        return repository
+
+    def get_model_config(self, model_name, model_version=""):
+        return self.repository(model_name).get(model_name, model_version).config
+
+    def infer(self, model_name, inputs, model_version="", outputs=None, **kwargs):
+        """Score ``inputs`` locally; other ``client.infer`` kwargs are ignored."""
+        repository = self.repository(model_name)
+        model = repository.get(model_name, model_version)
+        tensors = {infer_input.name(): input_array(infer_input) for infer_input in inputs}
+        values = repository.infer(model_name, tensors, model_version or None)
+        if outputs:
+            values = {output.name(): values[output.name()] for output in outputs}
+        return LocalResult(model.name, model.version, values)
+
+
+class CircuitBreaker:
+    """Closed, open and half-open states; see the module docstring."""
+
+    def __init__(self, failure_threshold=5, latency_threshold_s=None, open_s=5.0,
+                 max_open_s=60.0):
+        self.failure_threshold = failure_threshold
+        self.latency_threshold_s = latency_threshold_s
+        self.open_s = open_s
+        self.max_open_s = max_open_s
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0
+        self._open_for_s = open_s
+        self._open_until = None
+        self._probing = False
+
+    def allow(self):
+        """Whether the next request may go to the server."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() >= self._open_until:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record(self, latency_s=None, failed=False):
+        """Outcome of a request ``allow`` let through."""
+        self._probing = False
+        breached = (
+            latency_s is not None
+            and self.latency_threshold_s is not None
+            and latency_s > self.latency_threshold_s
+        )
+        if not failed and not breached:
+            self.consecutive_failures = 0
+            self._open_for_s = self.open_s
+            self.state = CLOSED
+            return
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN:
+            self._open_for_s = min(self.max_open_s, 2 * self._open_for_s)
+            self._trip()
+        elif self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._trip()
+
+    def _trip(self):
+        self.state = OPEN
+        self.trips += 1
+        self._open_until = time.monotonic() + self._open_for_s
+
+    def as_dict(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "trips": self.trips,
+        }
+
+
+class FallbackClient:
+    """``infer`` on ``client``, falling back to ``engine``; see the module docstring.
+
+    Extra kwargs configure the ``CircuitBreaker``. Other client methods go to
+    ``client``, except ``get_model_config``, which is read from the local
+    repository when the server cannot answer.
+    """
+
+    # RequestPlan.from_client builds ArrayInput objects for clients that set this.
+    needs_input_arrays = True
+
+    def __init__(self, client, engine, **kwargs):
+        self.client = client
+        self.engine = engine
+        self.breaker = CircuitBreaker(**kwargs)
+        self.remote = 0
+        self.local = 0
+        self.fallbacks = 0
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def get_model_config(self, model_name, model_version="", headers=None, **kwargs):
+        try:
+            return self.client.get_model_config(model_name, model_version, headers=headers,
+                                                **kwargs)
+        except Exception as e:
+            if not is_replica_failure(e):
+                raise
+            return self.engine.get_model_config(model_name, model_version)
+
+    def infer(self, model_name, inputs, **kwargs):
+        if not self.breaker.allow():
+            self.local += 1
+            return self.engine.infer(model_name, inputs, **kwargs)
+        start = time.monotonic()
+        try:
+            result = self.client.infer(model_name, inputs, **kwargs)
+        except Exception as e:
+            if not is_replica_failure(e):
+                self.breaker.record(time.monotonic() - start)
+                raise
+            self.breaker.record(failed=True)
+            self.fallbacks += 1
+            self.local += 1
+            return self.engine.infer(model_name, inputs, **kwargs)
+        self.breaker.record(time.monotonic() - start)
+        self.remote += 1
+        return result
+
+    def stats(self):
+        stats = self.breaker.as_dict()
+        stats.update(remote=self.remote, local=self.local, fallbacks=self.fallbacks)
+        return stats
@@ -0,0 +1,151 @@
+"""Score one feature batch against several models concurrently.
+
+The batch is packed and serialized once per distinct input layout (models that
+declare the same inputs share the encoded tensors), then every model's requests
+are sent on their own greenlet over a shared client connection pool.
+"""
+import time
+
+import gevent
+import numpy as np
+import tritonclient.http as httpclient
+
+from triton_onnx_demo.model_config import normalize_server_config
+from triton_onnx_demo.packing import layout_key
+from triton_onnx_demo.request_plan import RequestPlan
+
+
+def parse_model_spec(spec):
+    """``"xgboost_model"`` or ``"xgboost_model:2"`` to ``(name, version)``."""
+    name, _, version = spec.partition(":")
+    return name, version
+
+
+class FanOutResult:
+    def __init__(self):
+        self.outputs = {}
+        self.errors = {}
+        self.latency_ms = {}
+        self.encode_ms = 0.0
+        self.total_ms = 0.0
+
+    def as_numpy(self, model, output_name):
+        return self.outputs[model][output_name]
+
+    def report(self):
+        lines = [
+            "encode {:.3f} ms, total {:.3f} ms".format(self.encode_ms, self.total_ms)
+        ]
+        for model in sorted(set(self.latency_ms) | set(self.errors)):
+            if model in self.errors:
+                lines.append("{:<24} FAILED {}".format(model, self.errors[model]))
+            else:
+                lines.append("{:<24} {:>9.3f} ms".format(model, self.latency_ms[model]))
+        return "\n".join(lines)
+
+
+class FanOutScorer:
+    """Fetches each model's config once, then scores batches against all of them.
+
+    The client should be created with ``concurrency`` of at least the number of
+    models, otherwise requests queue for a connection.
+    """
+
+    def __init__(
+        self,
+        client,
+        models,
+        headers=None,
+        request_compression_algorithm=None,
+        response_compression_algorithm=None,
+    ):
+        self._client = client
+        self._headers = headers
+        self._request_compression_algorithm = request_compression_algorithm
+        self._response_compression_algorithm = response_compression_algorithm
+        self._targets = {}
+        self._plans = {}
+        self._config_errors = {}
+        for spec in models:
+            name, version = parse_model_spec(spec)
+            try:
+                config = client.get_model_config(name, version, headers=headers)
+            except Exception as e:
+                # Report it with every result rather than failing the whole set.
+                self._config_errors[spec] = e
+                continue
+            config = normalize_server_config(config)
+            self._targets[spec] = (name, version, config)
+            try:
+                self._plans.setdefault(layout_key(config), RequestPlan(
+                    config, keep_arrays=getattr(client, "needs_input_arrays", False)
+                ))
+            except ValueError as e:
+                self._config_errors[spec] = e
+                del self._targets[spec]
+
+    @property
+    def models(self):
+        return list(self._targets) + list(self._config_errors)
+
+    def _encode(self, config, features):
+        plan = self._plans[layout_key(config)]
+        features = np.asarray(features)
+        if features.ndim == 2 and features.shape[1] > plan.width:
+            # Columns go to inputs left to right; the rest are for other models.
+            features = features[:, :plan.width]
+        return plan.requests(features)
+
+    def _score_one(self, spec, requests, result):
+        name, version, config = self._targets[spec]
+        outputs = [
+            httpclient.InferRequestedOutput(output["name"], binary_data=True)
+            for output in config["output"]
+        ]
+        start = time.perf_counter()
+        try:
+            responses = [
+                self._client.infer(
+                    name,
+                    inputs,
+                    model_version=version,
+                    outputs=outputs,
+                    headers=self._headers,
+                    request_compression_algorithm=self._request_compression_algorithm,
+                    response_compression_algorithm=self._response_compression_algorithm,
+                )
+                for inputs in requests
+            ]
+        except Exception as e:
+            result.errors[spec] = e
+            return
+        result.latency_ms[spec] = (time.perf_counter() - start) * 1000
+        result.outputs[spec] = {
+            output["name"]: np.concatenate(
+                [response.as_numpy(output["name"]) for response in responses]
+            )
+            for output in config["output"]
+        }
+
+    def score(self, features):
+        result = FanOutResult()
+        result.errors.update(self._config_errors)
+        start = time.perf_counter()
+        encoded = {}
+        for spec, (_, _, config) in self._targets.items():
+            key = layout_key(config)
+            if key not in encoded:
+                try:
+                    encoded[key] = self._encode(config, features)
+                except ValueError as e:
+                    result.errors[spec] = e
+        result.encode_ms = (time.perf_counter() - start) * 1000
+
+        greenlets = [
+            gevent.spawn(self._score_one, spec, encoded[layout_key(config)], result)
+            for spec, (_, _, config) in self._targets.items()
+            if layout_key(config) in encoded
+        ]
+        gevent.joinall(greenlets)
+        result.total_ms = (time.perf_counter() - start) * 1000
+        return result
@@ -0,0 +1,284 @@
+"""Look up feature vectors by ID in front of inference, through an in-process cache.
+
+Callers that send entity IDs rather than features score them through a
+``FeatureScorer``. Its ``FeatureLookup`` reads vectors from a backend, which is
+any object with ``get_many(keys)`` returning ``{key: vector}`` for the keys it
+holds. ``SQLiteFeatureStore`` is a local stand-in for tests and demos, and an
+online feature store or LMDB wrapper only needs the same method.
+
+Vectors the backend returns are kept in a bounded ``LRUCache``. Cache misses
+from greenlets that look up at the same time are merged into one backend call.
+The first miss waits ``batch_window_s``, by default one turn of the event
+loop, for others to join it. Looked-up rows are written straight into a feature
+matrix of the model's input dtype. A ``RequestPlan`` sends that matrix without
+another copy when the model has one input.
+
+``FeatureScorer.iter_results(id_batches)`` keeps ``concurrency`` batches in
+flight. Each batch's lookup and inference run on one greenlet, so one batch's
+lookup overlaps another's round trip. The outputs are decoded as with
+``response_plan.iter_results``. IDs the backend does not have raise
+``ValueError`` unless a ``default`` vector is given.
+"""
+import re
+import sqlite3
+from collections import OrderedDict
+
+import gevent
+import gevent.event
+import gevent.pool
+import numpy as np
+
+from triton_onnx_demo.request_plan import RequestPlan
+from triton_onnx_demo.response_plan import ResponsePlan, decode_results
+
+# SQLite's default limit on parameters in one statement.
+_MAX_PARAMETERS = 999
+_TABLE_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class SQLiteFeatureStore:
+    """Feature vectors as ``dtype`` blobs in a SQLite table, keyed by ``str(key)``."""
+
+    def __init__(self, path, table="features", dtype=np.float32):
+        if not _TABLE_RE.match(table):
+            raise ValueError("invalid table name '{}'".format(table))
+        self.path = path
+        self.table = table
+        self.dtype = np.dtype(dtype)
+        self._connection = sqlite3.connect(path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS {} (id TEXT PRIMARY KEY, vector BLOB NOT NULL)".format(table)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    def put_many(self, items):
+        """Store ``(key, vector)`` pairs, replacing existing keys."""
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO {} (id, vector) VALUES (?, ?)".format(self.table),
+                (
+                    (str(key), np.ascontiguousarray(vector, self.dtype).tobytes())
+                    for key, vector in items
+                ),
+            )
+
+    def get_many(self, keys):
+        wanted = {str(key): key for key in keys}
+        ids = list(wanted)
+        found = {}
+        for start in range(0, len(ids), _MAX_PARAMETERS):
+            chunk = ids[start:start + _MAX_PARAMETERS]
+            rows = self._connection.execute(
+                "SELECT id, vector FROM {} WHERE id IN ({})".format(
+                    self.table, ",".join("?" * len(chunk))),
+                chunk,
+            )
+            for key, blob in rows:
+                found[wanted[key]] = np.frombuffer(blob, self.dtype)
+        return found
+
+    def __len__(self):
+        return self._connection.execute("SELECT COUNT(*) FROM {}".format(self.table)).fetchone()[0]
+
+
+class LRUCache:
+    """At most ``capacity`` items, evicting the least recently used; 0 disables it."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        try:
+            value = self._items[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if self.capacity <= 0:
+            return
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+
+class _PendingBatch:
+    """Keys waiting for one backend call, and its outcome."""
+
+    def __init__(self):
+        self.keys = set()
+        self.found = None
+        self.error = None
+        self.done = gevent.event.Event()
+
+
+class FeatureLookup:
+    """Cached, batched ``get_many`` on a backend; see the module docstring."""
+
+    def __init__(self, backend, width, cache_size=100000, default=None, batch_window_s=0.0):
+        self.backend = backend
+        self.width = width
+        self.cache = LRUCache(cache_size)
+        self.default = None if default is None else np.asarray(default)
+        self.batch_window_s = batch_window_s
+        self._pending = None
+        self.lookups = 0
+        self.backend_calls = 0
+        self.backend_keys = 0
+
+    def _fetch(self, batch):
+        gevent.sleep(self.batch_window_s)
+        # Later misses start the next batch.
+        self._pending = None
+        self.backend_calls += 1
+        self.backend_keys += len(batch.keys)
+        try:
+            batch.found = self.backend.get_many(list(batch.keys))
+        except Exception as e:
+            batch.error = e
+        else:
+            for key, vector in batch.found.items():
+                self.cache.put(key, vector)
+        batch.done.set()
+
+    def _backend_get(self, keys):
+        if self._pending is None:
+            self._pending = _PendingBatch()
+            gevent.spawn(self._fetch, self._pending)
+        batch = self._pending
+        batch.keys.update(keys)
+        batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+        return batch.found
+
+    def lookup(self, keys, out=None):
+        """Feature rows for ``keys``, in order, written into ``out`` when given."""
+        self.lookups += 1
+        if out is None:
+            out = np.empty((len(keys), self.width), np.float32)
+        elif len(out) < len(keys) or out.shape[1:] != (self.width,):
+            raise ValueError("{} rows of {} features do not fit an array of shape {}".format(
+                len(keys), self.width, list(out.shape)))
+        out = out[:len(keys)]
+        missed = {}
+        for row, key in enumerate(keys):
+            vector = self.cache.get(key)
+            if vector is None:
+                missed.setdefault(key, []).append(row)
+            else:
+                out[row] = vector
+        if not missed:
+            return out
+        found = self._backend_get(missed)
+        absent = []
+        for key, rows in missed.items():
+            vector = found.get(key, self.default)
+            if vector is None:
+                absent.append(key)
+                continue
+            out[rows] = vector
+        if absent:
+            raise ValueError("no features for ids {}".format(absent[:10]))
+        return out
+
+    def stats(self):
+        """Lookups, cache hits, misses and evictions, and backend calls and keys."""
+        return {
+            "lookups": self.lookups,
+            "cached": len(self.cache),
+            "hits": self.cache.hits,
+            "misses": self.cache.misses,
+            "evictions": self.cache.evictions,
+            "backend_calls": self.backend_calls,
+            "backend_keys": self.backend_keys,
+        }
+
+
+class FeatureScorer:
+    """Scores batches of IDs on one model; see the module docstring.
+
+    ``outputs`` names the outputs to request, all of them by default. The
+    client's connection pool should hold at least ``concurrency`` connections.
+    """
+
+    def __init__(
+        self,
+        client,
+        model_name,
+        lookup,
+        model_version="",
+        outputs=None,
+        headers=None,
+        concurrency=1,
+    ):
+        self.client = client
+        self.model_name = model_name
+        self.model_version = model_version
+        self.headers = headers
+        self.concurrency = concurrency
+        self.lookup = lookup
+        self.requests = RequestPlan.from_client(client, model_name, model_version, headers=headers)
+        self.responses = ResponsePlan.from_client(
+            client, model_name, model_version, headers=headers, outputs=outputs
+        )
+        if self.requests.width != lookup.width:
+            raise ValueError("model '{}' takes {} features; the lookup returns {}".format(
+                model_name, self.requests.width, lookup.width))
+        # In the inputs' dtype, the plan sends a one-input model the matrix as it is.
+        self._dtype = self.requests.dtype or np.float32
+        self._matrices = []
+
+    def _score(self, keys):
+        if self.requests.max_rows is not None and len(keys) > self.requests.max_rows:
+            raise ValueError("model '{}' takes at most {} rows per request, got {}".format(
+                self.model_name, self.requests.max_rows, len(keys)))
+        # Matrices are reused once their rows have been copied into the inputs.
+        if self._matrices and len(self._matrices[-1]) >= len(keys):
+            matrix = self._matrices.pop()
+        else:
+            matrix = np.empty((max(len(keys), self.requests.max_rows or 0), self.lookup.width),
+                              self._dtype)
+        try:
+            inputs = self.requests.inputs(self.lookup.lookup(keys, matrix))
+        finally:
+            self._matrices.append(matrix)
+        return len(keys), self.client.infer(
+            self.model_name,
+            inputs,
+            model_version=self.model_version,
+            outputs=self.responses.requested,
+            headers=self.headers,
+        )
+
+    def score(self, keys):
+        """``{output_name: array}`` for one batch of IDs."""
+        _, result = self._score(keys)
+        return self.responses.decode(result)
+
+    def iter_results(self, id_batches, out=None):
+        """Yield ``(rows, outputs)`` per batch of IDs, in order, reusing one set of buffers."""
+        pool = gevent.pool.Pool(self.concurrency)
+        yield from decode_results(
+            self.responses, pool.imap(self._score, id_batches), self.requests.max_rows, out
+        )
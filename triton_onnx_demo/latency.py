@@ -0,0 +1,35 @@
+"""Latency summaries shared by the clients and benchmarks."""
+import numpy as np
+
+PERCENTILES = (50, 90, 95, 99, 99.9)
+
+
+def percentile_key(p):
+    return "p{}".format(str(p).replace(".", "_"))
+
+
+def summarize(samples_ms):
+    """Count, mean, max and the standard percentiles of a list of latencies in ms."""
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    if samples.size == 0:
+        return {"count": 0}
+    summary = {
+        "count": int(samples.size),
+        "mean": float(samples.mean()),
+        "max": float(samples.max()),
+    }
+    for p, value in zip(PERCENTILES, np.percentile(samples, PERCENTILES)):
+        summary[percentile_key(p)] = float(value)
+    return summary
+
+
+def format_summary(summary):
+    if not summary.get("count"):
+        return "no samples"
+    parts = ["n={}".format(summary["count"]), "mean={:.3f}".format(summary["mean"])]
+    parts.extend(
+        "{}={:.3f}".format(percentile_key(p), summary[percentile_key(p)])
+        for p in PERCENTILES
+    )
+    parts.append("max={:.3f} ms".format(summary["max"]))
+    return " ".join(parts)
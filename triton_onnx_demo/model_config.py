@@ -0,0 +1,368 @@
+"""Reading and writing Triton ``config.pbtxt`` files.
+
+Triton model configs are protobuf text format. This module parses them into
+plain dicts and lists (no protobuf dependency) and can write fields back into an
+existing file without disturbing the parts it does not touch.
+"""
+import numbers
+import os
+import re
+
+# NumPy type of each config data type, by name: numpy is imported on first
+# use, so command line tools that only read configs start quickly.
+_NUMPY_TYPE_NAMES = {
+    "TYPE_BOOL": "bool_",
+    "TYPE_UINT8": "uint8",
+    "TYPE_UINT16": "uint16",
+    "TYPE_UINT32": "uint32",
+    "TYPE_UINT64": "uint64",
+    "TYPE_INT8": "int8",
+    "TYPE_INT16": "int16",
+    "TYPE_INT32": "int32",
+    "TYPE_INT64": "int64",
+    "TYPE_FP16": "float16",
+    "TYPE_FP32": "float32",
+    "TYPE_FP64": "float64",
+    "TYPE_STRING": "object_",
+}
+
+# Fields that are repeated in the ModelConfig proto, so they are always
+# returned as lists even when the file only has a single entry.
+REPEATED_FIELDS = {
+    "input",
+    "output",
+    "dims",
+    "instance_group",
+    "parameters",
+    "model_warmup",
+    "inputs",
+    "preferred_batch_size",
+    "step",
+    "input_map",
+    "output_map",
+    "gpus",
+}
+
+# Fields whose values are enum identifiers and are written without quotes.
+ENUM_FIELDS = {"data_type", "kind", "format"}
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>\s+|\#[^\n]*)
+    |(?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+    |(?P<number>[-+]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?)
+    |(?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+    |(?P<punct>[:{}\[\],;<>])
+    """,
+    re.VERBOSE,
+)
+
+
+class ModelConfigError(ValueError):
+    pass
+
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if match is None:
+            raise ModelConfigError(
+                "unexpected character {!r} at offset {}".format(text[pos], pos)
+            )
+        kind = match.lastgroup
+        if kind != "ws":
+            tokens.append((kind, match.group(), match.start(), match.end()))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text):
+        self._tokens = _tokenize(text)
+        self._pos = 0
+        self.spans = {}
+
+    def _peek(self):
+        if self._pos < len(self._tokens):
+            return self._tokens[self._pos]
+        return None
+
+    def _next(self):
+        token = self._peek()
+        if token is None:
+            raise ModelConfigError("unexpected end of config")
+        self._pos += 1
+        return token
+
+    def _expect(self, value):
+        token = self._next()
+        if token[1] != value:
+            raise ModelConfigError(
+                "expected {!r} at offset {}, got {!r}".format(value, token[2], token[1])
+            )
+        return token
+
+    def parse(self):
+        return self._fields(closing=None, top_level=True)
+
+    def _fields(self, closing, top_level=False):
+        message = {}
+        while True:
+            token = self._peek()
+            if token is None:
+                if closing is not None:
+                    raise ModelConfigError("missing {!r}".format(closing))
+                break
+            if token[1] == closing:
+                break
+            if token[1] in (",", ";"):
+                self._next()
+                continue
+            name_token = self._next()
+            if name_token[0] != "ident":
+                raise ModelConfigError(
+                    "expected field name at offset {}".format(name_token[2])
+                )
+            name = name_token[1]
+            if self._peek() is not None and self._peek()[1] == ":":
+                self._next()
+            value = self._value()
+            if top_level:
+                self.spans.setdefault(name, []).append(
+                    (name_token[2], self._tokens[self._pos - 1][3])
+                )
+            if name in message:
+                existing = message[name]
+                if not isinstance(existing, list) or name not in REPEATED_FIELDS:
+                    message[name] = [existing]
+                if isinstance(value, list):
+                    message[name].extend(value)
+                else:
+                    message[name].append(value)
+            elif name in REPEATED_FIELDS and not isinstance(value, list):
+                message[name] = [value]
+            else:
+                message[name] = value
+        return message
+
+    def _value(self):
+        token = self._next()
+        kind, text = token[0], token[1]
+        if text in ("{", "<"):
+            closing = "}" if text == "{" else ">"
+            message = self._fields(closing)
+            self._expect(closing)
+            return message
+        if text == "[":
+            values = []
+            while self._peek() is not None and self._peek()[1] != "]":
+                values.append(self._value())
+                if self._peek() is not None and self._peek()[1] == ",":
+                    self._next()
+            self._expect("]")
+            return values
+        if kind == "string":
+            return bytes(text[1:-1], "utf-8").decode("unicode_escape")
+        if kind == "number":
+            if re.fullmatch(r"[-+]?\d+", text):
+                return int(text)
+            return float(text)
+        if kind == "ident":
+            if text in ("true", "True"):
+                return True
+            if text in ("false", "False"):
+                return False
+            return text
+        raise ModelConfigError("unexpected {!r} at offset {}".format(text, token[2]))
+
+
+def parse_model_config(text):
+    """Parse the text of a ``config.pbtxt`` into nested dicts and lists."""
+    return _Parser(text).parse()
+
+
+def _format_scalar(key, value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    # numbers covers NumPy scalars too.
+    if isinstance(value, numbers.Integral):
+        return str(int(value))
+    if isinstance(value, numbers.Real):
+        return repr(float(value))
+    if key in ENUM_FIELDS:
+        return str(value)
+    return '"{}"'.format(str(value).replace("\\", "\\\\").replace('"', '\\"'))
+
+
+def _format_field(key, value, indent):
+    pad = "  " * indent
+    if isinstance(value, dict):
+        if not value:
+            return ["{}{} {{}}".format(pad, key)]
+        if len(value) == 1:
+            ((sub_key, sub_value),) = value.items()
+            if not isinstance(sub_value, (dict, list, tuple)):
+                return [
+                    "{}{}: {{ {}: {} }}".format(
+                        pad, key, sub_key, _format_scalar(sub_key, sub_value)
+                    )
+                ]
+        lines = ["{}{} {{".format(pad, key)]
+        for sub_key, sub_value in value.items():
+            lines.extend(_format_field(sub_key, sub_value, indent + 1))
+        lines.append(pad + "}")
+        return lines
+    if isinstance(value, (list, tuple)):
+        if not any(isinstance(item, dict) for item in value):
+            if not value:
+                return ["{}{}: []".format(pad, key)]
+            items = ", ".join(_format_scalar(key, item) for item in value)
+            return ["{}{}: [ {} ]".format(pad, key, items)]
+        lines = ["{}{} [".format(pad, key)]
+        for i, item in enumerate(value):
+            lines.append(pad + "  {")
+            for sub_key, sub_value in item.items():
+                lines.extend(_format_field(sub_key, sub_value, indent + 2))
+            lines.append(pad + ("  }," if i < len(value) - 1 else "  }"))
+        lines.append(pad + "]")
+        return lines
+    return ["{}{}: {}".format(pad, key, _format_scalar(key, value))]
+
+
+def format_model_config(config):
+    """Format a config dict as ``config.pbtxt`` text in the style of this repo."""
+    lines = []
+    for key, value in config.items():
+        lines.extend(_format_field(key, value, 0))
+    return "\n".join(lines) + "\n"
+
+
+def update_config_text(text, fields):
+    """Return ``text`` with the given top-level fields replaced or appended.
+
+    Fields that are not mentioned are left byte-for-byte untouched, so builders
+    can add blocks such as ``model_warmup`` to hand-written configs. A value of
+    ``None`` removes the field.
+    """
+    parser = _Parser(text)
+    parser.parse()
+    edits = []
+    appended = []
+    for key, value in fields.items():
+        spans = parser.spans.get(key, [])
+        replacement = "" if value is None else "\n".join(_format_field(key, value, 0))
+        if spans:
+            edits.append((spans[0][0], spans[0][1], replacement))
+            edits.extend((start, end, "") for start, end in spans[1:])
+        elif value is not None:
+            appended.append(replacement)
+    for start, end, replacement in sorted(edits, reverse=True):
+        if not replacement:
+            # Swallow the trailing newline of a removed block.
+            while end < len(text) and text[end] in " \t":
+                end += 1
+            if end < len(text) and text[end] == "\n":
+                end += 1
+        text = text[:start] + replacement + text[end:]
+    if appended:
+        text = text.rstrip("\n") + "\n" + "\n".join(appended) + "\n"
+    return text
+
+
+def load_model_config(model_dir):
+    """Load ``<model_dir>/config.pbtxt``; the model name defaults to the directory name."""
+    with open(os.path.join(model_dir, "config.pbtxt")) as f:
+        config = parse_model_config(f.read())
+    config.setdefault("name", os.path.basename(os.path.normpath(model_dir)))
+    return config
+
+
+def write_model_config(model_dir, fields):
+    """Update top-level ``fields`` of ``<model_dir>/config.pbtxt`` in place."""
+    path = os.path.join(model_dir, "config.pbtxt")
+    with open(path) as f:
+        text = f.read()
+    with open(path, "w") as f:
+        f.write(update_config_text(text, fields))
+
+
+def normalize_server_config(config):
+    """Normalize a config fetched with ``get_model_config`` to the parsed-file form.
+
+    Triton returns the config as protobuf JSON, where int64 fields such as dims
+    are strings; the local stand-in server already returns plain ints.
+    """
+    config = dict(config)
+    config["max_batch_size"] = int(config.get("max_batch_size", 0))
+    for key in ("input", "output"):
+        config[key] = [
+            dict(tensor, dims=[int(d) for d in tensor.get("dims", [])])
+            for tensor in config.get(key, [])
+        ]
+    return config
+
+
+def list_model_dirs(model_repository):
+    """Return the model directories (those holding a config.pbtxt) in a repository."""
+    model_dirs = []
+    for name in sorted(os.listdir(model_repository)):
+        model_dir = os.path.join(model_repository, name)
+        if os.path.isfile(os.path.join(model_dir, "config.pbtxt")):
+            model_dirs.append(model_dir)
+    return model_dirs
+
+
+def model_dependencies(model_repository, model_name):
+    """``model_name`` followed by every model its ensemble steps use, recursively."""
+    names = [model_name]
+    config = load_model_config(os.path.join(model_repository, model_name))
+    for step in config.get("ensemble_scheduling", {}).get("step", []):
+        for name in model_dependencies(model_repository, step["model_name"]):
+            if name not in names:
+                names.append(name)
+    return names
+
+
+def model_versions(model_dir):
+    """Return the numeric version sub-directories of a model, oldest first."""
+    versions = [
+        int(name)
+        for name in os.listdir(model_dir)
+        if name.isdigit() and os.path.isdir(os.path.join(model_dir, name))
+    ]
+    return sorted(versions)
+
+
+def get_parameter(config, key, default=None):
+    """Return the ``string_value`` of a backend parameter such as ``output_class``."""
+    for parameter in config.get("parameters", []):
+        if parameter.get("key") == key:
+            return parameter.get("value", {}).get("string_value", default)
+    return default
+
+
+def supports_batching(config):
+    return config.get("max_batch_size", 0) > 0
+
+
+def preferred_batch_sizes(config):
+    """Batch sizes a batching model is expected to see under dynamic batching."""
+    if not supports_batching(config):
+        return [1]
+    sizes = list(config.get("dynamic_batching", {}).get("preferred_batch_size", []))
+    if not sizes:
+        sizes = [1, config["max_batch_size"]]
+    return sorted(set(sizes))
+
+
+def numpy_dtype(data_type):
+    import numpy as np
+
+    return getattr(np, _NUMPY_TYPE_NAMES[data_type])
+
+
+def triton_dtype(data_type):
+    """Convert ``TYPE_FP32`` style config types to the ``FP32`` style used on the wire."""
+    return "BYTES" if data_type == "TYPE_STRING" else data_type[len("TYPE_"):]
@@ -0,0 +1,54 @@
+"""How a 2-D feature matrix maps onto the input tensors a model config declares.
+
+Columns are assigned to inputs left to right in declaration order, so a model
+with one ``[4]`` input takes the first four columns and a model with six scalar
+inputs takes the first six, one each. Rows are split into as many requests as
+the model's batching settings require. ``RequestPlan`` does the packing with
+these rules.
+"""
+import numpy as np
+
+from triton_onnx_demo.model_config import supports_batching
+
+
+def rows_per_request(config):
+    """Rows one request can carry, or None when a request takes any number."""
+    if supports_batching(config):
+        return config["max_batch_size"]
+    dims = config["input"][0]["dims"]
+    if len(dims) > 1:
+        return dims[0] if dims[0] > 0 else None
+    return 1
+
+
+def row_width(config, model_input):
+    """Number of feature columns one row contributes to ``model_input``."""
+    dims = list(model_input["dims"])
+    if not supports_batching(config) and len(dims) > 1:
+        dims = dims[1:]
+    if any(d < 0 for d in dims):
+        raise ValueError(
+            "input '{}' has variable feature dims {}".format(model_input["name"], dims)
+        )
+    return int(np.prod(dims))
+
+
+def request_shape(config, model_input, n_rows):
+    dims = list(model_input["dims"])
+    if supports_batching(config):
+        return [n_rows] + dims
+    if len(dims) > 1:
+        return [n_rows] + dims[1:]
+    return dims
+
+
+def layout_key(config):
+    """Models with equal keys accept exactly the same packed tensors."""
+    return (
+        supports_batching(config),
+        rows_per_request(config),
+        tuple(
+            (i["name"], i["data_type"], tuple(i["dims"])) for i in config["input"]
+        ),
+    )
+
@@ -0,0 +1,228 @@
+"""Per-model request plans: validation and packing compiled once from the model config.
+
+A ``RequestPlan`` is built from a model config (the parsed ``config.pbtxt`` or
+what ``get_model_config`` returns). Building it resolves everything a request
+needs: per input its wire dtype, numpy dtype, feature columns and request
+shape, plus the batch limit and the total feature count. After that, turning
+features into ``InferInput`` objects only checks the row count and feature
+count, then copies the columns into reusable per-input buffers with one
+vectorised ``np.copyto`` per input. Columns that already have the input's dtype
+and a C-contiguous layout are used as they are, without a copy.
+
+Features can be a 2-D array (columns in input declaration order, as in
+``triton_onnx_demo.packing``), a DataFrame, one row as a dict or a list of row
+dicts. DataFrames and dicts are matched by ``feature_names``. Models whose
+inputs are all scalars, such as one input per feature, default to their input
+names.
+
+Wrong payloads raise ``ValueError`` before anything is sent. The buffers are
+reused between calls, but ``InferInput`` copies the data when it is set, so the
+returned inputs stay valid after the next call.
+
+``InferInput`` only keeps its data serialized. A plan built with
+``keep_arrays=True`` returns ``ArrayInput`` objects that also keep a copy as an
+array, which ``FallbackClient`` needs to score a request locally.
+``from_client`` turns this on for clients that set ``needs_input_arrays``.
+"""
+import numpy as np
+import tritonclient.http as httpclient
+
+from triton_onnx_demo.model_config import (
+    normalize_server_config,
+    numpy_dtype,
+    supports_batching,
+    triton_dtype,
+)
+from triton_onnx_demo.packing import request_shape, row_width, rows_per_request
+
+
+class ArrayInput(httpclient.InferInput):
+    """An ``InferInput`` that also keeps a copy of its data as ``array``."""
+
+    array = None
+
+    def set_data_from_numpy(self, input_tensor, binary_data=True):
+        result = super().set_data_from_numpy(input_tensor, binary_data=binary_data)
+        self.array = np.array(input_tensor)
+        return result
+
+    def set_shared_memory(self, region_name, byte_size, offset=0):
+        self.array = None
+        return super().set_shared_memory(region_name, byte_size, offset)
+
+
+class _PlannedInput:
+    __slots__ = ("name", "datatype", "dtype", "start", "stop", "shape")
+
+    def __init__(self, config, model_input, start, stop):
+        self.name = model_input["name"]
+        self.datatype = triton_dtype(model_input["data_type"])
+        self.dtype = numpy_dtype(model_input["data_type"])
+        self.start = start
+        self.stop = stop
+        # Request shape with the row count as -1, when rows are a dimension.
+        self.shape = tuple(request_shape(config, model_input, -1))
+
+
+class RequestPlan:
+    """Validates features and packs them into a model's inputs; see the module docstring."""
+
+    def __init__(self, config, feature_names=None, binary_data=True, keep_arrays=False):
+        self.model_name = config.get("name", "")
+        self.batching = supports_batching(config)
+        self.max_rows = rows_per_request(config)
+        self.binary_data = binary_data
+        self._input_class = ArrayInput if keep_arrays else httpclient.InferInput
+        self._inputs = []
+        column = 0
+        for model_input in config["input"]:
+            width = row_width(config, model_input)
+            self._inputs.append(_PlannedInput(config, model_input, column, column + width))
+            column += width
+        self.width = column
+        # The numpy dtype every input shares, or None when they differ.
+        dtypes = {planned.dtype for planned in self._inputs}
+        self.dtype = dtypes.pop() if len(dtypes) == 1 else None
+        if feature_names is None and all(
+            planned.stop - planned.start == 1 for planned in self._inputs
+        ):
+            feature_names = [planned.name for planned in self._inputs]
+        if feature_names is not None and len(feature_names) != self.width:
+            raise ValueError("model '{}' takes {} features, got {} feature names".format(
+                self.model_name, self.width, len(feature_names)))
+        self.feature_names = None if feature_names is None else list(feature_names)
+        self._buffers = {}
+        self._capacity = 0
+
+    @classmethod
+    def from_client(cls, client, model_name, model_version="", headers=None, **kwargs):
+        """Plan for a served model, from ``client.get_model_config``."""
+        config = normalize_server_config(
+            client.get_model_config(model_name, model_version, headers=headers)
+        )
+        kwargs.setdefault("keep_arrays", getattr(client, "needs_input_arrays", False))
+        return cls(config, **kwargs)
+
+    def _matrix(self, features):
+        """``features`` as a 2-D array with ``width`` columns in input order."""
+        if isinstance(features, dict):
+            features = [features]
+        if isinstance(features, list) and features and isinstance(features[0], dict):
+            names = self._require_names()
+            for row in features:
+                if len(row) != self.width:
+                    self._check_names(row)
+            try:
+                return np.array([[row[name] for name in names] for row in features])
+            except KeyError:
+                self._check_names(next(row for row in features if set(row) != set(names)))
+        if hasattr(features, "columns"):
+            names = self._require_names()
+            missing = [name for name in names if name not in features.columns]
+            if missing:
+                raise ValueError("model '{}' is missing features {}".format(
+                    self.model_name, missing))
+            return features[names].to_numpy()
+        matrix = np.asarray(features)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        if matrix.ndim != 2 or matrix.shape[1] != self.width:
+            raise ValueError("model '{}' takes {} features per row, got shape {}".format(
+                self.model_name, self.width, matrix.shape))
+        return matrix
+
+    def _require_names(self):
+        if self.feature_names is None:
+            raise ValueError(
+                "model '{}' has no feature names; pass feature_names to the plan".format(
+                    self.model_name))
+        return self.feature_names
+
+    def _check_names(self, row):
+        missing = [name for name in self.feature_names if name not in row]
+        unexpected = [name for name in row if name not in self.feature_names]
+        raise ValueError("model '{}' row has missing features {} and unexpected {}".format(
+            self.model_name, missing, unexpected))
+
+    def _fill(self, matrix):
+        rows = len(matrix)
+        if rows == 0:
+            raise ValueError("no rows to send to model '{}'".format(self.model_name))
+        if self.max_rows is not None and rows > self.max_rows:
+            raise ValueError("model '{}' takes at most {} rows per request, got {}".format(
+                self.model_name, self.max_rows, rows))
+        if rows > self._capacity:
+            self._capacity = max(rows, self.max_rows or 0, 2 * self._capacity)
+            self._buffers = {
+                planned.name: np.empty(
+                    (self._capacity, planned.stop - planned.start), planned.dtype
+                )
+                for planned in self._inputs
+            }
+        single = len(self._inputs) == 1
+        tensors = {}
+        for planned in self._inputs:
+            columns = matrix if single else matrix[:, planned.start:planned.stop]
+            if columns.dtype == planned.dtype and columns.flags.c_contiguous:
+                # Already laid out as the request needs it; skip the copy.
+                tensors[planned.name] = columns.reshape(planned.shape)
+                continue
+            buffer = self._buffers[planned.name][:rows]
+            try:
+                np.copyto(buffer, columns, casting="same_kind")
+            except (TypeError, ValueError) as e:
+                raise ValueError("model '{}' input '{}' needs {} values: {}".format(
+                    self.model_name, planned.name, planned.dtype.__name__, e)) from None
+            tensors[planned.name] = buffer.reshape(planned.shape)
+        return tensors
+
+    def tensors(self, features):
+        """Validated ``{input_name: array}`` for one request.
+
+        The arrays are views of the plan's buffers, or of ``features`` itself,
+        and may change on the next call.
+        """
+        return self._fill(self._matrix(features))
+
+    def _infer_inputs(self, tensors):
+        inputs = []
+        for planned in self._inputs:
+            data = tensors[planned.name]
+            infer_input = self._input_class(planned.name, list(data.shape), planned.datatype)
+            infer_input.set_data_from_numpy(data, binary_data=self.binary_data)
+            inputs.append(infer_input)
+        return inputs
+
+    def inputs(self, features):
+        """``InferInput`` objects for one request."""
+        return self._infer_inputs(self.tensors(features))
+
+    def validate(self, tensors):
+        """Check a hand-built ``{input_name: array}`` against the model's inputs."""
+        unexpected = sorted(set(tensors) - {planned.name for planned in self._inputs})
+        if unexpected:
+            raise ValueError("model '{}' has no inputs {}".format(self.model_name, unexpected))
+        rows = None
+        for planned in self._inputs:
+            if planned.name not in tensors:
+                raise ValueError("model '{}' is missing input '{}'".format(
+                    self.model_name, planned.name))
+            data = np.asarray(tensors[planned.name])
+            if data.dtype != planned.dtype:
+                raise ValueError("model '{}' input '{}' must be {}, got {}".format(
+                    self.model_name, planned.name, planned.dtype.__name__, data.dtype))
+            if rows is None:
+                rows = data.shape[0] if self.batching and data.ndim else 1
+            expected = [rows if dim == -1 else dim for dim in planned.shape]
+            if len(expected) != data.ndim or any(
+                want >= 0 and want != got for want, got in zip(expected, data.shape)
+            ):
+                raise ValueError("model '{}' input '{}' must have shape {}, got {}".format(
+                    self.model_name, planned.name, expected, list(data.shape)))
+
+    def requests(self, features):
+        """``InferInput`` lists for ``features`` split into as many requests as needed."""
+        matrix = self._matrix(features)
+        step = self.max_rows or len(matrix)
+        return [self._infer_inputs(self._fill(matrix[start:start + step]))
+                for start in range(0, len(matrix), step)]
@@ -0,0 +1,196 @@
+"""Deadlines, retries and hedged requests around ``InferenceServerClient.infer``.
+
+``ResilientClient.infer`` gives each call a deadline. The remaining time is
+sent to the server as the request ``timeout`` (Triton honours it while the
+request is queued for dynamic batching) and bounds the client-side wait.
+Transient failures (connection errors, 429/502/503/504) are retried with
+full-jitter exponential backoff while time remains.
+
+With ``hedge=True``, a duplicate request is sent if the first has not answered
+within the ``hedge_percentile`` of recent latencies, and the first response
+wins. Hedges are capped at ``max_hedge_fraction`` of requests, so load rises by
+at most that fraction. Attempts that lose, or run past the deadline, are not
+interrupted: they finish in the background and give their connection back to
+the pool. Size the pool (``concurrency``) with room for them.
+"""
+import collections
+import random
+import time
+
+import gevent
+import numpy as np
+from tritonclient.utils import InferenceServerException
+
+TRANSIENT_STATUS = {"429", "502", "503", "504"}
+
+
+class DeadlineExceeded(InferenceServerException):
+    def __init__(self, msg="deadline exceeded"):
+        super().__init__(msg=msg, status="504")
+
+
+def is_transient(error):
+    if isinstance(error, DeadlineExceeded):
+        return False
+    if isinstance(error, InferenceServerException):
+        return error.status() in TRANSIENT_STATUS
+    return isinstance(error, (OSError, gevent.Timeout))
+
+
+class ResilienceStats:
+    def __init__(self):
+        self.requests = 0
+        self.attempts = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+        self.failures = 0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class ResilientClient:
+    """Wraps an ``InferenceServerClient`` with deadlines, retries and hedging.
+
+    ``deadline_s`` is the default per-call budget; ``infer`` takes a
+    ``deadline_s`` override. Hedging starts once ``hedge_min_samples``
+    latencies have been seen; the delay follows the last ``window`` of them.
+    """
+
+    def __init__(
+        self,
+        client,
+        deadline_s=None,
+        max_retries=2,
+        backoff_base_s=0.005,
+        backoff_max_s=0.1,
+        hedge=False,
+        hedge_percentile=95,
+        hedge_min_samples=50,
+        max_hedge_fraction=0.05,
+        window=1000,
+        seed=None,
+    ):
+        self.client = client
+        self.deadline_s = deadline_s
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.max_hedge_fraction = max_hedge_fraction
+        self._latencies = collections.deque(maxlen=window)
+        # Latencies recorded so far, and how many there were at the last
+        # refresh: the window's length stops growing once it is full.
+        self._samples = 0
+        self._refreshed_at = 0
+        self._hedge_delay_s = None
+        self._random = random.Random(seed)
+        self.stats = ResilienceStats()
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def hedge_delay_s(self):
+        """Current hedge delay, or None until enough latencies were seen."""
+        if len(self._latencies) < self.hedge_min_samples:
+            return None
+        # Recomputing the percentile per request would cost more than the
+        # request itself for large windows; refresh it every 16 samples.
+        if self._hedge_delay_s is None or self._samples - self._refreshed_at >= 16:
+            self._hedge_delay_s = float(
+                np.percentile(self._latencies, self.hedge_percentile)
+            )
+            self._refreshed_at = self._samples
+        return self._hedge_delay_s
+
+    def _attempt(self, model_name, inputs, deadline, kwargs):
+        if deadline is not None:
+            remaining_us = int((deadline - time.monotonic()) * 1e6)
+            if remaining_us <= 0:
+                raise DeadlineExceeded()
+            kwargs = dict(kwargs, timeout=remaining_us)
+        self.stats.attempts += 1
+        start = time.monotonic()
+        result = self.client.infer(model_name, inputs, **kwargs)
+        self._record_latency(time.monotonic() - start)
+        return result
+
+    def _record_latency(self, latency_s):
+        self._latencies.append(latency_s)
+        self._samples += 1
+
+    def _hedged(self, model_name, inputs, deadline, kwargs):
+        first = gevent.spawn(self._attempt, model_name, inputs, deadline, kwargs)
+        delay = self.hedge_delay_s()
+        budget = self.max_hedge_fraction * self.stats.requests
+        if delay is None or self.stats.hedges + 1 > budget:
+            return first, [first]
+        if deadline is not None:
+            delay = min(delay, max(0.0, deadline - time.monotonic()))
+        first.join(timeout=delay)
+        if first.ready():
+            return first, [first]
+        self.stats.hedges += 1
+        second = gevent.spawn(self._attempt, model_name, inputs, deadline, kwargs)
+        return first, [first, second]
+
+    def _wait(self, greenlets, deadline):
+        """First successful greenlet, else the last to fail; None on deadline."""
+        pending = list(greenlets)
+        failed = None
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done = gevent.wait(pending, timeout=timeout, count=1)
+            if not done:
+                return None
+            for greenlet in done:
+                pending.remove(greenlet)
+                if greenlet.successful():
+                    return greenlet
+                failed = greenlet
+        return failed
+
+    def infer(self, model_name, inputs, deadline_s=None, **kwargs):
+        """``client.infer`` with a deadline, retries and optional hedging.
+
+        Raises ``DeadlineExceeded`` when the deadline passes first, otherwise
+        the last error once retries are exhausted or the error is not transient.
+        """
+        self.stats.requests += 1
+        budget_s = deadline_s if deadline_s is not None else self.deadline_s
+        deadline = None if budget_s is None else time.monotonic() + budget_s
+        attempt = 0
+        while True:
+            if self.hedge:
+                first, greenlets = self._hedged(model_name, inputs, deadline, kwargs)
+            else:
+                first = gevent.spawn(self._attempt, model_name, inputs, deadline, kwargs)
+                greenlets = [first]
+            winner = self._wait(greenlets, deadline)
+            if winner is None:
+                self.stats.deadline_exceeded += 1
+                raise DeadlineExceeded()
+            if winner.successful():
+                if winner is not first:
+                    self.stats.hedge_wins += 1
+                return winner.value
+            error = winner.exception
+            if isinstance(error, DeadlineExceeded):
+                self.stats.deadline_exceeded += 1
+                raise error
+            if not is_transient(error) or attempt >= self.max_retries:
+                self.stats.failures += 1
+                raise error
+            attempt += 1
+            self.stats.retries += 1
+            backoff = self._random.uniform(
+                0, min(self.backoff_max_s, self.backoff_base_s * 2 ** attempt)
+            )
+            if deadline is not None and time.monotonic() + backoff >= deadline:
+                self.stats.deadline_exceeded += 1
+                raise DeadlineExceeded()
+            gevent.sleep(backoff)
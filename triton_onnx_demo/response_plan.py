@@ -0,0 +1,174 @@
+"""Per-model response plans: request only the outputs a caller uses and decode them into reusable buffers.
+
+A ``ResponsePlan`` is the output side of a ``RequestPlan``. It is built from a
+model config and the names of the outputs the caller wants, all of them by
+default. ``requested`` is the matching ``InferRequestedOutput`` list, so the
+server computes and sends only those outputs.
+
+``decode(result, out)`` reads each output straight from the response body into
+the caller's arrays, one ``np.copyto`` per output. ``InferResult.as_numpy``
+would first copy the bytes into a new array. ``out`` maps output names to
+arrays with at least the response's row count, and the returned dict holds
+views of them. ``buffers(rows)`` allocates a set once, for models whose output
+dims are fixed apart from the rows. Without ``out`` the arrays are read-only
+views of the response body, and nothing is copied.
+
+``iter_results`` streams feature batches through a model with ``concurrency``
+requests in flight. Every batch is decoded into the same buffers, so a scoring
+loop allocates no output arrays after the first batch. Each batch's arrays are
+only valid until the iterator advances.
+"""
+import gevent.pool
+import numpy as np
+import tritonclient.http as httpclient
+from tritonclient.utils import triton_to_np_dtype
+
+from triton_onnx_demo.model_config import (
+    normalize_server_config,
+    numpy_dtype,
+    supports_batching,
+)
+
+# Wire types that are not a flat array of fixed size values.
+_DESERIALIZED_TYPES = ("BYTES", "BF16")
+
+
+class _PlannedOutput:
+    __slots__ = ("name", "dtype", "has_rows", "row_shape")
+
+    def __init__(self, config, model_output):
+        self.name = model_output["name"]
+        self.dtype = numpy_dtype(model_output["data_type"])
+        dims = [int(d) for d in model_output.get("reshape", {}).get("shape", model_output["dims"])]
+        if supports_batching(config):
+            self.has_rows, self.row_shape = True, tuple(dims)
+        elif dims and (dims[0] == -1 or len(dims) > 1):
+            self.has_rows, self.row_shape = True, tuple(dims[1:])
+        else:
+            # One row per request, such as a [1] output of a model without batching.
+            self.has_rows, self.row_shape = False, tuple(dims)
+
+
+class ResponsePlan:
+    """Requested outputs and buffer decoding for one model; see the module docstring."""
+
+    def __init__(self, config, outputs=None, binary_data=True):
+        self.model_name = config.get("name", "")
+        declared = {output["name"]: output for output in config["output"]}
+        names = list(declared) if outputs is None else list(outputs)
+        unknown = [name for name in names if name not in declared]
+        if unknown:
+            raise ValueError("model '{}' has no outputs {}; it has {}".format(
+                self.model_name, unknown, list(declared)))
+        self.names = names
+        self._outputs = [_PlannedOutput(config, declared[name]) for name in names]
+        self.requested = [
+            httpclient.InferRequestedOutput(name, binary_data=binary_data) for name in names
+        ]
+
+    @classmethod
+    def from_client(cls, client, model_name, model_version="", headers=None, **kwargs):
+        """Plan for a served model, from ``client.get_model_config``."""
+        config = normalize_server_config(
+            client.get_model_config(model_name, model_version, headers=headers)
+        )
+        return cls(config, **kwargs)
+
+    def buffers(self, rows):
+        """``{output_name: array}`` with room for ``rows`` rows of every output."""
+        buffers = {}
+        for planned in self._outputs:
+            if any(d < 0 for d in planned.row_shape):
+                raise ValueError("model '{}' output '{}' has variable dims {}".format(
+                    self.model_name, planned.name, list(planned.row_shape)))
+            buffers[planned.name] = np.empty((rows,) + planned.row_shape, planned.dtype)
+        return buffers
+
+    def decode(self, result, out=None):
+        """``{output_name: array}`` for one response, written into ``out`` when given."""
+        decoded = {}
+        for planned in self._outputs:
+            output = result.get_output(planned.name)
+            if output is None:
+                raise ValueError("model '{}' returned no output '{}'".format(
+                    self.model_name, planned.name))
+            shape = [int(d) for d in output["shape"]]
+            rows = (shape[0] if shape else 1) if planned.has_rows else 1
+            data = _raw_array(result, output)
+            if data is None:
+                data = result.as_numpy(planned.name)
+            data = data.reshape([rows] + (shape[1:] if planned.has_rows else shape))
+            if out is None:
+                decoded[planned.name] = data
+                continue
+            target = out[planned.name]
+            if len(target) < rows or target.shape[1:] != data.shape[1:]:
+                raise ValueError("model '{}' output '{}' has shape {}; the buffer has {}".format(
+                    self.model_name, planned.name, list(data.shape), list(target.shape)))
+            target = target[:rows]
+            np.copyto(target, data, casting="same_kind")
+            decoded[planned.name] = target
+        return decoded
+
+
+def _raw_array(result, output):
+    """A binary output as an array over the response body, without copying, or None."""
+    size = output.get("parameters", {}).get("binary_data_size")
+    offsets = getattr(result, "_output_name_to_buffer_map", None)
+    if size is None or offsets is None or output["datatype"] in _DESERIALIZED_TYPES:
+        return None
+    start = offsets[output["name"]]
+    return np.frombuffer(
+        memoryview(result._buffer)[start:start + size],
+        dtype=triton_to_np_dtype(output["datatype"]),
+    )
+
+
+def iter_results(
+    client,
+    request_plan,
+    response_plan,
+    batches,
+    model_version="",
+    headers=None,
+    concurrency=1,
+    out=None,
+):
+    """Yield ``(rows, outputs)`` for each feature batch, in order; see the module docstring.
+
+    ``outputs`` are views of ``out``, which must fit the largest batch, or of
+    buffers sized for the model's batch limit and grown when a batch needs
+    more. The next batch overwrites them, so copy anything that has to
+    outlive it.
+    """
+    def score(features):
+        # Inputs are built before the first yield, so greenlets do not share
+        # the request plan's buffers while they are being filled.
+        inputs = request_plan.inputs(features)
+        shape = inputs[0].shape()
+        rows = shape[0] if request_plan.batching or len(shape) > 1 else 1
+        return rows, client.infer(
+            response_plan.model_name,
+            inputs,
+            model_version=model_version,
+            outputs=response_plan.requested,
+            headers=headers,
+        )
+
+    pool = gevent.pool.Pool(concurrency)
+    yield from decode_results(response_plan, pool.imap(score, batches), request_plan.max_rows, out)
+
+
+def decode_results(response_plan, results, max_rows=None, out=None):
+    """Decode ``(rows, result)`` pairs in order into one set of buffers; yields ``(rows, outputs)``.
+
+    Without ``out`` the buffers hold ``max_rows`` rows, growing when a result
+    has more.
+    """
+    owned = out is None
+    capacity = 0
+    for rows, result in results:
+        if owned and rows > capacity:
+            capacity = max(rows, max_rows or 0, 2 * capacity)
+            out = response_plan.buffers(capacity)
+        yield rows, response_plan.decode(result, out)
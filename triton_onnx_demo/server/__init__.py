@@ -0,0 +1,13 @@
+"""A local stand-in for Triton Inference Server.
+
+Serves a model repository over the same HTTP/REST protocol so clients,
+benchmarks and ensembles can be exercised on any machine without a GPU or a
+``tritonserver`` install. FIL models run through the xgboost / lightgbm Python
+packages, a compiled library or NumPy (``--fil-engine``) and ONNX models
+through onnxruntime, so absolute latencies differ from Triton's, but request
+handling, batching and statistics follow its behaviour. Requests are served
+by pre-fork worker processes (``--workers``, see ``workers``), one per
+instance of the model with the largest ``instance_group`` count.
+
+    python -m triton_onnx_demo.server --model-repository models --http-port 8000
+"""
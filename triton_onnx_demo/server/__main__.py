@@ -0,0 +1,105 @@
+import argparse
+import os
+
+from triton_onnx_demo.artifacts import ArtifactStore, default_cache_dir
+from triton_onnx_demo.server.backends import FIL_ENGINES
+from triton_onnx_demo.server.protocol import InferenceHTTPServer
+from triton_onnx_demo.server.repository import ModelRepository
+from triton_onnx_demo.server.workers import WorkerHTTPServer, configured_workers, serve_workers
+
+
+def worker_count(value):
+    return value if value == "auto" else int(value)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m triton_onnx_demo.server")
+    parser.add_argument("--model-repository", default="models")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--http-port", type=int, default=8000)
+    parser.add_argument(
+        "--model",
+        dest="models",
+        action="append",
+        help="Only load this model. Repeatable. Default loads every model.",
+    )
+    parser.add_argument(
+        "--straggler-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of inference requests to delay by --straggler-ms. For "
+        "tail-latency experiments.",
+    )
+    parser.add_argument("--straggler-ms", type=float, default=50.0)
+    parser.add_argument(
+        "--fil-engine",
+        choices=FIL_ENGINES,
+        default="auto",
+        help="What FIL models evaluate their trees with: the xgboost / lightgbm "
+        "library, a compiled library, or NumPy. Default is auto: compiled when "
+        "up to date, else the library, else NumPy.",
+    )
+    parser.add_argument(
+        "--artifact-cache",
+        default=default_cache_dir(),
+        help="Directory for parsed model files, keyed by content. Default is "
+        "%(default)s.",
+    )
+    parser.add_argument(
+        "--no-artifact-cache",
+        action="store_true",
+        help="Parse every model file from scratch; identical files are still "
+        "loaded once.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=worker_count,
+        default="auto",
+        help="Worker processes sharing the listening socket, forked after the "
+        "models are loaded. Default is auto: the largest instance_group count.",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    FLAGS = parser.parse_args()
+
+    workers = FLAGS.workers
+    if workers == "auto":
+        workers = configured_workers(FLAGS.model_repository, FLAGS.models)
+    onnx_threads = None
+    if workers > 1:
+        # OpenMP (xgboost, lightgbm) reads this when first loaded. Its thread
+        # pool would not survive the fork, and the workers fill the cores.
+        os.environ.setdefault("OMP_NUM_THREADS", "1")
+        onnx_threads = 1
+    artifacts = ArtifactStore(
+        None if FLAGS.no_artifact_cache else FLAGS.artifact_cache, onnx_threads
+    )
+    repository = ModelRepository(
+        FLAGS.model_repository, FLAGS.models, FLAGS.fil_engine, artifacts
+    )
+    for name, reason in sorted(repository.errors().items()):
+        print("failed to load '{}': {}".format(name, reason))
+    for model in repository.models():
+        print("loaded '{}' version {}".format(model.name, model.version))
+    print("{requests} artifact requests, {loads} loaded, {disk_hits} of them from the "
+          "artifact cache".format(**artifacts.stats()))
+
+    stragglers = None
+    if FLAGS.straggler_rate > 0:
+        stragglers = (FLAGS.straggler_rate, FLAGS.straggler_ms)
+    address = (FLAGS.host, FLAGS.http_port)
+    if workers > 1:
+        server = WorkerHTTPServer(address, repository, workers, FLAGS.verbose, stragglers)
+        print("serving HTTP on {}:{} with {} workers".format(
+            FLAGS.host, FLAGS.http_port, workers))
+    else:
+        server = InferenceHTTPServer(address, repository, FLAGS.verbose, stragglers)
+        print("serving HTTP on {}:{}".format(FLAGS.host, FLAGS.http_port))
+    try:
+        if workers > 1:
+            serve_workers(server)
+        else:
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
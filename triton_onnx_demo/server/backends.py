@@ -0,0 +1,218 @@
+"""CPU implementations of the Triton backends used by the models in this repo.
+
+Each backend takes a dict of input name to NumPy array and returns a dict of
+output name to NumPy array shaped and typed as declared in ``config.pbtxt``.
+"""
+import os
+
+import numpy as np
+
+from triton_onnx_demo.artifacts import ArtifactStore
+from triton_onnx_demo.model_config import get_parameter, numpy_dtype, supports_batching
+from triton_onnx_demo.tree_compiler import load_compiled
+
+
+FIL_ENGINES = ("auto", "library", "compiled", "numpy")
+
+
+class BackendError(RuntimeError):
+    pass
+
+
+def shape_output(config, output, values):
+    """Reshape ``values`` to the dims declared for ``output`` and cast its type.
+
+    A leading -1 keeps the row count of ``values``, so extra values per row
+    raise ``BackendError`` rather than becoming extra rows.
+    """
+    dims = list(output["dims"])
+    shape = ([-1] if supports_batching(config) else []) + dims
+    if shape.count(-1) > 1:
+        first = shape.index(-1)
+        shape = [d if i == first or d != -1 else 1 for i, d in enumerate(shape)]
+    values = np.asarray(values)
+    if shape and shape[0] == -1 and values.ndim:
+        shape[0] = values.shape[0]
+    try:
+        values = values.reshape(shape)
+    except ValueError:
+        raise BackendError("model '{}' output '{}' has shape {}, which does not fit dims {}".format(
+            config.get("name", ""), output["name"], list(values.shape), dims)) from None
+    return values.astype(numpy_dtype(output["data_type"]), copy=False)
+
+
+def stack_features(config, inputs):
+    """Concatenate the model inputs into one ``(rows, features)`` FP32 matrix.
+
+    FIL models take a single feature matrix, but some configs in this repo declare
+    one input per feature; those are joined column-wise in declaration order.
+    """
+    columns = []
+    for model_input in config["input"]:
+        data = np.asarray(inputs[model_input["name"]], dtype=np.float32)
+        if supports_batching(config) or data.ndim > 1:
+            data = data.reshape(data.shape[0], -1)
+        else:
+            data = data.reshape(1, -1)
+        columns.append(data)
+    if len(columns) == 1:
+        return columns[0]
+    return np.hstack(columns)
+
+
+def fil_model_file(config):
+    """``(model_type, file name)`` a FIL model loads from its version directory."""
+    model_type = get_parameter(config, "model_type", "xgboost")
+    if model_type == "xgboost_json":
+        return model_type, "xgboost.json"
+    if model_type == "xgboost":
+        return model_type, "xgboost.model"
+    if model_type == "lightgbm":
+        return model_type, "model.txt"
+    raise BackendError("unsupported FIL model_type '{}'".format(model_type))
+
+
+def library_predictor(model_type, path, artifacts=None):
+    """Scores for a feature matrix from the xgboost / lightgbm library."""
+    booster = (artifacts or ArtifactStore()).booster(model_type, path)
+    if model_type == "lightgbm":
+        return lambda features: np.asarray(booster.predict(features))
+    return lambda features: np.asarray(booster.inplace_predict(features))
+
+
+class FilModel:
+    """Forest Inference Library stand-in.
+
+    ``engine`` picks what evaluates the trees: ``library`` (xgboost /
+    lightgbm), ``compiled`` (a library built by ``model_builders/compile_trees.py``
+    from the same model file), ``numpy`` (``triton_onnx_demo.trees``) or
+    ``auto``: compiled when up to date, else the library, else NumPy when the
+    library is not installed or cannot read the file. Parsed models come from
+    ``artifacts``, an ``ArtifactStore``.
+    """
+
+    def __init__(self, model_dir, version, config, engine="auto", artifacts=None):
+        if engine not in FIL_ENGINES:
+            raise BackendError("unknown FIL engine '{}'".format(engine))
+        artifacts = artifacts or ArtifactStore()
+        self.config = config
+        model_type, file_name = fil_model_file(config)
+        version_dir = os.path.join(model_dir, str(version))
+        path = os.path.join(version_dir, file_name)
+        self._predict = None
+        if engine in ("auto", "compiled"):
+            compiled = load_compiled(version_dir, file_name, artifacts.digest(path))
+            if compiled is not None:
+                self._predict = compiled.predict
+            elif engine == "compiled":
+                raise BackendError(
+                    "no up-to-date compiled model; run model_builders/compile_trees.py"
+                )
+        if self._predict is None and engine in ("auto", "library"):
+            try:
+                self._predict = library_predictor(model_type, path, artifacts)
+            except Exception:
+                if engine == "library" or model_type == "xgboost":
+                    raise
+        if self._predict is None:
+            self._predict = artifacts.forest(path).predict
+        self.engine = engine
+        self._output_class = get_parameter(config, "output_class", "false") == "true"
+        self._predict_proba = get_parameter(config, "predict_proba", "false") == "true"
+        self._threshold = float(get_parameter(config, "threshold", "0.5"))
+
+    def execute(self, inputs):
+        scores = self._predict(stack_features(self.config, inputs))
+        if scores.ndim == 1:
+            probabilities = np.stack([1.0 - scores, scores], axis=1)
+            labels = (scores > self._threshold).astype(np.int64)
+        else:
+            probabilities = scores
+            labels = np.argmax(scores, axis=1)
+
+        if self._predict_proba:
+            primary = probabilities
+        elif self._output_class:
+            primary = labels
+        elif scores.ndim == 2 and scores.shape[1] == 2:
+            # Two-class softprob: FIL returns the positive class probability.
+            primary = scores[:, 1]
+        else:
+            primary = scores
+        # FIL has a single output; a second declared output gets the probabilities.
+        values = [primary, probabilities]
+        return {
+            output["name"]: shape_output(self.config, output, values[min(i, 1)])
+            for i, output in enumerate(self.config["output"])
+        }
+
+
+class OnnxRuntimeModel:
+    def __init__(self, model_dir, version, config, artifacts=None):
+        self.config = config
+        file_name = config.get("default_model_filename", "model.onnx")
+        self._session = (artifacts or ArtifactStore()).onnx_session(
+            os.path.join(model_dir, str(version), file_name)
+        )
+        self._input_types = {
+            i.name: _ONNX_TO_NUMPY.get(i.type, np.float32) for i in self._session.get_inputs()
+        }
+
+    def execute(self, inputs):
+        feeds = {
+            name: np.asarray(inputs[name], dtype=dtype)
+            for name, dtype in self._input_types.items()
+        }
+        names = [output["name"] for output in self.config["output"]]
+        values = self._session.run(names, feeds)
+        return {
+            output["name"]: shape_output(self.config, output, value)
+            for output, value in zip(self.config["output"], values)
+        }
+
+
+class EnsembleModel:
+    """Runs the steps of ``ensemble_scheduling`` in order through the repository."""
+
+    def __init__(self, model_dir, version, config, repository):
+        self.config = config
+        self._repository = repository
+        self._steps = config.get("ensemble_scheduling", {}).get("step", [])
+        if not self._steps:
+            raise BackendError("ensemble '{}' has no steps".format(config["name"]))
+
+    def execute(self, inputs):
+        tensors = dict(inputs)
+        for step in self._steps:
+            feeds = {item["key"]: tensors[item["value"]] for item in step["input_map"]}
+            version = step.get("model_version", -1)
+            results = self._repository.infer(
+                step["model_name"], feeds, None if version == -1 else str(version)
+            )
+            for item in step["output_map"]:
+                tensors[item["value"]] = results[item["key"]]
+        return {
+            output["name"]: shape_output(self.config, output, tensors[output["name"]])
+            for output in self.config["output"]
+        }
+
+
+_ONNX_TO_NUMPY = {
+    "tensor(float)": np.float32,
+    "tensor(double)": np.float64,
+    "tensor(int32)": np.int32,
+    "tensor(int64)": np.int64,
+    "tensor(bool)": np.bool_,
+    "tensor(uint8)": np.uint8,
+}
+
+
+def load_backend(model_dir, version, config, repository):
+    if config.get("platform") == "ensemble":
+        return EnsembleModel(model_dir, version, config, repository)
+    backend = config.get("backend") or config.get("platform")
+    if backend == "fil":
+        return FilModel(model_dir, version, config, repository.fil_engine, repository.artifacts)
+    if backend in ("onnxruntime", "onnxruntime_onnx"):
+        return OnnxRuntimeModel(model_dir, version, config, repository.artifacts)
+    raise BackendError("unsupported backend '{}'".format(backend))
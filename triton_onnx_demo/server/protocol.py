@@ -0,0 +1,328 @@
+"""KServe v2 HTTP/REST protocol, as spoken by ``tritonclient.http``.
+
+Covers health, metadata, config, statistics, repository index and inference,
+including the binary tensor data extension and gzip/deflate compression.
+"""
+import gzip
+import json
+import random
+import re
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from tritonclient.utils import (
+    deserialize_bytes_tensor,
+    np_to_triton_dtype,
+    serialize_byte_tensor,
+    triton_to_np_dtype,
+)
+
+from triton_onnx_demo.model_config import triton_dtype
+from triton_onnx_demo.server.repository import ModelNotFound, request_batch_size
+from triton_onnx_demo.server.scheduler import RequestTimeout
+
+HEADER_LENGTH = "Inference-Header-Content-Length"
+
+_MODEL_PATH = re.compile(
+    r"^/v2/models/(?P<name>[^/]+)(?:/versions/(?P<version>[^/]+))?"
+    r"(?:/(?P<action>ready|config|stats|infer))?$"
+)
+
+
+SERVER_METADATA = {
+    "name": "triton-onnx-demo",
+    "version": "0",
+    "extensions": ["binary_tensor_data", "statistics", "model_repository"],
+}
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+def decode_tensor(spec, buffer, offset):
+    """Decode one request input; returns the array and the next binary offset."""
+    datatype = spec["datatype"]
+    shape = spec["shape"]
+    size = spec.get("parameters", {}).get("binary_data_size")
+    if size is not None:
+        raw = buffer[offset : offset + size]
+        if datatype == "BYTES":
+            data = deserialize_bytes_tensor(raw)
+        else:
+            data = np.frombuffer(raw, dtype=triton_to_np_dtype(datatype))
+        return data.reshape(shape), offset + size
+    if "data" not in spec:
+        raise ProtocolError("input '{}' has no data".format(spec["name"]))
+    if datatype == "BYTES":
+        values = np.ravel(spec["data"])
+        data = np.array(
+            [v.encode() if isinstance(v, str) else v for v in values], dtype=np.object_
+        )
+    else:
+        data = np.array(spec["data"], dtype=triton_to_np_dtype(datatype))
+    return data.reshape(shape), offset
+
+
+def decode_infer_request(body, header_length=None):
+    """Split an infer request body into its JSON header and input arrays."""
+    if header_length is None:
+        header, buffer = json.loads(body), b""
+    else:
+        header, buffer = json.loads(body[:header_length]), body[header_length:]
+    inputs = {}
+    offset = 0
+    for spec in header.get("inputs", []):
+        inputs[spec["name"]], offset = decode_tensor(spec, buffer, offset)
+    return header, inputs
+
+
+def encode_infer_response(model, header, outputs):
+    """Encode the requested outputs; returns the body and the JSON header length."""
+    requested = header.get("outputs")
+    if requested is None:
+        binary = header.get("parameters", {}).get("binary_data_output", False)
+        requested = [
+            {"name": output["name"], "parameters": {"binary_data": binary}}
+            for output in model.config["output"]
+        ]
+    entries = []
+    chunks = []
+    for spec in requested:
+        name = spec["name"]
+        if name not in outputs:
+            raise ProtocolError(
+                "unexpected inference output '{}' for model '{}'".format(
+                    name, model.name
+                )
+            )
+        data = outputs[name]
+        datatype = np_to_triton_dtype(data.dtype)
+        entry = {"name": name, "datatype": datatype, "shape": list(data.shape)}
+        if spec.get("parameters", {}).get("binary_data", False):
+            if datatype == "BYTES":
+                raw = serialize_byte_tensor(data).tobytes()
+            else:
+                raw = np.ascontiguousarray(data).tobytes()
+            entry["parameters"] = {"binary_data_size": len(raw)}
+            chunks.append(raw)
+        elif datatype == "BYTES":
+            entry["data"] = [
+                v.decode() if isinstance(v, bytes) else v for v in data.ravel()
+            ]
+        else:
+            entry["data"] = data.ravel().tolist()
+        entries.append(entry)
+    response = {
+        "model_name": model.name,
+        "model_version": model.version,
+        "outputs": entries,
+    }
+    if "id" in header:
+        response["id"] = header["id"]
+    json_body = json.dumps(response).encode()
+    if not chunks:
+        return json_body, None
+    return json_body + b"".join(chunks), len(json_body)
+
+
+def validate_inputs(model, inputs):
+    expected = [model_input["name"] for model_input in model.config["input"]]
+    missing = [name for name in expected if name not in inputs]
+    unexpected = [name for name in inputs if name not in expected]
+    if missing or unexpected:
+        # Triton's wording, plus the names, which Triton leaves out.
+        details = []
+        if missing:
+            details.append("missing {}".format(missing))
+        if unexpected:
+            details.append("unexpected {}".format(unexpected))
+        raise ProtocolError(
+            "expected {} inputs but got {} inputs for model '{}': {}".format(
+                len(expected), len(inputs), model.name, ", ".join(details)
+            )
+        )
+    max_batch_size = model.config.get("max_batch_size", 0)
+    batch_size = request_batch_size(model.config, inputs)
+    if max_batch_size > 0 and batch_size > max_batch_size:
+        raise ProtocolError(
+            "inference request batch-size must be <= {} for '{}'".format(
+                max_batch_size, model.name
+            )
+        )
+
+
+def model_metadata(model):
+    def tensors(specs):
+        return [
+            {
+                "name": spec["name"],
+                "datatype": triton_dtype(spec["data_type"]),
+                "shape": ([-1] if model.config.get("max_batch_size", 0) > 0 else [])
+                + list(spec["dims"]),
+            }
+            for spec in specs
+        ]
+
+    return {
+        "name": model.name,
+        "versions": [model.version],
+        "platform": model.config.get("platform") or model.config.get("backend", ""),
+        "inputs": tensors(model.config["input"]),
+        "outputs": tensors(model.config["output"]),
+    }
+
+
+class InferenceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "triton-onnx-demo"
+    # Headers and body go out in separate writes; without TCP_NODELAY the
+    # body waits on the client's delayed ACK and every request gains ~40 ms.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _read_body(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        encoding = self.headers.get("Content-Encoding")
+        if encoding == "gzip":
+            body = gzip.decompress(body)
+        elif encoding == "deflate":
+            body = zlib.decompress(body)
+        return body
+
+    def _send(self, status, body=b"", headers=None):
+        headers = dict(headers or {})
+        accept = self.headers.get("Accept-Encoding", "")
+        if body and "gzip" in accept:
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        elif body and "deflate" in accept:
+            body = zlib.compress(body)
+            headers["Content-Encoding"] = "deflate"
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, str(value))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self._send(status, body, {"Content-Type": "application/json"})
+
+    def _send_error(self, status, message):
+        self._send_json(status, {"error": message})
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method):
+        path = self.path.split("?", 1)[0]
+        repository = self.server.repository
+        try:
+            # Always drain the body so an error does not poison the kept-alive
+            # connection for the next request.
+            body = self._read_body() if method == "POST" else b""
+            if path in ("/v2/health/live", "/v2/health/ready"):
+                self._send(200)
+            elif path == "/v2":
+                self._send_json(200, SERVER_METADATA)
+            elif path == "/v2/models/stats":
+                self._send_json(200, self.server.statistics())
+            elif path == "/v2/repository/index" and method == "POST":
+                self._send_json(200, repository.index())
+            else:
+                match = _MODEL_PATH.match(path)
+                if match is None:
+                    self._send_error(404, "Not Found")
+                    return
+                self._dispatch_model(method, body, **match.groupdict())
+        except ModelNotFound as e:
+            self._send_error(400, str(e))
+        except RequestTimeout as e:
+            # Triton reports expired requests as UNAVAILABLE.
+            self._send_error(503, str(e))
+        except (ProtocolError, ValueError, KeyError) as e:
+            self._send_error(400, str(e))
+        except Exception as e:
+            self._send_error(500, "{}: {}".format(type(e).__name__, e))
+
+    def _dispatch_model(self, method, body, name, version, action):
+        repository = self.server.repository
+        if action == "infer" and method == "POST":
+            self._infer(repository.get(name, version), body)
+        elif action == "ready":
+            repository.get(name, version)
+            self._send(200)
+        elif action == "config":
+            self._send_json(200, repository.get(name, version).config)
+        elif action == "stats":
+            self._send_json(200, self.server.statistics(name, version))
+        elif action is None:
+            self._send_json(200, model_metadata(repository.get(name, version)))
+        else:
+            self._send_error(405, "Method Not Allowed")
+
+    def _infer(self, model, body):
+        start = time.perf_counter_ns()
+        header_length = self.headers.get(HEADER_LENGTH)
+        try:
+            header, inputs = decode_infer_request(
+                body, None if header_length is None else int(header_length)
+            )
+            validate_inputs(model, inputs)
+            decoded = time.perf_counter_ns()
+            stragglers = self.server.stragglers
+            if stragglers and random.random() < stragglers[0]:
+                time.sleep(stragglers[1] / 1000)
+            outputs, timing = model.execute(
+                inputs, header.get("parameters", {}).get("timeout")
+            )
+            executed = time.perf_counter_ns()
+            response, json_length = encode_infer_response(model, header, outputs)
+        except Exception:
+            model.stats.record_request(False, time.perf_counter_ns() - start)
+            raise
+        end = time.perf_counter_ns()
+        batch_size = request_batch_size(model.config, inputs)
+        model.stats.record_request(True, end - start, batch_size, timing["queue"])
+
+        if json_length is None:
+            headers = {"Content-Type": "application/json"}
+        else:
+            headers = {
+                "Content-Type": "application/octet-stream",
+                HEADER_LENGTH: json_length,
+            }
+        durations = [("decode", decoded - start)]
+        durations.extend(timing.items())
+        durations.append(("encode", end - executed))
+        headers["Server-Timing"] = ", ".join(
+            "{};dur={:.3f}".format(name, ns / 1e6) for name, ns in durations
+        )
+        self._send(200, response, headers)
+
+
+class InferenceHTTPServer(ThreadingHTTPServer):
+    """``stragglers=(rate, ms)`` delays that fraction of inference requests by
+    ``ms`` before scheduling, to reproduce tail latency in experiments."""
+
+    daemon_threads = True
+
+    def __init__(self, address, repository, verbose=False, stragglers=None):
+        super().__init__(address, InferenceHandler)
+        self.repository = repository
+        self.verbose = verbose
+        self.stragglers = stragglers
+
+    def statistics(self, name=None, version=None):
+        """The ``/v2/models/stats`` response for a model, or for every model."""
+        return self.repository.statistics(name, version)
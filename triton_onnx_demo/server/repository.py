@@ -0,0 +1,165 @@
+"""Loads a Triton model repository into memory for the local stand-in server."""
+import time
+
+from triton_onnx_demo.artifacts import ArtifactStore
+from triton_onnx_demo.model_config import (
+    list_model_dirs,
+    load_model_config,
+    model_versions,
+    supports_batching,
+)
+from triton_onnx_demo.server.backends import BackendError, load_backend
+from triton_onnx_demo.server.scheduler import ModelScheduler
+from triton_onnx_demo.server.stats import ModelStatistics
+from triton_onnx_demo.warmup import load_warmup_samples
+
+
+class ModelNotFound(LookupError):
+    pass
+
+
+def select_versions(config, versions):
+    """Apply ``version_policy`` (default: latest one) to the available versions."""
+    policy = config.get("version_policy", {})
+    if "all" in policy:
+        return versions
+    if "specific" in policy:
+        wanted = {int(v) for v in policy["specific"].get("versions", [])}
+        return [v for v in versions if v in wanted]
+    num_versions = policy.get("latest", {}).get("num_versions", 1)
+    return versions[-num_versions:]
+
+
+def run_warmup(model_dir, config, backend):
+    """Execute every ``model_warmup`` sample ``count`` times, as Triton does before loading."""
+    samples = load_warmup_samples(model_dir, config)
+    for entry, (_, tensors) in zip(config.get("model_warmup", []), samples):
+        for _ in range(max(1, int(entry.get("count", 1)))):
+            try:
+                backend.execute(tensors)
+            except Exception as e:
+                raise BackendError("model_warmup '{}' failed: {}".format(
+                    entry.get("name", ""), str(e).strip())) from e
+
+
+def request_batch_size(config, inputs):
+    if not supports_batching(config) or not inputs:
+        return 1
+    return next(iter(inputs.values())).shape[0]
+
+
+class ServedModel:
+    def __init__(self, name, version, config, backend):
+        self.name = name
+        self.version = str(version)
+        self.config = config
+        self.backend = backend
+        self.stats = ModelStatistics(name, version)
+        self.scheduler = ModelScheduler(self)
+
+    def execute(self, inputs, timeout_us=None):
+        """Schedule the request; returns the outputs and its ns timings.
+
+        Timings are ``queue``, ``compute_input``, ``compute_infer`` and
+        ``compute_output``; executions are recorded on ``stats``. A request
+        still queued after ``timeout_us`` raises ``RequestTimeout``.
+        """
+        return self.scheduler.submit(inputs, timeout_us)
+
+
+class ModelRepository:
+    """All loadable models in ``path``, keyed by name and version.
+
+    ``fil_engine`` is what FIL models evaluate their trees with; see ``FilModel``.
+    Model files are loaded through ``artifacts``, an ``ArtifactStore``, so
+    entries with identical files share one loaded copy.
+    """
+
+    def __init__(self, path, model_names=None, fil_engine="auto", artifacts=None):
+        self.path = path
+        self.fil_engine = fil_engine
+        self.artifacts = artifacts or ArtifactStore()
+        self._models = {}
+        self._errors = {}
+        for model_dir in list_model_dirs(path):
+            config = load_model_config(model_dir)
+            name = config["name"]
+            if model_names and name not in model_names:
+                continue
+            versions = model_versions(model_dir)
+            if config.get("platform") == "ensemble" and not versions:
+                versions = [1]
+            if not versions:
+                self._errors[name] = "no version directory"
+                continue
+            for version in select_versions(config, versions):
+                try:
+                    backend = load_backend(model_dir, version, config, self)
+                    # A model whose warmup fails is not loaded, as in Triton.
+                    run_warmup(model_dir, config, backend)
+                except Exception as e:
+                    # Native libraries append stack traces; keep the message.
+                    self._errors[name] = (str(e).strip().splitlines() or [repr(e)])[0]
+                    continue
+                served = ServedModel(name, version, config, backend)
+                self._models.setdefault(name, {})[str(version)] = served
+
+    def names(self):
+        return sorted(self._models)
+
+    def errors(self):
+        return dict(self._errors)
+
+    def models(self):
+        for name in self.names():
+            for version in sorted(self._models[name], key=int):
+                yield self._models[name][version]
+
+    def get(self, name, version=None):
+        versions = self._models.get(name)
+        if not versions:
+            raise ModelNotFound(
+                "Request for unknown model: '{}' is not found".format(name)
+            )
+        if not version:
+            return versions[max(versions, key=int)]
+        if str(version) not in versions:
+            raise ModelNotFound(
+                "Request for unknown model: '{}' version {} is not found".format(
+                    name, version
+                )
+            )
+        return versions[str(version)]
+
+    def infer(self, name, inputs, version=None):
+        """Execute a model directly, recording statistics as a single request."""
+        model = self.get(name, version)
+        start = time.perf_counter_ns()
+        try:
+            outputs, timing = model.execute(inputs)
+        except Exception:
+            model.stats.record_request(False, time.perf_counter_ns() - start)
+            raise
+        batch_size = request_batch_size(model.config, inputs)
+        model.stats.record_request(
+            True, time.perf_counter_ns() - start, batch_size, timing["queue"]
+        )
+        return outputs
+
+    def statistics(self, name=None, version=None):
+        if name:
+            models = [self.get(name, version)]
+        else:
+            models = list(self.models())
+        return {"model_stats": [model.stats.as_dict() for model in models]}
+
+    def index(self):
+        entries = [
+            {"name": model.name, "version": model.version, "state": "READY"}
+            for model in self.models()
+        ]
+        entries.extend(
+            {"name": name, "state": "UNAVAILABLE", "reason": reason}
+            for name, reason in sorted(self._errors.items())
+        )
+        return entries
@@ -0,0 +1,225 @@
+"""Request scheduling for the stand-in server: model instances and dynamic batching.
+
+Each model gets ``instance_group`` count worker threads. Models with
+``dynamic_batching`` queue requests and a batcher thread combines them into
+one execution when an instance is free, following Triton's rules in simplified
+form: dispatch as soon as the queued requests fill ``max_batch_size`` or add up
+to a ``preferred_batch_size``, otherwise once the oldest request has waited
+``max_queue_delay_microseconds``. Without ``dynamic_batching`` every request
+is its own execution. Ensembles run their steps in the caller's thread.
+
+Threads are started by the first request a process submits, not at load time:
+they do not survive ``fork``, so pre-fork workers (see ``workers``) start
+their own after loading models in the parent.
+
+Batched outputs are split back into requests by row. An execution whose
+outputs do not have one row per batched input row fails every request in it,
+rather than handing requests rows that belong to others.
+
+A request carrying a ``timeout`` (microseconds, as in Triton) that is still
+queued when it expires fails with ``RequestTimeout`` instead of executing.
+"""
+import collections
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from triton_onnx_demo.model_config import supports_batching
+
+
+def instance_count(config):
+    groups = config.get("instance_group") or [{}]
+    return max(1, sum(int(group.get("count", 1)) for group in groups))
+
+
+class RequestTimeout(Exception):
+    pass
+
+
+class BatchError(RuntimeError):
+    pass
+
+
+class _Request:
+    __slots__ = (
+        "inputs", "rows", "enqueued_ns", "deadline_ns", "done", "outputs", "error", "timing"
+    )
+
+    def __init__(self, inputs, rows, timeout_us=None):
+        self.inputs = inputs
+        self.rows = rows
+        self.enqueued_ns = time.perf_counter_ns()
+        self.deadline_ns = (
+            None if timeout_us is None else self.enqueued_ns + int(timeout_us) * 1000
+        )
+        self.done = threading.Event()
+        self.outputs = None
+        self.error = None
+        self.timing = None
+
+
+class ModelScheduler:
+    """Runs ``model.backend`` for submitted requests; see the module docstring.
+
+    ``submit`` blocks until the request has executed and returns its outputs
+    and a dict of ``queue``, ``compute_input``, ``compute_infer`` and
+    ``compute_output`` nanoseconds. Executions are recorded on ``model.stats``.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        config = model.config
+        self.instances = instance_count(config)
+        self.direct = config.get("platform") == "ensemble"
+        self.has_rows = supports_batching(config)
+        self.batching = supports_batching(config) and "dynamic_batching" in config
+        self.max_batch_size = int(config.get("max_batch_size", 0))
+        dynamic_batching = config.get("dynamic_batching") or {}
+        self.preferred_batch_sizes = {
+            int(size) for size in dynamic_batching.get("preferred_batch_size", [])
+        }
+        self.max_queue_delay_ns = (
+            int(dynamic_batching.get("max_queue_delay_microseconds", 0)) * 1000
+        )
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _start(self):
+        """Start the batcher and instance threads, once per process."""
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pending = collections.deque()
+            self._condition = threading.Condition()
+            self._idle = threading.Semaphore(self.instances)
+            self._work = queue.SimpleQueue()
+            threading.Thread(target=self._batch_loop, daemon=True).start()
+            for _ in range(self.instances):
+                threading.Thread(target=self._instance_loop, daemon=True).start()
+            self._pid = os.getpid()
+
+    def submit(self, inputs, timeout_us=None):
+        rows = 1
+        if self.has_rows and inputs:
+            rows = next(iter(inputs.values())).shape[0]
+        request = _Request(inputs, rows, timeout_us)
+        if self.direct:
+            self._execute([request])
+        else:
+            if self._pid != os.getpid():
+                self._start()
+            with self._condition:
+                self._pending.append(request)
+                self._condition.notify()
+            request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.outputs, request.timing
+
+    def _take(self):
+        """Number of queued requests to dispatch now, or 0 to keep waiting."""
+        if not self.batching:
+            return 1
+        sizes = []
+        rows = 0
+        for request in self._pending:
+            if sizes and rows + request.rows > self.max_batch_size:
+                break
+            rows += request.rows
+            sizes.append(rows)
+        if rows >= self.max_batch_size:
+            return len(sizes)
+        preferred = [i for i, size in enumerate(sizes) if size in self.preferred_batch_sizes]
+        if preferred:
+            return preferred[-1] + 1
+        oldest = self._pending[0].enqueued_ns
+        if time.perf_counter_ns() - oldest >= self.max_queue_delay_ns:
+            return len(sizes)
+        return 0
+
+    def _batch_loop(self):
+        while True:
+            self._idle.acquire()
+            with self._condition:
+                while True:
+                    if self._pending:
+                        take = self._take()
+                        if take:
+                            break
+                        remaining_ns = self._pending[0].enqueued_ns + (
+                            self.max_queue_delay_ns - time.perf_counter_ns()
+                        )
+                        self._condition.wait(max(remaining_ns, 0) / 1e9)
+                    else:
+                        self._condition.wait()
+                batch = [self._pending.popleft() for _ in range(take)]
+            self._work.put(batch)
+
+    def _instance_loop(self):
+        while True:
+            batch = self._work.get()
+            try:
+                self._execute(batch)
+            finally:
+                self._idle.release()
+
+    def _execute(self, batch):
+        start = time.perf_counter_ns()
+        expired = [
+            request
+            for request in batch
+            if request.deadline_ns is not None and request.deadline_ns <= start
+        ]
+        if expired:
+            for request in expired:
+                request.error = RequestTimeout("Request timeout expired")
+                request.done.set()
+            batch = [request for request in batch if request.error is None]
+            if not batch:
+                return
+        try:
+            if len(batch) == 1:
+                inputs = batch[0].inputs
+            else:
+                inputs = {
+                    name: np.concatenate([request.inputs[name] for request in batch])
+                    for name in batch[0].inputs
+                }
+            prepared = time.perf_counter_ns()
+            outputs = self.model.backend.execute(inputs)
+            executed = time.perf_counter_ns()
+            if self.has_rows:
+                rows = sum(request.rows for request in batch)
+                for name, value in outputs.items():
+                    if np.ndim(value) == 0 or len(value) != rows:
+                        raise BatchError(
+                            "model '{}' returned output '{}' of shape {} for {} rows".format(
+                                self.model.name, name, list(np.shape(value)), rows))
+            if len(batch) == 1:
+                batch[0].outputs = outputs
+            else:
+                offsets = np.cumsum([request.rows for request in batch])[:-1]
+                split = {name: np.split(value, offsets) for name, value in outputs.items()}
+                for i, request in enumerate(batch):
+                    request.outputs = {name: parts[i] for name, parts in split.items()}
+            end = time.perf_counter_ns()
+        except Exception as e:
+            for request in batch:
+                request.error = e
+                request.done.set()
+            return
+        rows = sum(request.rows for request in batch)
+        self.model.stats.record_execution(
+            rows, prepared - start, executed - prepared, end - executed, len(batch)
+        )
+        for request in batch:
+            request.timing = {
+                "queue": start - request.enqueued_ns,
+                "compute_input": prepared - start,
+                "compute_infer": executed - prepared,
+                "compute_output": end - executed,
+            }
+            request.done.set()
@@ -0,0 +1,122 @@
+"""Per-model inference statistics in the shape Triton reports them."""
+import threading
+import time
+
+_DURATIONS = ("queue", "compute_input", "compute_infer", "compute_output")
+
+
+def _duration():
+    return {"count": 0, "ns": 0}
+
+
+class ModelStatistics:
+    """Cumulative counters for one model version, as served by ``/v2/models/stats``."""
+
+    def __init__(self, name, version):
+        self.name = name
+        self.version = str(version)
+        self._lock = threading.Lock()
+        self._last_inference = 0
+        self._inference_count = 0
+        self._execution_count = 0
+        self._inference = {key: _duration() for key in ("success", "fail") + _DURATIONS}
+        self._batches = {}
+
+    def record_request(self, success, request_ns, batch_size=1, queue_ns=0):
+        """Record one request; ``request_ns`` covers the whole request."""
+        with self._lock:
+            self._last_inference = int(time.time() * 1000)
+            key = "success" if success else "fail"
+            self._inference[key]["count"] += 1
+            self._inference[key]["ns"] += request_ns
+            if success:
+                self._inference_count += batch_size
+                self._inference["queue"]["count"] += 1
+                self._inference["queue"]["ns"] += queue_ns
+
+    def record_execution(
+        self,
+        batch_size,
+        compute_input_ns,
+        compute_infer_ns,
+        compute_output_ns,
+        requests=1,
+    ):
+        """Record one backend execution covering ``requests`` requests."""
+        timings = {
+            "compute_input": compute_input_ns,
+            "compute_infer": compute_infer_ns,
+            "compute_output": compute_output_ns,
+        }
+        with self._lock:
+            self._execution_count += 1
+            for key, ns in timings.items():
+                self._inference[key]["count"] += requests
+                self._inference[key]["ns"] += ns * requests
+            batch = self._batches.setdefault(
+                batch_size, {key: _duration() for key in timings}
+            )
+            for key, ns in timings.items():
+                batch[key]["count"] += 1
+                batch[key]["ns"] += ns
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "version": self.version,
+                "last_inference": self._last_inference,
+                "inference_count": self._inference_count,
+                "execution_count": self._execution_count,
+                "inference_stats": {
+                    key: dict(value) for key, value in self._inference.items()
+                },
+                "batch_stats": [
+                    {
+                        "batch_size": batch_size,
+                        **{key: dict(value) for key, value in batch.items()},
+                    }
+                    for batch_size, batch in sorted(self._batches.items())
+                ],
+            }
+
+
+def _add_durations(total, durations):
+    for key, value in durations.items():
+        if isinstance(value, dict):
+            entry = total.setdefault(key, _duration())
+            entry["count"] += value["count"]
+            entry["ns"] += value["ns"]
+
+
+def merge_statistics(reports):
+    """Sum ``/v2/models/stats`` responses, such as one per worker process, into one."""
+    merged = {}
+    for report in reports:
+        for stats in report["model_stats"]:
+            key = (stats["name"], stats["version"])
+            total = merged.get(key)
+            if total is None:
+                total = merged[key] = {
+                    "name": stats["name"],
+                    "version": stats["version"],
+                    "last_inference": 0,
+                    "inference_count": 0,
+                    "execution_count": 0,
+                    "inference_stats": {},
+                    "batch_stats": {},
+                }
+            total["last_inference"] = max(total["last_inference"], stats["last_inference"])
+            total["inference_count"] += stats["inference_count"]
+            total["execution_count"] += stats["execution_count"]
+            _add_durations(total["inference_stats"], stats["inference_stats"])
+            for batch in stats["batch_stats"]:
+                _add_durations(
+                    total["batch_stats"].setdefault(batch["batch_size"], {}), batch
+                )
+    for total in merged.values():
+        total["batch_stats"] = [
+            {"batch_size": batch_size, **batch}
+            for batch_size, batch in sorted(total["batch_stats"].items())
+        ]
+    return {"model_stats": list(merged.values())}
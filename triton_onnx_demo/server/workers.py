@@ -0,0 +1,169 @@
+"""Pre-fork worker processes for the stand-in server.
+
+A Python process runs one thread at a time, so the threaded server is held to
+about one core however many ``instance_group`` instances a model has.
+``serve_workers`` takes a ``WorkerHTTPServer`` whose repository is loaded and
+whose socket is listening, and forks worker processes that all accept
+connections on that socket, each with its own request and scheduler threads.
+Models are loaded before the fork, so workers share the pages holding them
+copy-on-write instead of each loading a copy. A model's ``instance_group``
+count is split between the workers, so the pool runs about as many executions
+of it at once as Triton would.
+
+Statistics are counted per worker. Each worker answers statistics queries on a
+Unix socket in a private directory, and ``/v2/models/stats`` on any worker
+returns the sum over all of them. A worker that exits is replaced by a new fork
+of the parent, starting from zero; SIGINT or SIGTERM to the parent stops the
+pool.
+"""
+import json
+import os
+import shutil
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+from triton_onnx_demo.model_config import list_model_dirs, load_model_config
+from triton_onnx_demo.server.protocol import InferenceHTTPServer
+from triton_onnx_demo.server.scheduler import instance_count
+from triton_onnx_demo.server.stats import merge_statistics
+
+STATISTICS_TIMEOUT_S = 5.0
+# A worker that exits sooner than this after starting is restarted after a
+# pause, so one that fails on start does not fork in a tight loop.
+MIN_UPTIME_S = 1.0
+
+
+def configured_workers(model_repository, model_names=None):
+    """The largest ``instance_group`` count of the models to be served."""
+    counts = []
+    for model_dir in list_model_dirs(model_repository):
+        config = load_model_config(model_dir)
+        if config.get("platform") == "ensemble":
+            continue
+        if not model_names or config["name"] in model_names:
+            counts.append(instance_count(config))
+    return max(counts, default=1)
+
+
+class _StatisticsHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        query = json.loads(self.rfile.readline())
+        report = self.server.http_server.local_statistics(query["name"], query["version"])
+        self.wfile.write(json.dumps(report).encode())
+
+
+class WorkerHTTPServer(InferenceHTTPServer):
+    """An ``InferenceHTTPServer`` to be served by ``workers`` forked processes."""
+
+    def __init__(self, address, repository, workers, verbose=False, stragglers=None):
+        super().__init__(address, repository, verbose, stragglers)
+        self.workers = workers
+        self.worker = None
+        # Every worker is woken for each connection; the others must not block
+        # in accept() once one of them has taken it.
+        self.socket.setblocking(False)
+        self.run_dir = tempfile.mkdtemp(prefix="triton-onnx-demo-workers-")
+
+    def _statistics_path(self, worker):
+        return os.path.join(self.run_dir, "worker-{}.sock".format(worker))
+
+    def local_statistics(self, name=None, version=None):
+        """Statistics of this worker alone."""
+        return super().statistics(name, version)
+
+    def statistics(self, name=None, version=None):
+        reports = [self.local_statistics(name, version)]
+        query = json.dumps({"name": name, "version": version}).encode() + b"\n"
+        for worker in range(self.workers):
+            if worker == self.worker:
+                continue
+            try:
+                with socket.socket(socket.AF_UNIX) as peer:
+                    peer.settimeout(STATISTICS_TIMEOUT_S)
+                    peer.connect(self._statistics_path(worker))
+                    peer.sendall(query)
+                    with peer.makefile("rb") as f:
+                        reports.append(json.loads(f.read()))
+            except (OSError, ValueError):
+                # Restarting: its counts went with the process it replaces.
+                continue
+        return merge_statistics(reports)
+
+    def serve_worker(self, worker):
+        """Serve as worker number ``worker``, in a forked process."""
+        self.worker = worker
+        path = self._statistics_path(worker)
+        if os.path.exists(path):
+            os.unlink(path)
+        statistics = socketserver.ThreadingUnixStreamServer(path, _StatisticsHandler)
+        statistics.daemon_threads = True
+        statistics.http_server = self
+        threading.Thread(target=statistics.serve_forever, daemon=True).start()
+        self.serve_forever()
+
+
+def _fork(server, worker):
+    # Anything still buffered would otherwise be written once by every process.
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid:
+        return pid
+    status = 0
+    try:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        server.serve_worker(worker)
+    except KeyboardInterrupt:
+        pass
+    except BaseException:
+        traceback.print_exc()
+        status = 1
+    finally:
+        # Never return into the parent's code.
+        os._exit(status)
+
+
+def serve_workers(server):
+    """Fork ``server.workers`` processes serving ``server`` until SIGINT or SIGTERM."""
+    for model in server.repository.models():
+        scheduler = model.scheduler
+        scheduler.instances = max(1, -(-scheduler.instances // server.workers))
+    started = {}
+    children = {}
+    for worker in range(server.workers):
+        children[_fork(server, worker)] = worker
+        started[worker] = time.monotonic()
+    previous = signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        while True:
+            pid, status = os.wait()
+            worker = children.pop(pid, None)
+            if worker is None:
+                continue
+            print("worker {} exited with status {}; restarting it".format(
+                worker, os.waitstatus_to_exitcode(status)))
+            if time.monotonic() - started[worker] < MIN_UPTIME_S:
+                time.sleep(MIN_UPTIME_S)
+            children[_fork(server, worker)] = worker
+            started[worker] = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        shutil.rmtree(server.run_dir, ignore_errors=True)
@@ -0,0 +1,182 @@
+"""Mirror a sample of live requests to a candidate model version and diff the results.
+
+The primary request is sent and returned exactly as before. Sampled requests
+are re-sent to the candidate on a greenlet over a separate client, so the
+candidate never holds a primary connection and the caller never waits for it.
+"""
+import random
+import time
+
+import gevent
+import numpy as np
+
+from triton_onnx_demo.latency import format_summary, summarize
+
+
+class OutputDiff:
+    def __init__(self, atol):
+        self.atol = atol
+        self.compared = 0
+        self.mismatched = 0
+        self.shape_mismatches = 0
+        self.max_abs_diff = 0.0
+        self._abs_diff_total = 0.0
+        self._elements = 0
+
+    def add(self, primary, candidate):
+        self.compared += 1
+        if primary.shape != candidate.shape:
+            self.shape_mismatches += 1
+            self.mismatched += 1
+            return
+        if primary.dtype.kind in "OSU" or candidate.dtype.kind in "OSU":
+            differs = primary != candidate
+            self.mismatched += int(np.any(differs))
+            return
+        diff = np.abs(primary.astype(np.float64) - candidate.astype(np.float64))
+        if diff.size:
+            self.max_abs_diff = max(self.max_abs_diff, float(diff.max()))
+            self._abs_diff_total += float(diff.sum())
+            self._elements += diff.size
+        self.mismatched += int(np.any(diff > self.atol))
+
+    def as_dict(self):
+        return {
+            "compared": self.compared,
+            "mismatched": self.mismatched,
+            "mismatch_rate": self.mismatched / self.compared if self.compared else 0.0,
+            "shape_mismatches": self.shape_mismatches,
+            "max_abs_diff": self.max_abs_diff,
+            "mean_abs_diff": self._abs_diff_total / self._elements
+            if self._elements
+            else 0.0,
+        }
+
+
+class ShadowReport:
+    def __init__(self, atol):
+        self.atol = atol
+        self.primary_requests = 0
+        self.mirrored = 0
+        self.skipped = 0
+        self.candidate_errors = 0
+        self.outputs = {}
+        self.primary_ms = []
+        self.candidate_ms = []
+
+    def output_diff(self, name):
+        if name not in self.outputs:
+            self.outputs[name] = OutputDiff(self.atol)
+        return self.outputs[name]
+
+    def as_dict(self):
+        deltas = np.subtract(self.candidate_ms, self.primary_ms)
+        return {
+            "primary_requests": self.primary_requests,
+            "mirrored": self.mirrored,
+            "skipped": self.skipped,
+            "candidate_errors": self.candidate_errors,
+            "outputs": {name: diff.as_dict() for name, diff in self.outputs.items()},
+            "primary_latency_ms": summarize(self.primary_ms),
+            "candidate_latency_ms": summarize(self.candidate_ms),
+            "latency_delta_ms": summarize(deltas),
+        }
+
+    def format(self):
+        report = self.as_dict()
+        lines = [
+            "primary requests {primary_requests}, mirrored {mirrored}, skipped "
+            "{skipped}, candidate errors {candidate_errors}".format(**report)
+        ]
+        for name, diff in sorted(report["outputs"].items()):
+            lines.append(
+                "{}: {mismatched}/{compared} mismatched, max |diff| "
+                "{max_abs_diff:.6g}, mean |diff| {mean_abs_diff:.6g}".format(name, **diff)
+            )
+        lines.append("primary   " + format_summary(report["primary_latency_ms"]))
+        lines.append("candidate " + format_summary(report["candidate_latency_ms"]))
+        lines.append("delta     " + format_summary(report["latency_delta_ms"]))
+        return "\n".join(lines)
+
+
+class ShadowClient:
+    """Sends requests to ``primary_version`` and mirrors a fraction to ``candidate_version``.
+
+    ``candidate_client`` should be a separate ``InferenceServerClient`` (it can
+    point at another server); mirrored requests queue on it, never on ``client``.
+    At most ``max_pending`` mirrors are in flight; beyond that, samples are
+    skipped rather than buffered so a slow candidate cannot build up memory.
+    """
+
+    def __init__(
+        self,
+        client,
+        candidate_client,
+        model_name,
+        primary_version="1",
+        candidate_version="2",
+        sample_rate=0.1,
+        max_pending=64,
+        atol=1e-5,
+        seed=None,
+    ):
+        self._client = client
+        self._candidate_client = candidate_client
+        self.model_name = model_name
+        self.primary_version = str(primary_version)
+        self.candidate_version = str(candidate_version)
+        self.sample_rate = sample_rate
+        self.max_pending = max_pending
+        self._random = random.Random(seed)
+        self._pending = set()
+        self.report = ShadowReport(atol)
+
+    def infer(self, inputs, outputs=None, **kwargs):
+        start = time.perf_counter()
+        result = self._client.infer(
+            self.model_name,
+            inputs,
+            model_version=self.primary_version,
+            outputs=outputs,
+            **kwargs,
+        )
+        primary_ms = (time.perf_counter() - start) * 1000
+        self.report.primary_requests += 1
+        if self._random.random() < self.sample_rate:
+            if len(self._pending) < self.max_pending:
+                greenlet = gevent.spawn(
+                    self._mirror, inputs, outputs, kwargs, result, primary_ms
+                )
+                self._pending.add(greenlet)
+                greenlet.link(self._pending.discard)
+            else:
+                self.report.skipped += 1
+        return result
+
+    def _mirror(self, inputs, outputs, kwargs, primary, primary_ms):
+        start = time.perf_counter()
+        try:
+            candidate = self._candidate_client.infer(
+                self.model_name,
+                inputs,
+                model_version=self.candidate_version,
+                outputs=outputs,
+                **kwargs,
+            )
+        except Exception:
+            self.report.candidate_errors += 1
+            return
+        candidate_ms = (time.perf_counter() - start) * 1000
+        self.report.mirrored += 1
+        self.report.primary_ms.append(primary_ms)
+        self.report.candidate_ms.append(candidate_ms)
+        for output in primary.get_response()["outputs"]:
+            name = output["name"]
+            candidate_data = candidate.as_numpy(name)
+            if candidate_data is None:
+                candidate_data = np.empty((0,))
+            self.report.output_diff(name).add(primary.as_numpy(name), candidate_data)
+
+    def drain(self, timeout=None):
+        """Wait for in-flight mirrored requests, e.g. before reading the report."""
+        gevent.joinall(list(self._pending), timeout=timeout)
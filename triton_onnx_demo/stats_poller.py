@@ -0,0 +1,172 @@
+"""Poll server-side model statistics and turn the cumulative counters into a time series.
+
+``get_inference_statistics`` only reports totals since the model was loaded.
+``StatsPoller`` samples them for every loaded model at a fixed interval and
+emits, per model version and interval, request and inference rates, average
+queue / compute time per request and the number of executions at each batch
+size. That shows the batch sizes dynamic batching actually forms under load
+and which stage the time goes to.
+"""
+import json
+import sys
+import time
+
+import gevent
+
+DURATIONS = ("queue", "compute_input", "compute_infer", "compute_output")
+
+
+def _count_ns(entry):
+    return int(entry.get("count", 0)), int(entry.get("ns", 0))
+
+
+def _average_ms(previous, current):
+    count = current[0] - previous[0]
+    return (current[1] - previous[1]) / count / 1e6 if count > 0 else None
+
+
+def interval_stats(previous, current, elapsed_s):
+    """Rates and per-interval averages between two ``model_stats`` entries.
+
+    Returns None if a counter went backwards, i.e. the model was reloaded.
+    """
+    if int(current["inference_count"]) < int(previous["inference_count"]):
+        return None
+    inferences = int(current["inference_count"]) - int(previous["inference_count"])
+    executions = int(current["execution_count"]) - int(previous["execution_count"])
+    prev_stats = previous["inference_stats"]
+    cur_stats = current["inference_stats"]
+    success = [_count_ns(prev_stats["success"]), _count_ns(cur_stats["success"])]
+    fail = [_count_ns(prev_stats["fail"]), _count_ns(cur_stats["fail"])]
+    requests = success[1][0] - success[0][0]
+
+    sample = {
+        "model": current["name"],
+        "version": current["version"],
+        "interval_s": elapsed_s,
+        "request_rate": requests / elapsed_s,
+        "fail_rate": (fail[1][0] - fail[0][0]) / elapsed_s,
+        "inference_rate": inferences / elapsed_s,
+        "execution_rate": executions / elapsed_s,
+        "avg_batch_size": inferences / executions if executions else None,
+        "avg_ms": {"request": _average_ms(*success)},
+        "batch_executions": {},
+    }
+    for key in DURATIONS:
+        sample["avg_ms"][key] = _average_ms(
+            _count_ns(prev_stats.get(key, {})), _count_ns(cur_stats.get(key, {}))
+        )
+
+    previous_batches = {
+        int(batch["batch_size"]): batch for batch in previous.get("batch_stats", [])
+    }
+    for batch in current.get("batch_stats", []):
+        batch_size = int(batch["batch_size"])
+        count = _count_ns(batch["compute_infer"])[0]
+        if batch_size in previous_batches:
+            count -= _count_ns(previous_batches[batch_size]["compute_infer"])[0]
+        if count:
+            sample["batch_executions"][batch_size] = count
+    return sample
+
+
+def format_sample(sample):
+    averages = " ".join(
+        "{}={:.3f}".format(key, value)
+        for key, value in sample["avg_ms"].items()
+        if value is not None
+    )
+    batches = " ".join(
+        "{}x{}".format(size, count)
+        for size, count in sorted(sample["batch_executions"].items())
+    )
+    return "{}:{} {:.1f} req/s {:.1f} inf/s avg batch {} | {} ms | batches {}".format(
+        sample["model"],
+        sample["version"],
+        sample["request_rate"],
+        sample["inference_rate"],
+        "-" if sample["avg_batch_size"] is None else "{:.2f}".format(sample["avg_batch_size"]),
+        averages or "-",
+        batches or "-",
+    )
+
+
+class JsonLinesSeries:
+    """Writes each interval sample as a JSON line."""
+
+    def __init__(self, stream=None):
+        self.stream = stream if stream is not None else sys.stdout
+
+    def emit(self, sample):
+        self.stream.write(json.dumps(sample) + "\n")
+        self.stream.flush()
+
+
+class StatsPoller:
+    """Samples ``get_inference_statistics`` for all models every ``interval_s``.
+
+    Runs on a greenlet so it shares the gevent hub of the tritonclient HTTP
+    client; pass a client that is not also used for latency-sensitive requests,
+    or the polls queue behind them. Intervals with no traffic are skipped
+    unless ``emit_idle`` is set. Samples are kept in ``samples`` and passed to
+    every sink's ``emit``.
+    """
+
+    def __init__(self, client, interval_s=1.0, sinks=(), models=None, emit_idle=False):
+        self._client = client
+        self.interval_s = interval_s
+        self.sinks = list(sinks)
+        self.models = models
+        self.emit_idle = emit_idle
+        self.samples = []
+        self._previous = {}
+        self._greenlet = None
+
+    def _fetch(self):
+        if self.models is None:
+            return self._client.get_inference_statistics()["model_stats"]
+        stats = []
+        for model in self.models:
+            stats.extend(self._client.get_inference_statistics(model)["model_stats"])
+        return stats
+
+    def poll_once(self):
+        now = time.time()
+        new_samples = []
+        for current in self._fetch():
+            key = (current["name"], current["version"])
+            previous = self._previous.get(key)
+            self._previous[key] = (now, current)
+            if previous is None:
+                continue
+            sample = interval_stats(previous[1], current, now - previous[0])
+            if sample is None or (not self.emit_idle and not sample["request_rate"]):
+                continue
+            sample["time"] = now
+            new_samples.append(sample)
+            for sink in self.sinks:
+                sink.emit(sample)
+        self.samples.extend(new_samples)
+        return new_samples
+
+    def _run(self):
+        next_poll = time.monotonic()
+        while True:
+            next_poll += self.interval_s
+            gevent.sleep(max(0.0, next_poll - time.monotonic()))
+            try:
+                self.poll_once()
+            except Exception as e:
+                print("statistics poll failed: " + str(e), file=sys.stderr)
+
+    def start(self):
+        # The first poll only sets the baseline counters.
+        self.poll_once()
+        self._greenlet = gevent.spawn(self._run)
+        return self
+
+    def stop(self):
+        if self._greenlet is not None:
+            self._greenlet.kill()
+            self._greenlet = None
+        return self.poll_once()
@@ -0,0 +1,403 @@
+"""Per-request latency breakdown for HTTP inference calls.
+
+``TracedClient.infer`` runs the same request as ``InferenceServerClient.infer``
+but drives the connection pool itself so each phase can be timed:
+
+* ``encode``  - building (and compressing) the request body from InferInputs
+* ``acquire`` - waiting for a free pooled connection
+* ``send``    - writing the request to the socket
+* ``wait``    - until the response headers arrive (server time plus network)
+* ``server``  - server-side time, from a ``Server-Timing`` response header or,
+  failing that, from inference statistics deltas when enabled
+* ``receive`` - reading the response body
+* ``decode``  - parsing the response and converting every output to NumPy
+
+Phase durations go to one or more sinks. With no tracer, or a disabled one,
+``TracedClient.infer`` is a plain pass-through to the wrapped client.
+
+Wrapping an ``AdaptiveCompressionClient`` (``--request-compression-algorithm
+auto``) keeps its per-request choice: the traced request is compressed exactly
+when the wrapped client would have compressed it.
+
+Driving the pool uses private attributes of ``tritonclient.http``. The wrapped
+client is checked for them with ``client.http_internals`` when the
+``TracedClient`` is built, and a TypeError names any that are missing.
+"""
+import bisect
+import errno
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+import gevent.socket
+from geventhttpclient.response import HTTPSocketPoolResponse
+from tritonclient.utils import InferenceServerException
+
+from triton_onnx_demo.client import http_internals
+from triton_onnx_demo.compression import (
+    ALGORITHMS,
+    AdaptiveCompressionClient,
+    FixedCompression,
+)
+from triton_onnx_demo.latency import format_summary, summarize
+
+PHASES = ("encode", "acquire", "send", "wait", "server", "receive", "decode")
+
+# Bucket upper bounds in ms, roughly x2 apart from 10 us to 10 s.
+DEFAULT_BUCKETS_MS = (
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500,
+    1000, 2500, 5000, 10000,
+)
+
+_SERVER_TIMING = re.compile(r"dur=([0-9.]+)")
+
+
+class Histogram:
+    def __init__(self, buckets_ms=DEFAULT_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, value_ms, n=1):
+        self.counts[bisect.bisect_left(self.buckets_ms, value_ms)] += n
+        self.count += n
+        self.sum_ms += value_ms * n
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile."""
+        if not self.count:
+            return 0.0
+        rank = self.count * q / 100.0
+        seen = 0
+        for bound, count in zip(self.buckets_ms + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class PrometheusTextSink:
+    """Keeps per-model, per-phase histograms and renders Prometheus text format.
+
+    If ``path`` is given, ``flush`` writes the exposition atomically so a
+    node-exporter textfile collector can pick it up.
+    """
+
+    def __init__(self, path=None, buckets_ms=DEFAULT_BUCKETS_MS):
+        self.path = path
+        self.buckets_ms = buckets_ms
+        self.histograms = {}
+
+    def emit(self, model, phases_ms):
+        for phase, value in phases_ms.items():
+            key = (model, phase)
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(self.buckets_ms)
+            self.histograms[key].observe(value)
+
+    def render(self):
+        name = "triton_client_request_phase_seconds"
+        lines = [
+            "# HELP {} Client-side inference request phase duration.".format(name),
+            "# TYPE {} histogram".format(name),
+        ]
+        for (model, phase), histogram in sorted(self.histograms.items()):
+            labels = 'model="{}",phase="{}"'.format(model, phase)
+            cumulative = 0
+            for bound, count in zip(histogram.buckets_ms, histogram.counts):
+                cumulative += count
+                lines.append(
+                    '{}_bucket{{{},le="{}"}} {}'.format(name, labels, bound / 1000, cumulative)
+                )
+            lines.append('{}_bucket{{{},le="+Inf"}} {}'.format(name, labels, histogram.count))
+            lines.append("{}_sum{{{}}} {}".format(name, labels, histogram.sum_ms / 1000))
+            lines.append("{}_count{{{}}} {}".format(name, labels, histogram.count))
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        if self.path is None:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile("w", dir=directory, delete=False) as f:
+            f.write(self.render())
+        os.replace(f.name, self.path)
+
+
+class SummarySink:
+    """Keeps raw samples in memory for a per-phase percentile summary."""
+
+    def __init__(self):
+        self.samples = {}
+
+    def emit(self, model, phases_ms):
+        for phase, value in phases_ms.items():
+            self.samples.setdefault((model, phase), []).append(value)
+
+    def summary(self):
+        return {key: summarize(values) for key, values in self.samples.items()}
+
+    def format(self):
+        order = {phase: i for i, phase in enumerate(PHASES)}
+        lines = []
+        for (model, phase), summary in sorted(
+            self.summary().items(), key=lambda item: (item[0][0], order[item[0][1]])
+        ):
+            lines.append("{} {:<8} {}".format(model, phase, format_summary(summary)))
+        return "\n".join(lines)
+
+    def flush(self):
+        pass
+
+
+class JsonLinesSink:
+    """Writes one JSON object per request with every phase in ms."""
+
+    def __init__(self, stream=None):
+        self.stream = stream if stream is not None else sys.stdout
+
+    def emit(self, model, phases_ms):
+        record = {"time": time.time(), "model": model, "phases_ms": phases_ms}
+        self.stream.write(json.dumps(record) + "\n")
+
+    def flush(self):
+        self.stream.flush()
+
+
+class OpenTelemetrySink:
+    """Records phases on an OpenTelemetry histogram instrument.
+
+    Needs the ``opentelemetry-api`` package; exporting is configured through
+    the usual OpenTelemetry SDK MeterProvider setup.
+    """
+
+    def __init__(self, meter=None):
+        if meter is None:
+            from opentelemetry import metrics
+
+            meter = metrics.get_meter("triton_onnx_demo.tracing")
+        self._histogram = meter.create_histogram(
+            "triton.client.request.phase.duration",
+            unit="ms",
+            description="Client-side inference request phase duration.",
+        )
+
+    def emit(self, model, phases_ms):
+        for phase, value in phases_ms.items():
+            self._histogram.record(value, {"model": model, "phase": phase})
+
+    def flush(self):
+        pass
+
+
+class RequestTracer:
+    def __init__(self, sinks, enabled=True):
+        self.sinks = list(sinks)
+        self.enabled = enabled
+
+    def record(self, model, phases_ms):
+        for sink in self.sinks:
+            sink.emit(model, phases_ms)
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+
+
+def server_timing_ms(value):
+    """Sum the ``dur`` entries of a ``Server-Timing`` header, or None."""
+    if not value:
+        return None
+    durations = _SERVER_TIMING.findall(value)
+    if not durations:
+        return None
+    return sum(float(d) for d in durations)
+
+
+class _StatsServerTime:
+    """Average server time per request from inference statistics deltas."""
+
+    def __init__(self, client, interval_s):
+        self._client = client
+        self._interval_s = interval_s
+        self._last = {}
+
+    def sample(self, model, version):
+        now = time.perf_counter()
+        key = (model, version)
+        previous = self._last.get(key)
+        if previous is not None and now - previous[0] < self._interval_s:
+            return None
+        stats = self._client.get_inference_statistics(model, version)["model_stats"]
+        success = stats[0]["inference_stats"]["success"]
+        count, ns = int(success["count"]), int(success["ns"])
+        self._last[key] = (now, count, ns)
+        if previous is None or count <= previous[1]:
+            return None
+        return (count - previous[1], (ns - previous[2]) / (count - previous[1]) / 1e6)
+
+
+class TracedClient:
+    """Wraps an ``InferenceServerClient`` and times each phase of ``infer``.
+
+    ``stats_interval_s`` enables the statistics fallback for ``server`` time
+    when the server does not send ``Server-Timing`` (Triton does not); every
+    interval the average server time since the last sample is recorded once
+    per request completed in between.
+
+    The request body is compressed with an explicit ``gzip`` or ``deflate``
+    algorithm, or, when ``client`` is an ``AdaptiveCompressionClient``, as its
+    policy decides for any other value. ``"auto"`` without such a client is a
+    ValueError.
+    """
+
+    def __init__(self, client, tracer=None, stats_interval_s=None):
+        self.client = client
+        self.tracer = tracer
+        self._stub, _ = http_internals(client, "TracedClient")
+        self._policy = client.policy if isinstance(client, AdaptiveCompressionClient) else None
+        self._stats = (
+            _StatsServerTime(client, stats_interval_s) if stats_interval_s else None
+        )
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def infer(
+        self,
+        model_name,
+        inputs,
+        model_version="",
+        outputs=None,
+        request_id="",
+        priority=0,
+        timeout=None,
+        headers=None,
+        request_compression_algorithm=None,
+        response_compression_algorithm=None,
+        parameters=None,
+    ):
+        if self.tracer is None or not self.tracer.enabled:
+            return self.client.infer(
+                model_name,
+                inputs,
+                model_version=model_version,
+                outputs=outputs,
+                request_id=request_id,
+                priority=priority,
+                timeout=timeout,
+                headers=headers,
+                request_compression_algorithm=request_compression_algorithm,
+                response_compression_algorithm=response_compression_algorithm,
+                parameters=parameters,
+            )
+
+        phases = {}
+        start = time.perf_counter()
+        body, json_size = self.client.generate_request_body(
+            inputs,
+            outputs=outputs,
+            request_id=request_id,
+            priority=priority,
+            timeout=timeout,
+            parameters=parameters,
+        )
+        headers = dict(headers or {})
+        body, algorithm = self._encode(body, request_compression_algorithm)
+        if algorithm is not None:
+            headers["Content-Encoding"] = algorithm
+        if response_compression_algorithm in ALGORITHMS:
+            headers["Accept-Encoding"] = response_compression_algorithm
+        if json_size is not None:
+            headers["Inference-Header-Content-Length"] = json_size
+        if model_version:
+            uri = "v2/models/{}/versions/{}/infer".format(quote(model_name), model_version)
+        else:
+            uri = "v2/models/{}/infer".format(quote(model_name))
+        uri = (self.client._base_uri or "") + "/" + uri
+        request = self._stub._build_request("POST", uri, body=body, headers=headers)
+        request = request.encode() + body
+        now = time.perf_counter()
+        phases["encode"], start = (now - start) * 1000, now
+
+        response = self._exchange(request, phases)
+
+        now = time.perf_counter()
+        response_body = response.read()
+        phases["receive"], start = (time.perf_counter() - now) * 1000, time.perf_counter()
+        if response.status_code != 200:
+            try:
+                message = json.loads(response_body)["error"]
+            except Exception:
+                message = response_body.decode(errors="replace")
+            raise InferenceServerException(msg=message, status=str(response.status_code))
+        header_length = response.get("Inference-Header-Content-Length")
+        result = self.client.parse_response_body(
+            response_body,
+            header_length=None if header_length is None else int(header_length),
+            content_encoding=response.get("Content-Encoding"),
+        )
+        for output in result.get_response().get("outputs", []):
+            result.as_numpy(output["name"])
+        phases["decode"] = (time.perf_counter() - start) * 1000
+
+        server_ms = server_timing_ms(response.get("Server-Timing"))
+        if server_ms is not None:
+            phases["server"] = server_ms
+        self.tracer.record(model_name, phases)
+        if server_ms is None and self._stats is not None:
+            sample = self._stats.sample(model_name, model_version)
+            if sample is not None:
+                completed, average_ms = sample
+                for _ in range(completed):
+                    self.tracer.record(model_name, {"server": average_ms})
+        return result
+
+    def _encode(self, body, request_compression_algorithm):
+        """The body to send and its algorithm, chosen as the wrapped client would."""
+        if request_compression_algorithm in ALGORITHMS:
+            return FixedCompression(request_compression_algorithm).encode(body)
+        if self._policy is not None:
+            return self._policy.encode(body)
+        if request_compression_algorithm == "auto":
+            raise ValueError(
+                "request_compression_algorithm 'auto' needs an AdaptiveCompressionClient"
+            )
+        return FixedCompression().encode(body)
+
+    def _exchange(self, request, phases):
+        pool = self._stub._connection_pool
+        attempts_left = pool.size + 1
+        while True:
+            start = time.perf_counter()
+            sock = pool.get_socket()
+            sent = time.perf_counter()
+            phases["acquire"] = (sent - start) * 1000
+            try:
+                sock.sendall(request)
+            except gevent.socket.error as e:
+                pool.release_socket(sock)
+                # The request was not fully written, so the server cannot have
+                # run it: safe to resend on another connection.
+                if e.errno in (errno.ECONNRESET, errno.EPIPE) and attempts_left > 0:
+                    attempts_left -= 1
+                    continue
+                raise
+            waited = time.perf_counter()
+            phases["send"] = (waited - sent) * 1000
+            # Once the whole request is written, a closed connection may come
+            # after the server ran the inference; resending could run it twice,
+            # so HTTPConnectionClosed goes to the caller.
+            response = HTTPSocketPoolResponse(
+                sock,
+                pool,
+                block_size=self._stub.block_size,
+                method="POST",
+                headers_type=self._stub.headers_type,
+            )
+            phases["wait"] = (time.perf_counter() - waited) * 1000
+            return response
@@ -0,0 +1,214 @@
+"""Compile tree ensembles into native shared libraries, in the spirit of treelite.
+
+``compile_model(source_path, output_dir)`` reads an ``xgboost.json`` or
+LightGBM ``model.txt`` into a ``Forest`` (see ``triton_onnx_demo.trees``) and
+generates C with one function per tree. Each split becomes an ``if`` on a
+constant feature index and threshold, and each leaf a constant return. The C
+is built with the system compiler (``$CC``, default ``cc``) into ``model.so``.
+A ``manifest.json`` beside it records the SHA-256 of the source model, the
+compiler and flags, and the model's shape.
+
+Compiled models live in a ``compiled/`` directory next to the file they were
+built from, in the model's version directory, so they are versioned with it.
+``load_compiled(version_dir, file_name)`` returns a ``CompiledForest`` only
+while the manifest's digest matches the model file, so a retrained model is
+never served with a stale library. Build them with
+``model_builders/compile_trees.py``, which also checks the outputs against the
+xgboost / lightgbm libraries.
+
+No ``-ffast-math``: missing values are routed by NaN comparisons, which it
+would fold away.
+"""
+import ctypes
+import json
+import math
+import os
+import shlex
+import subprocess
+import tempfile
+
+import numpy as np
+
+from triton_onnx_demo.artifacts import content_digest
+from triton_onnx_demo.trees import ZERO_THRESHOLD, load_forest
+
+COMPILED_DIR = "compiled"
+LIBRARY_NAME = "model.so"
+MANIFEST_NAME = "manifest.json"
+COMPILE_FLAGS = ("-O2", "-fPIC", "-shared")
+
+
+def _literal(value, single=False):
+    if math.isinf(value):
+        return "INFINITY" if value > 0 else "-INFINITY"
+    # repr round-trips the double; a float32 value stays exact with an f suffix.
+    return repr(float(value)) + ("f" if single else "")
+
+
+def _condition(forest, node):
+    """C expression that is true when a row goes left at ``node``."""
+    x = "x[{}]".format(forest.feature[node])
+    threshold = _literal(forest.threshold[node], single=forest.comparison == "<")
+    # NaN fails every comparison, so negating the opposite test sends it left.
+    if forest.comparison == "<":
+        test = "!({} >= {})" if forest.default_left[node] else "{} < {}"
+    else:
+        test = "!({} > {})" if forest.default_left[node] else "{} <= {}"
+    test = test.format(x, threshold)
+    if forest.zero_missing[node]:
+        test = "(fabs({}) <= ZERO_THRESHOLD ? {} : {})".format(
+            x, int(forest.default_left[node]), test)
+    return test
+
+
+def _emit_tree(forest, node, indent, lines):
+    pad = "    " * indent
+    if forest.left[node] == -1:
+        lines.append("{}return {};".format(pad, _literal(forest.value[node])))
+        return
+    lines.append("{}if ({}) {{".format(pad, _condition(forest, node)))
+    _emit_tree(forest, forest.left[node], indent + 1, lines)
+    lines.append("{}}} else {{".format(pad))
+    _emit_tree(forest, forest.right[node], indent + 1, lines)
+    lines.append("{}}}".format(pad))
+
+
+def _emit_transform(forest, lines):
+    k = forest.num_outputs
+    if forest.transform == "softmax":
+        lines.extend([
+            "        double top = m[0], total = 0.0;",
+            "        for (int k = 1; k < {}; ++k) if (m[k] > top) top = m[k];".format(k),
+            "        for (int k = 0; k < {}; ++k) {{ m[k] = exp(m[k] - top); total += m[k]; }}".format(k),
+            "        for (int k = 0; k < {}; ++k) out[r * {} + k] = m[k] / total;".format(k, k),
+        ])
+        return
+    value = {
+        "identity": "m[k]",
+        "sigmoid": "1.0 / (1.0 + exp(-{} * m[k]))".format(_literal(forest.sigmoid_scale)),
+        "exp": "exp(m[k])",
+    }[forest.transform]
+    lines.append("        for (int k = 0; k < {}; ++k) out[r * {} + k] = {};".format(k, k, value))
+
+
+def generate_source(forest, source_name=""):
+    """C source for ``forest``: ``tl_predict(data, rows, out)`` and shape getters."""
+    lines = [
+        "/* Generated by triton_onnx_demo.tree_compiler from {}. */".format(
+            source_name or forest.source),
+        "#include <math.h>",
+        "#define ZERO_THRESHOLD {}".format(_literal(ZERO_THRESHOLD)),
+        "",
+        "int tl_num_features(void) {{ return {}; }}".format(forest.num_features),
+        "int tl_num_outputs(void) {{ return {}; }}".format(forest.num_outputs),
+    ]
+    for tree, root in enumerate(forest.roots):
+        lines.append("")
+        lines.append("static double tree_{}(const float *x) {{".format(tree))
+        _emit_tree(forest, root, 1, lines)
+        lines.append("}")
+    lines.extend([
+        "",
+        "void tl_predict(const float *data, long rows, double *out) {",
+        "    for (long r = 0; r < rows; ++r) {",
+        "        const float *x = data + r * {};".format(forest.num_features),
+        "        double m[{}];".format(forest.num_outputs),
+        "        for (int k = 0; k < {}; ++k) m[k] = {};".format(
+            forest.num_outputs, _literal(forest.base_margin)),
+    ])
+    for tree, output in enumerate(forest.tree_class):
+        lines.append("        m[{}] += tree_{}(x);".format(output, tree))
+    _emit_transform(forest, lines)
+    lines.extend(["    }", "}", ""])
+    return "\n".join(lines)
+
+
+def compiler_version(cc):
+    try:
+        result = subprocess.run([cc, "--version"], capture_output=True, text=True)
+    except OSError:
+        return None
+    return (result.stdout.splitlines() or [""])[0]
+
+
+def compile_model(source_path, output_dir, cc=None, flags=COMPILE_FLAGS):
+    """Compile a model file into ``output_dir``; returns the manifest written there."""
+    cc = cc or os.environ.get("CC", "cc")
+    forest = load_forest(source_path)
+    os.makedirs(output_dir, exist_ok=True)
+    source_name = os.path.basename(source_path)
+    with tempfile.TemporaryDirectory() as build_dir:
+        c_path = os.path.join(build_dir, "model.c")
+        with open(c_path, "w") as f:
+            f.write(generate_source(forest, source_name))
+        command = [cc, *flags, "-o", os.path.join(output_dir, LIBRARY_NAME), c_path, "-lm"]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError("{} failed:\n{}".format(shlex.join(command), result.stderr))
+    manifest = {
+        "source": source_name,
+        "source_sha256": content_digest(source_path),
+        "library": LIBRARY_NAME,
+        "compiler": compiler_version(cc),
+        "flags": list(flags),
+        "num_features": forest.num_features,
+        "num_outputs": forest.num_outputs,
+        "num_trees": forest.num_trees,
+    }
+    write_manifest(output_dir, manifest)
+    return manifest
+
+
+def write_manifest(output_dir, manifest):
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def read_manifest(directory):
+    with open(os.path.join(directory, MANIFEST_NAME)) as f:
+        return json.load(f)
+
+
+class CompiledForest:
+    """A compiled model loaded with ctypes; ``predict`` matches the library's output."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest = read_manifest(directory)
+        self._lib = ctypes.CDLL(os.path.join(directory, self.manifest["library"]))
+        self._lib.tl_predict.argtypes = [ctypes.c_void_p, ctypes.c_long, ctypes.c_void_p]
+        self._lib.tl_predict.restype = None
+        self.num_features = self._lib.tl_num_features()
+        self.num_outputs = self._lib.tl_num_outputs()
+        if self.num_features != self.manifest["num_features"]:
+            raise RuntimeError("{} does not match its manifest".format(directory))
+
+    def predict(self, features):
+        """Scores for a ``(rows, num_features)`` matrix: 1-D, or 2-D for several classes."""
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        if features.ndim != 2 or features.shape[1] != self.num_features:
+            raise ValueError("compiled model takes {} features per row, got shape {}".format(
+                self.num_features, features.shape))
+        out = np.empty((features.shape[0], self.num_outputs), np.float64)
+        self._lib.tl_predict(features.ctypes.data, features.shape[0], out.ctypes.data)
+        return out[:, 0] if self.num_outputs == 1 else out
+
+
+def load_compiled(version_dir, file_name, digest=None):
+    """``CompiledForest`` built from ``version_dir/file_name``, or None if absent or stale.
+
+    ``digest`` is the model file's SHA-256, if already known.
+    """
+    directory = os.path.join(version_dir, COMPILED_DIR)
+    try:
+        manifest = read_manifest(directory)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("source") != file_name:
+        return None
+    if manifest.get("source_sha256") != (
+        digest or content_digest(os.path.join(version_dir, file_name))
+    ):
+        return None
+    return CompiledForest(directory)
@@ -0,0 +1,364 @@
+"""Tree ensembles read from FIL model files into flat node arrays.
+
+``load_forest(path)`` parses an XGBoost JSON model (``xgboost.json``) or a
+LightGBM text model (``model.txt``) without the xgboost or lightgbm packages.
+The result is a ``Forest``: every node of every tree is stored in one set of
+contiguous typed arrays (``feature``, ``threshold``, ``left``, ``right``,
+``default_left``, ``zero_missing`` and ``value``), and trees are found through
+``roots``. Leaves have ``left == -1``; their output is ``value``.
+
+At a split, a row goes left when its feature is below the threshold (``<`` for
+XGBoost, ``<=`` for LightGBM). A missing value (NaN, or also zero where
+``zero_missing`` is set) goes to the default side. LightGBM splits that treat
+NaN as zero are stored as NaN splits whose default side is the side zero takes.
+
+The raw score of an output is ``base_margin`` plus the leaves its trees
+(``tree_class``) reach. ``transform`` (identity, sigmoid, softmax or exp)
+turns it into what the library's ``predict`` returns.
+
+``Forest.predict(features)`` evaluates in NumPy alone. Every (row, tree) pair
+holds a current node; one step moves all of them down a level with gathers of
+feature index, threshold and children, so a batch takes ``max_depth`` steps.
+Leaves point to themselves, so pairs that reach a leaf early stay there.
+NaN and zero handling is skipped for chunks that have none to handle.
+Rows are processed ``chunk_rows`` at a time to bound the working set.
+
+``Forest.save(directory)`` writes the arrays as ``.npy`` files, and
+``Forest.load(directory)`` memory-maps them back, without parsing the model.
+"""
+import json
+import math
+import os
+
+import numpy as np
+
+TRANSFORMS = ("identity", "sigmoid", "softmax", "exp")
+NODE_ARRAYS = ("feature", "threshold", "left", "right", "default_left", "zero_missing", "value")
+_SCALARS = (
+    "source", "num_features", "num_outputs", "comparison", "transform", "base_margin",
+    "sigmoid_scale",
+)
+
+_XGBOOST_TRANSFORMS = {
+    "reg:squarederror": "identity",
+    "reg:linear": "identity",
+    "reg:pseudohubererror": "identity",
+    "reg:absoluteerror": "identity",
+    "binary:logitraw": "identity",
+    "binary:logistic": "sigmoid",
+    "reg:logistic": "sigmoid",
+    "multi:softprob": "softmax",
+    "count:poisson": "exp",
+    "reg:gamma": "exp",
+    "reg:tweedie": "exp",
+}
+_LIGHTGBM_TRANSFORMS = {
+    "regression": "identity",
+    "regression_l1": "identity",
+    "huber": "identity",
+    "fair": "identity",
+    "quantile": "identity",
+    "mape": "identity",
+    "binary": "sigmoid",
+    "multiclass": "softmax",
+    "poisson": "exp",
+    "gamma": "exp",
+    "tweedie": "exp",
+}
+# LightGBM's kZeroThreshold: values this close to zero count as zero.
+ZERO_THRESHOLD = 1e-35
+
+
+class Forest:
+    """A tree ensemble as flat node arrays; see the module docstring."""
+
+    def __init__(self, source, num_features, num_outputs, comparison, transform,
+                 base_margin, nodes, roots, tree_class, sigmoid_scale=1.0):
+        if transform not in TRANSFORMS:
+            raise ValueError("unsupported transform '{}'".format(transform))
+        self.source = source
+        self.num_features = num_features
+        self.num_outputs = num_outputs
+        self.comparison = comparison
+        self.transform = transform
+        self.base_margin = base_margin
+        self.sigmoid_scale = sigmoid_scale
+        self.feature = np.asarray(nodes["feature"], np.int32)
+        self.threshold = np.asarray(nodes["threshold"], np.float64)
+        self.left = np.asarray(nodes["left"], np.int32)
+        self.right = np.asarray(nodes["right"], np.int32)
+        self.default_left = np.asarray(nodes["default_left"], np.bool_)
+        self.zero_missing = np.asarray(nodes["zero_missing"], np.bool_)
+        self.value = np.asarray(nodes["value"], np.float64)
+        self.roots = np.asarray(roots, np.int32)
+        self.tree_class = np.asarray(tree_class, np.int32)
+        leaves = self.left == -1
+        index = np.arange(self.num_nodes, dtype=np.int32)
+        # Children interleaved as (right, left), so the next node of every
+        # pair is one gather at 2 * node + went_left.
+        self._children = np.stack(
+            [np.where(leaves, index, self.right), np.where(leaves, index, self.left)], axis=1
+        ).ravel()
+        # Compare in float32 or float64, whichever the library uses, so rows
+        # split exactly as they do there.
+        dtype = np.float32 if comparison == "<" else np.float64
+        self._threshold = self.threshold.astype(dtype)
+        self._dtype = dtype
+        self.max_depth = 0
+        level = self.roots[self.left[self.roots] != -1]
+        while len(level):
+            self.max_depth += 1
+            level = np.concatenate([self.left[level], self.right[level]])
+            level = level[self.left[level] != -1]
+        self._class_matrix = np.zeros((self.num_trees, num_outputs), np.float64)
+        self._class_matrix[np.arange(self.num_trees), self.tree_class] = 1.0
+
+    def save(self, directory):
+        """Write the forest to ``directory`` as ``.npy`` arrays and ``forest.json``."""
+        for name in NODE_ARRAYS + ("roots", "tree_class"):
+            np.save(os.path.join(directory, name + ".npy"), getattr(self, name))
+        with open(os.path.join(directory, "forest.json"), "w") as f:
+            json.dump({name: getattr(self, name) for name in _SCALARS}, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        """A forest written by ``save``, its arrays memory-mapped by default."""
+        with open(os.path.join(directory, "forest.json")) as f:
+            scalars = json.load(f)
+
+        def array(name):
+            return np.load(os.path.join(directory, name + ".npy"), mmap_mode=mmap_mode)
+
+        return cls(
+            nodes={name: array(name) for name in NODE_ARRAYS},
+            roots=array("roots"),
+            tree_class=array("tree_class"),
+            **scalars,
+        )
+
+    @property
+    def num_trees(self):
+        return len(self.roots)
+
+    @property
+    def num_nodes(self):
+        return len(self.feature)
+
+    def leaves(self, features):
+        """Leaf node reached by each row in each tree, as ``(rows, trees)``."""
+        features = np.ascontiguousarray(features, dtype=self._dtype)
+        flat = features.ravel()
+        has_nan = np.isnan(flat).any()
+        has_zero_missing = self.zero_missing.any()
+        offsets = (np.arange(len(features)) * self.num_features)[:, None]
+        node = np.broadcast_to(self.roots, (len(features), self.num_trees))
+        for _ in range(self.max_depth):
+            values = flat.take(offsets + self.feature.take(node))
+            if self.comparison == "<":
+                left = values < self._threshold.take(node)
+            else:
+                left = values <= self._threshold.take(node)
+            if has_nan or has_zero_missing:
+                default_left = self.default_left.take(node)
+                if has_nan:
+                    left |= np.isnan(values) & default_left
+                if has_zero_missing:
+                    zero = self.zero_missing.take(node) & (np.abs(values) <= ZERO_THRESHOLD)
+                    left = np.where(zero, default_left, left)
+            node = self._children.take(2 * node + left)
+        return node
+
+    def margin(self, features):
+        """Raw scores before ``transform``, as ``(rows, num_outputs)``."""
+        return self.value[self.leaves(features)] @ self._class_matrix + self.base_margin
+
+    def predict(self, features, chunk_rows=1024):
+        """What the library's ``predict`` returns: 1-D, or 2-D for several classes."""
+        features = np.asarray(features)
+        if features.ndim != 2 or features.shape[1] != self.num_features:
+            raise ValueError("model takes {} features per row, got shape {}".format(
+                self.num_features, features.shape))
+        margin = np.concatenate([
+            self.margin(features[start:start + chunk_rows])
+            for start in range(0, max(len(features), 1), chunk_rows)
+        ])
+        if self.transform == "sigmoid":
+            scores = 1.0 / (1.0 + np.exp(-self.sigmoid_scale * margin))
+        elif self.transform == "softmax":
+            scores = np.exp(margin - margin.max(axis=1, keepdims=True))
+            scores /= scores.sum(axis=1, keepdims=True)
+        elif self.transform == "exp":
+            scores = np.exp(margin)
+        else:
+            scores = margin
+        return scores[:, 0] if self.num_outputs == 1 else scores
+
+
+def _empty_nodes():
+    return {key: [] for key in NODE_ARRAYS}
+
+
+def _add_node(nodes, feature=0, threshold=0.0, left=-1, right=-1, default_left=False,
+              zero_missing=False, value=0.0):
+    nodes["feature"].append(feature)
+    nodes["threshold"].append(threshold)
+    nodes["left"].append(left)
+    nodes["right"].append(right)
+    nodes["default_left"].append(default_left)
+    nodes["zero_missing"].append(zero_missing)
+    nodes["value"].append(value)
+
+
+def _xgboost_base_margin(transform, base_score):
+    # base_score is stored in output space; margins start from its inverse.
+    if transform == "sigmoid":
+        return -math.log(1.0 / base_score - 1.0)
+    if transform == "exp":
+        return math.log(base_score)
+    return base_score
+
+
+def load_xgboost_json(path):
+    with open(path) as f:
+        learner = json.load(f)["learner"]
+    objective = learner["objective"]["name"]
+    transform = _XGBOOST_TRANSFORMS.get(objective)
+    if transform is None:
+        raise ValueError("{}: unsupported XGBoost objective '{}'".format(path, objective))
+    booster = learner["gradient_booster"]
+    if booster["name"] != "gbtree":
+        raise ValueError("{}: unsupported XGBoost booster '{}'".format(path, booster["name"]))
+    params = learner["learner_model_param"]
+    # The binary:logitraw margin is the logistic one; only the output differs.
+    margin_transform = "sigmoid" if objective == "binary:logitraw" else transform
+    base_margin = _xgboost_base_margin(margin_transform, float(params["base_score"]))
+    model = booster["model"]
+    nodes = _empty_nodes()
+    roots = []
+    for tree in model["trees"]:
+        if any(split_type != 0 for split_type in tree.get("split_type", [])):
+            raise ValueError("{}: categorical splits are not supported".format(path))
+        offset = len(nodes["feature"])
+        roots.append(offset)
+        lefts = tree["left_children"]
+        for i, left in enumerate(lefts):
+            if left == -1:
+                _add_node(nodes, value=tree["split_conditions"][i])
+            else:
+                _add_node(
+                    nodes,
+                    feature=tree["split_indices"][i],
+                    # Thresholds are float32 in XGBoost; keep the float32 value.
+                    threshold=float(np.float32(tree["split_conditions"][i])),
+                    left=offset + left,
+                    right=offset + tree["right_children"][i],
+                    default_left=bool(tree["default_left"][i]),
+                )
+    return Forest(
+        "xgboost",
+        num_features=int(params["num_feature"]),
+        num_outputs=max(1, int(params.get("num_class", 0))),
+        comparison="<",
+        transform=transform,
+        base_margin=base_margin,
+        nodes=nodes,
+        roots=roots,
+        tree_class=model.get("tree_info", [0] * len(roots)),
+    )
+
+
+def _lightgbm_blocks(path):
+    """The header and tree sections of a LightGBM text model as key/value dicts."""
+    header = {}
+    trees = []
+    current = header
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("Tree="):
+                current = {}
+                trees.append(current)
+            elif line == "end of trees":
+                break
+            elif line:
+                key, _, value = line.partition("=")
+                current[key] = value
+    return header, trees
+
+
+def _numbers(block, key, kind=float):
+    return [kind(value) for value in block.get(key, "").split()]
+
+
+def load_lightgbm_text(path):
+    header, trees = _lightgbm_blocks(path)
+    objective = header.get("objective", "regression").split()
+    transform = _LIGHTGBM_TRANSFORMS.get(objective[0])
+    if transform is None:
+        raise ValueError("{}: unsupported LightGBM objective '{}'".format(path, objective[0]))
+    if "average_output" in header:
+        raise ValueError("{}: random forest models are not supported".format(path))
+    options = dict(item.split(":", 1) for item in objective[1:] if ":" in item)
+    per_iteration = int(header.get("num_tree_per_iteration", 1))
+    nodes = _empty_nodes()
+    roots = []
+    for tree in trees:
+        offset = len(nodes["feature"])
+        roots.append(offset)
+        num_leaves = int(tree["num_leaves"])
+        leaf_values = _numbers(tree, "leaf_value")
+        if num_leaves == 1:
+            _add_node(nodes, value=leaf_values[0])
+            continue
+        # Internal nodes first, then leaves; LightGBM numbers leaf j as ~j.
+        first_leaf = offset + num_leaves - 1
+
+        def child(index):
+            return first_leaf + ~index if index < 0 else offset + index
+
+        decision_types = _numbers(tree, "decision_type", int)
+        thresholds = _numbers(tree, "threshold")
+        lefts = _numbers(tree, "left_child", int)
+        rights = _numbers(tree, "right_child", int)
+        for i, feature in enumerate(_numbers(tree, "split_feature", int)):
+            decision_type = decision_types[i]
+            if decision_type & 1:
+                raise ValueError("{}: categorical splits are not supported".format(path))
+            threshold = thresholds[i]
+            default_left = bool(decision_type & 2)
+            missing_type = (decision_type >> 2) & 3
+            if missing_type == 0:
+                # No missing values in training: NaN is read as zero.
+                default_left = 0.0 <= threshold
+            _add_node(
+                nodes,
+                feature=feature,
+                threshold=threshold,
+                left=child(lefts[i]),
+                right=child(rights[i]),
+                default_left=default_left,
+                zero_missing=missing_type == 1,
+            )
+        for value in leaf_values:
+            _add_node(nodes, value=value)
+    return Forest(
+        "lightgbm",
+        num_features=int(header["max_feature_idx"]) + 1,
+        num_outputs=int(header.get("num_class", 1)),
+        comparison="<=",
+        transform=transform,
+        base_margin=0.0,
+        nodes=nodes,
+        roots=roots,
+        tree_class=[i % per_iteration for i in range(len(roots))],
+        sigmoid_scale=float(options.get("sigmoid", 1.0)),
+    )
+
+
+def load_forest(path):
+    """``Forest`` for an ``xgboost.json`` or LightGBM ``model.txt`` file."""
+    if path.endswith(".json"):
+        return load_xgboost_json(path)
+    if path.endswith(".txt"):
+        return load_lightgbm_text(path)
+    raise ValueError("{}: only XGBoost JSON and LightGBM text models can be read".format(path))
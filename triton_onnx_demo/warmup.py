@@ -0,0 +1,118 @@
+"""Generate and read Triton ``model_warmup`` samples.
+
+Samples are raw row-major tensors stored under ``<model_dir>/warmup/``, which is
+where Triton looks for ``input_data_file`` entries.
+"""
+import os
+
+import numpy as np
+
+from triton_onnx_demo.model_config import (
+    load_model_config,
+    numpy_dtype,
+    preferred_batch_sizes,
+    supports_batching,
+    write_model_config,
+)
+
+WARMUP_DIR = "warmup"
+
+
+def _input_shape(config, model_input, batch_size):
+    dims = [1 if d < 0 else d for d in model_input["dims"]]
+    if supports_batching(config):
+        return [batch_size] + dims
+    return dims
+
+
+def _rows_in_shape(config, shape):
+    if supports_batching(config) or len(shape) > 1:
+        return shape[0]
+    return 1
+
+
+def split_rows(config, rows, batch_size):
+    """Pack the columns of ``rows`` into the model inputs, in declaration order.
+
+    Rows are cycled to fill the batch and columns are taken left to right, one
+    block per input, so a ten-input scalar model sees the ten features in order.
+    The inputs must take exactly as many features as ``rows`` has columns;
+    otherwise the config does not describe the model the rows trained, and
+    Triton would fail the warmup and refuse to load it.
+    """
+    rows = np.asarray(rows)
+    shapes = [_input_shape(config, model_input, batch_size) for model_input in config["input"]]
+    widths = [int(np.prod(shape)) // _rows_in_shape(config, shape) for shape in shapes]
+    if sum(widths) != rows.shape[1]:
+        raise ValueError(
+            "model '{}' inputs take {} features per row; its training data has {}".format(
+                config.get("name", ""), sum(widths), rows.shape[1]))
+    tensors = {}
+    column = 0
+    for model_input, shape, width in zip(config["input"], shapes, widths):
+        block = np.resize(rows, (_rows_in_shape(config, shape), rows.shape[1]))
+        tensors[model_input["name"]] = block[:, column:column + width].reshape(shape).astype(
+            numpy_dtype(model_input["data_type"])
+        )
+        column += width
+    return tensors
+
+
+def build_model_warmup(model_dir, rows, count=1):
+    """Write warmup samples for every preferred batch size and update the config.
+
+    Returns the list of ``model_warmup`` entries written to ``config.pbtxt``.
+    """
+    config = load_model_config(model_dir)
+    warmup_dir = os.path.join(model_dir, WARMUP_DIR)
+    os.makedirs(warmup_dir, exist_ok=True)
+    entries = []
+    for batch_size in preferred_batch_sizes(config):
+        tensors = split_rows(config, rows, batch_size)
+        inputs = []
+        for model_input in config["input"]:
+            name = model_input["name"]
+            file_name = "{}_batch_{}".format(name, batch_size)
+            tensors[name].tofile(os.path.join(warmup_dir, file_name))
+            inputs.append(
+                {
+                    "key": name,
+                    "value": {
+                        "data_type": model_input["data_type"],
+                        "dims": list(tensors[name].shape[1:])
+                        if supports_batching(config)
+                        else list(tensors[name].shape),
+                        "input_data_file": file_name,
+                    },
+                }
+            )
+        entries.append(
+            {
+                "name": "training_data_batch_{}".format(batch_size),
+                "batch_size": batch_size,
+                "inputs": inputs,
+                "count": count,
+            }
+        )
+    write_model_config(model_dir, {"model_warmup": entries})
+    return entries
+
+
+def load_warmup_samples(model_dir, config=None):
+    """Read the warmup samples back as ``(batch_size, {input_name: array})`` pairs."""
+    if config is None:
+        config = load_model_config(model_dir)
+    samples = []
+    for entry in config.get("model_warmup", []):
+        tensors = {}
+        for item in entry.get("inputs", []):
+            value = item["value"]
+            shape = list(value["dims"])
+            if supports_batching(config):
+                shape = [entry["batch_size"]] + shape
+            path = os.path.join(model_dir, WARMUP_DIR, value["input_data_file"])
+            tensors[item["key"]] = np.fromfile(
+                path, dtype=numpy_dtype(value["data_type"])
+            ).reshape(shape)
+        samples.append((entry["batch_size"], tensors))
+    return samples